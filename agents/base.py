@@ -1,42 +1,187 @@
 # cmbs_reminder_system/agents/base.py
+import os
 import redis
 import json
 import datetime
-from pydantic import BaseModel
-from typing import Optional, Any
+import functools
+import typing
+from pydantic import BaseModel, TypeAdapter
+from typing import Optional, Any, List, Dict
+from typing_extensions import TypedDict
+from .telemetry import InstrumentedRedis, get_logger
 
 # Configure Redis connection
-REDIS_HOST = 'localhost'
-REDIS_PORT = 6379
-REDIS_DB = 0
-r = redis.StrictRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_DB = int(os.getenv('REDIS_DB', 0))
+# Every command and pipeline is counted and timed for /metrics (see agents/telemetry.py).
+r = InstrumentedRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+# Health checks get their own client with short timeouts, so a probe fails fast instead of
+# waiting out the OS TCP timeout while Redis is unreachable.
+REDIS_HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv('REDIS_HEALTH_CHECK_TIMEOUT_SECONDS', 2))
+health_check_r = InstrumentedRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True,
+                                   socket_connect_timeout=REDIS_HEALTH_CHECK_TIMEOUT_SECONDS,
+                                   socket_timeout=REDIS_HEALTH_CHECK_TIMEOUT_SECONDS)
+
+# Object types whose writes bump a per-key version counter, so in-process caches can detect changes.
+VERSIONED_OBJECT_TYPES = ('property', 'loan')
+OBJECT_VERSIONS_KEY = "object_versions"
+
+# Object types stored as Redis hashes, one field per model field, so reads can project a few
+# fields and updates touch only the fields that change. Other types are one JSON string per key.
+HASH_OBJECT_TYPES = ('task',)
+# Fields recomputed on every read path and never persisted.
+TRANSIENT_FIELDS = {'task': {'dependent_tasks_status', 'blocker_chain'}}
+
+# KEYS: hash key. ARGV: number of fields to set, then field/value pairs, then fields to delete.
+_HASH_UPDATE_IF_EXISTS_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+local set_count = tonumber(ARGV[1])
+for i = 2, 2 * set_count, 2 do
+    redis.call('hset', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+for i = 2 * set_count + 2, #ARGV do
+    redis.call('hdel', KEYS[1], ARGV[i])
+end
+return 1
+"""
+
+@functools.lru_cache(maxsize=None)
+def _json_encoded_fields(model_class: type[BaseModel]) -> frozenset:
+    """List and dict fields are JSON-encoded inside a hash; scalars are stored as their JSON-mode string."""
+    return frozenset(name for name, field in model_class.model_fields.items()
+                     if typing.get_origin(field.annotation) in (list, dict))
+
+@functools.lru_cache(maxsize=None)
+def _projection_adapter(model_class: type[BaseModel], fields: tuple) -> TypeAdapter:
+    """Validates a partial dict of `fields` in one call (a total=False TypedDict of the model's field types)."""
+    projection = TypedDict(f"{model_class.__name__}Projection",
+                           {name: model_class.model_fields[name].annotation for name in fields}, total=False)
+    return TypeAdapter(projection)
+
+def encode_hash_fields(values: Dict[str, Any]) -> tuple[Dict[str, str], List[str]]:
+    """Splits field values into the HSET mapping and the fields to delete (None values)."""
+    mapping: Dict[str, str] = {}
+    removed: List[str] = []
+    for name, value in values.items():
+        if value is None:
+            removed.append(name)
+        elif isinstance(value, str):
+            mapping[name] = value
+        elif isinstance(value, datetime.date):
+            mapping[name] = value.isoformat()
+        else:
+            mapping[name] = json.dumps(value)
+    return mapping, removed
+
+def decode_hash_fields(model_class: type[BaseModel], raw: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Inverse of encode_hash_fields, leaving scalars as strings for pydantic to validate. Absent fields are dropped."""
+    json_fields = _json_encoded_fields(model_class)
+    return {name: json.loads(value) if name in json_fields else value for name, value in raw.items() if value is not None}
 
 class Agent:
     """Base class for all agents to provide common functionalities."""
     def __init__(self, name: str):
         self.name = name
-        print(f"[{self.name}] Initialized.")
+        self.log = get_logger(name)
+        self.log.debug("Initialized.")
 
     def _get_redis_key(self, obj_type: str, obj_id: str) -> str:
         return f"{obj_type}:{obj_id}"
 
     def _save_to_redis(self, obj_type: str, obj: BaseModel):
         key = self._get_redis_key(obj_type, getattr(obj, f'{obj_type}_id'))
-        r.set(key, obj.model_dump_json())
+        if obj_type in HASH_OBJECT_TYPES:
+            mapping, _ = encode_hash_fields(obj.model_dump(mode='json', exclude=TRANSIENT_FIELDS.get(obj_type)))
+            pipe = r.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.execute()
+        elif obj_type in VERSIONED_OBJECT_TYPES:
+            pipe = r.pipeline()
+            pipe.set(key, obj.model_dump_json())
+            pipe.hincrby(OBJECT_VERSIONS_KEY, key, 1)
+            pipe.execute()
+        else:
+            r.set(key, obj.model_dump_json())
 
     def _load_from_redis(self, obj_type: str, obj_id: str, model_class: type[BaseModel]) -> Optional[BaseModel]:
         key = self._get_redis_key(obj_type, obj_id)
+        if obj_type in HASH_OBJECT_TYPES:
+            fields = r.hgetall(key)
+            return model_class.model_validate(decode_hash_fields(model_class, fields)) if fields else None
         obj_json = r.get(key)
         if obj_json:
             return model_class.model_validate_json(obj_json)
         return None
 
-    def _update_in_redis(self, obj_type: str, obj_id: str, updates: dict):
+    def _load_many_from_redis(self, obj_type: str, obj_ids: List[str], model_class: type[BaseModel], batch_size: int = 1000) -> List[Optional[BaseModel]]:
+        """
+        Loads several objects in one round trip (MGETs of `batch_size` keys, pipelined).
+        Results are aligned with `obj_ids`; missing objects come back as None.
+        """
+        if not obj_ids:
+            return []
+        keys = [self._get_redis_key(obj_type, obj_id) for obj_id in obj_ids]
+        pipe = r.pipeline(transaction=False)
+        if obj_type in HASH_OBJECT_TYPES:
+            for key in keys:
+                pipe.hgetall(key)
+            return [model_class.model_validate(decode_hash_fields(model_class, fields)) if fields else None
+                    for fields in pipe.execute()]
+        for start in range(0, len(keys), batch_size):
+            pipe.mget(keys[start:start + batch_size])
+        objs_json = [obj_json for chunk in pipe.execute() for obj_json in chunk]
+        return [model_class.model_validate_json(obj_json) if obj_json else None for obj_json in objs_json]
+
+    def _load_fields_from_redis(self, obj_type: str, obj_ids: List[str], model_class: type[BaseModel],
+                                fields: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Projection read for hash-stored types: only `fields` are fetched (one HMGET per object,
+        pipelined) and validated. Results are aligned with `obj_ids`; missing objects come back
+        as None, and unset optional fields are left out of the dict.
+        """
+        if not obj_ids:
+            return []
+        id_field = f'{obj_type}_id'
+        requested = [id_field] + [field for field in fields if field != id_field]
+        adapter = _projection_adapter(model_class, tuple(requested))
+        pipe = r.pipeline(transaction=False)
+        for obj_id in obj_ids:
+            pipe.hmget(self._get_redis_key(obj_type, obj_id), requested)
+        return [adapter.validate_python(decode_hash_fields(model_class, dict(zip(requested, values))))
+                if values[0] is not None else None
+                for values in pipe.execute()]
+
+    def _update_in_redis(self, obj_type: str, obj_id: str, updates: dict) -> bool:
+        """
+        Partial update of a stored object; returns False if it does not exist. Hash-stored types set
+        and delete just the changed fields in one script. JSON-stored types do a read-modify-write
+        under WATCH/MULTI, retried if the key changes in between. Concurrent updates to different
+        fields are never lost either way.
+        """
         key = self._get_redis_key(obj_type, obj_id)
-        obj_json = r.get(key)
-        if obj_json:
-            obj_data = json.loads(obj_json)
-            obj_data.update(updates)
-            r.set(key, json.dumps(obj_data))
-            return True
-        return False
\ No newline at end of file
+        if obj_type in HASH_OBJECT_TYPES:
+            mapping, removed = encode_hash_fields(updates)
+            args = [len(mapping)] + [item for pair in mapping.items() for item in pair] + removed
+            return bool(r.eval(_HASH_UPDATE_IF_EXISTS_SCRIPT, 1, key, *args))
+        with r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    obj_json = pipe.get(key)
+                    if not obj_json:
+                        pipe.unwatch()
+                        return False
+                    obj_data = json.loads(obj_json)
+                    obj_data.update(updates)
+                    pipe.multi()
+                    pipe.set(key, json.dumps(obj_data))
+                    if obj_type in VERSIONED_OBJECT_TYPES:
+                        pipe.hincrby(OBJECT_VERSIONS_KEY, key, 1)
+                    pipe.execute()
+                    return True
+                except redis.WatchError:
+                    continue
\ No newline at end of file
@@ -0,0 +1,336 @@
+# cmbs_reminder_system/agents/channels.py
+from .telemetry import get_logger
+from models import DeliveryReceipt
+from concurrent.futures import Future
+from email.message import EmailMessage
+from typing import Optional, List, Dict, Any, Callable
+import datetime
+import os
+import queue
+import smtplib
+import threading
+import time
+import uuid
+
+class Delivery:
+    """
+    One message waiting in a channel's send queue; `future` resolves to its DeliveryReceipt.
+    A delivery can be cancelled until a sender thread takes it; a cancelled one is never sent.
+    """
+    def __init__(self, recipient: str, subject: str, message: str, task_ids: Optional[List[str]] = None):
+        self.recipient = recipient
+        self.subject = subject
+        self.message = message
+        self.task_ids = task_ids or []
+        self.queued_at = datetime.datetime.now()
+        self.future: Future = Future()
+        self._state = "queued"
+        self._state_lock = threading.Lock()
+
+    def start_sending(self) -> bool:
+        """Marks the delivery as taken by a sender thread; False if it was cancelled first."""
+        with self._state_lock:
+            if self._state == "cancelled":
+                return False
+            self._state = "sending"
+            return True
+
+    def cancel(self) -> bool:
+        """Withdraws the delivery if it is still queued; False once a sender thread has taken it."""
+        with self._state_lock:
+            if self._state == "sending":
+                return False
+            self._state = "cancelled"
+            return True
+
+_STOP = object()
+
+class Channel:
+    """
+    A delivery transport with its own send queue and `concurrency` sender threads. Each thread
+    takes up to `max_batch_size` queued messages at a time, waiting at most `max_batch_wait_seconds`
+    for a batch to fill, and keeps its own connection open between batches. Subclasses implement
+    `send_batch` (and `_open_connection`/`_close_connection` if they hold one).
+
+    Settings default from NOTIFY_<NAME>_CONCURRENCY, _BATCH_SIZE and _BATCH_WAIT_MS.
+    """
+    name = "channel"
+    default_concurrency = 4
+    default_batch_size = 10
+    default_batch_wait_ms = 5
+
+    def __init__(self, concurrency: Optional[int] = None, max_batch_size: Optional[int] = None,
+                 max_batch_wait_seconds: Optional[float] = None):
+        self.log = get_logger(f"channel.{self.name}")
+        prefix = f"NOTIFY_{self.name.upper()}"
+        self.concurrency = concurrency or int(os.getenv(f"{prefix}_CONCURRENCY", self.default_concurrency))
+        self.max_batch_size = max_batch_size or int(os.getenv(f"{prefix}_BATCH_SIZE", self.default_batch_size))
+        self.max_batch_wait_seconds = (max_batch_wait_seconds if max_batch_wait_seconds is not None
+                                       else float(os.getenv(f"{prefix}_BATCH_WAIT_MS", self.default_batch_wait_ms)) / 1000)
+        self.receipt_sink: Optional[Callable[[List[DeliveryReceipt]], None]] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._local = threading.local()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    # --- Subclass hooks ---
+
+    def send_batch(self, deliveries: List[Delivery]) -> List[Optional[str]]:
+        """Sends a batch over this thread's connection; returns an error message per delivery, or None if delivered."""
+        raise NotImplementedError
+
+    def _open_connection(self) -> Any:
+        return None
+
+    def _close_connection(self, connection: Any):
+        pass
+
+    def connection(self) -> Any:
+        """This sender thread's connection, opened on first use and kept for later batches."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._open_connection()
+            self._local.connection = connection
+        return connection
+
+    def reset_connection(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                self._close_connection(connection)
+            except Exception:
+                pass
+
+    # --- Queue and sender threads ---
+
+    def submit(self, delivery: Delivery) -> Future:
+        with self._lock:
+            if not self._workers:
+                self._workers = [threading.Thread(target=self._worker_loop, name=f"notify-{self.name}-{i}", daemon=True)
+                                 for i in range(self.concurrency)]
+                for worker in self._workers:
+                    worker.start()
+        self._queue.put(delivery)
+        return delivery.future
+
+    def _next_batch(self) -> Optional[List[Delivery]]:
+        first = self._queue.get()
+        if first is _STOP:
+            # Pass the stop signal on to the next sender thread.
+            self._queue.put(_STOP)
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_batch_wait_seconds
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0)) if self.max_batch_wait_seconds else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Send what we have; the next call picks the stop signal up again.
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker_loop(self):
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                cancelled = [delivery for delivery in batch if not delivery.start_sending()]
+                if cancelled:
+                    self._complete(cancelled, ["Cancelled before sending."] * len(cancelled), failure_status="cancelled")
+                    batch = [delivery for delivery in batch if delivery not in cancelled]
+                    if not batch:
+                        continue
+                try:
+                    errors = self.send_batch(batch)
+                except Exception as e:
+                    self.reset_connection()
+                    errors = [f"{type(e).__name__}: {e}"] * len(batch)
+                self._complete(batch, errors)
+        finally:
+            self.reset_connection()
+
+    def _complete(self, batch: List[Delivery], errors: List[Optional[str]], failure_status: str = "failed"):
+        sent_at = datetime.datetime.now()
+        receipts = [
+            DeliveryReceipt(receipt_id=uuid.uuid4().hex, channel=self.name, recipient=delivery.recipient, subject=delivery.subject,
+                            task_ids=delivery.task_ids, status=failure_status if error else "delivered", error=error,
+                            batch_size=len(batch), queued_at=delivery.queued_at, sent_at=sent_at)
+            for delivery, error in zip(batch, errors)
+        ]
+        if self.receipt_sink:
+            try:
+                self.receipt_sink(receipts)
+            except Exception as e:
+                self.log.error("Could not record %s delivery receipts: %s", len(receipts), e)
+        for delivery, receipt in zip(batch, receipts):
+            delivery.future.set_result(receipt)
+
+    def close(self, timeout_seconds: float = 10.0):
+        """Sends everything already queued, then stops the sender threads and closes their connections."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        if workers:
+            self._queue.put(_STOP)
+        for worker in workers:
+            worker.join(timeout=timeout_seconds)
+        if workers:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+
+class ConsoleChannel(Channel):
+    """Prints reminders to stdout; the default channel for local runs."""
+    name = "console"
+    default_concurrency = 1
+    default_batch_size = 50
+    default_batch_wait_ms = 0
+
+    def send_batch(self, deliveries: List[Delivery]) -> List[Optional[str]]:
+        for delivery in deliveries:
+            print(f"\n--- [{self.name}] Sending Reminder ---")
+            print(f"To: {delivery.recipient}")
+            print(f"Subject: {delivery.subject}")
+            print(f"Message (truncated):\n{delivery.message[:500]}...")
+            print("------------------------------------\n")
+        return [None] * len(deliveries)
+
+class SMTPChannel(Channel):
+    """
+    Email over SMTP. Each sender thread keeps one authenticated connection open and sends a
+    whole batch over it, reconnecting once if the server dropped the idle connection.
+    """
+    name = "smtp"
+
+    def __init__(self, host: str, port: int = 25, sender: str = "reminders@cmbs.com", username: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = False, timeout_seconds: float = 10.0, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout_seconds = timeout_seconds
+
+    def _open_connection(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout_seconds)
+        connection.ehlo()
+        if self.starttls:
+            connection.starttls()
+            connection.ehlo()
+        if self.username:
+            connection.login(self.username, self.password or "")
+        return connection
+
+    def _close_connection(self, connection: smtplib.SMTP):
+        connection.quit()
+
+    def _build_email(self, delivery: Delivery) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = delivery.recipient
+        email["Subject"] = delivery.subject
+        email.set_content(delivery.message)
+        return email
+
+    def send_batch(self, deliveries: List[Delivery]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        for delivery in deliveries:
+            email = self._build_email(delivery)
+            try:
+                try:
+                    self.connection().send_message(email)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    self.reset_connection()
+                    self.connection().send_message(email)
+                errors.append(None)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            except (smtplib.SMTPException, OSError) as e:
+                # Fail just this message; the next one gets a fresh connection.
+                self.reset_connection()
+                errors.append(f"{type(e).__name__}: {e}")
+        return errors
+
+class _HTTPChannel(Channel):
+    """Shared plumbing for HTTP transports: one keep-alive requests.Session per sender thread."""
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, timeout_seconds: float = 10.0, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.headers = headers or {}
+        self.timeout_seconds = timeout_seconds
+
+    def _open_connection(self) -> Any:
+        import requests
+        session = requests.Session()
+        session.headers.update(self.headers)
+        return session
+
+    def _close_connection(self, session: Any):
+        session.close()
+
+    def _post(self, payload: Dict[str, Any]) -> Any:
+        response = self.connection().post(self.url, json=payload, timeout=self.timeout_seconds)
+        response.raise_for_status()
+        return response
+
+class SlackWebhookChannel(_HTTPChannel):
+    """Posts to a Slack incoming webhook. A batch is combined into one message, one section per reminder."""
+    name = "slack"
+
+    def send_batch(self, deliveries: List[Delivery]) -> List[Optional[str]]:
+        sections = [f"*{delivery.subject}*\n_To: {delivery.recipient}_\n{delivery.message}" for delivery in deliveries]
+        self._post({"text": "\n\n---\n\n".join(sections)})
+        return [None] * len(deliveries)
+
+class HTTPChannel(_HTTPChannel):
+    """
+    Generic webhook: POSTs {"deliveries": [{recipient, subject, message, task_ids}, ...]} per batch.
+    A JSON reply of {"results": [{"error": ...}, ...]} (aligned with the batch) reports per-message
+    failures; any other 2xx reply means the whole batch was accepted.
+    """
+    name = "http"
+
+    def send_batch(self, deliveries: List[Delivery]) -> List[Optional[str]]:
+        response = self._post({"deliveries": [{"recipient": delivery.recipient, "subject": delivery.subject,
+                                               "message": delivery.message, "task_ids": delivery.task_ids}
+                                              for delivery in deliveries]})
+        try:
+            results = response.json().get("results")
+        except ValueError:
+            results = None
+        if isinstance(results, list) and len(results) == len(deliveries):
+            return [result.get("error") if isinstance(result, dict) else None for result in results]
+        return [None] * len(deliveries)
+
+def channels_from_env() -> List[Channel]:
+    """Builds the channels named in NOTIFICATION_CHANNELS (default: console)."""
+    channels: List[Channel] = []
+    for name in filter(None, (name.strip() for name in os.getenv("NOTIFICATION_CHANNELS", "console").split(","))):
+        if name == "console":
+            channels.append(ConsoleChannel())
+        elif name == "smtp":
+            channels.append(SMTPChannel(
+                host=os.getenv("SMTP_HOST", "localhost"),
+                port=int(os.getenv("SMTP_PORT", 25)),
+                sender=os.getenv("SMTP_SENDER", "reminders@cmbs.com"),
+                username=os.getenv("SMTP_USERNAME"),
+                password=os.getenv("SMTP_PASSWORD"),
+                starttls=os.getenv("SMTP_STARTTLS", "false").lower() == "true",
+            ))
+        elif name == "slack":
+            channels.append(SlackWebhookChannel(url=os.environ["SLACK_WEBHOOK_URL"]))
+        elif name == "http":
+            token = os.getenv("NOTIFICATION_HTTP_TOKEN")
+            channels.append(HTTPChannel(url=os.environ["NOTIFICATION_HTTP_URL"],
+                                        headers={"Authorization": f"Bearer {token}"} if token else None))
+        else:
+            raise ValueError(f"Unknown notification channel '{name}'")
+    return channels
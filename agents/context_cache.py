@@ -0,0 +1,82 @@
+# cmbs_reminder_system/agents/context_cache.py
+from .base import r, OBJECT_VERSIONS_KEY
+from pydantic import BaseModel
+from collections import OrderedDict
+from typing import Optional, Dict, List
+import os
+import threading
+import time
+
+class ContextCache:
+    """
+    Process-wide LRU cache (with TTL) of context objects such as PropertyContext and LoanContext.
+    Entries remember the Redis version counter they were read at; every lookup checks the current
+    counters with one HMGET, so a write to property:*/loan:* anywhere invalidates the entry.
+    """
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or int(os.getenv("CONTEXT_CACHE_MAX_ENTRIES", 10000))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", 900))
+        # key -> (expires_at, version, model or None, size in bytes)
+        self._entries: "OrderedDict[str, tuple[float, int, Optional[BaseModel], int]]" = OrderedDict()
+        self._bytes_held = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "memo_hits": 0, "evictions": 0}
+
+    def count_memo_hit(self):
+        with self._lock:
+            self._counters["memo_hits"] += 1
+
+    def _store(self, key: str, version: int, model: Optional[BaseModel], size: int):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._bytes_held -= previous[3]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, version, model, size)
+            self._bytes_held += size
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes_held -= evicted[3]
+                self._counters["evictions"] += 1
+
+    def get_many(self, keys: List[str], model_classes: Dict[str, type[BaseModel]]) -> Dict[str, Optional[BaseModel]]:
+        """
+        Resolves Redis keys ('property:PROP-GRND', ...) to models, using at most two round trips:
+        one HMGET of version counters, and one MGET for keys that are missing, expired or stale.
+        `model_classes` maps the key's object type to its model.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        versions = [int(version or 0) for version in r.hmget(OBJECT_VERSIONS_KEY, keys)]
+
+        results: Dict[str, Optional[BaseModel]] = {}
+        to_fetch: List[tuple[str, int]] = []
+        now = time.monotonic()
+        with self._lock:
+            for key, version in zip(keys, versions):
+                entry = self._entries.get(key)
+                if entry and entry[0] > now and entry[1] == version:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    results[key] = entry[2]
+                else:
+                    self._counters["stale" if entry else "misses"] += 1
+                    to_fetch.append((key, version))
+
+        if to_fetch:
+            for (key, version), obj_json in zip(to_fetch, r.mget([key for key, _ in to_fetch])):
+                model_class = model_classes[key.split(':', 1)[0]]
+                model = model_class.model_validate_json(obj_json) if obj_json else None
+                # The version was read before the value, so a concurrent write only makes the entry look stale.
+                self._store(key, version, model, len(obj_json) if obj_json else 0)
+                results[key] = model
+        return results
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes_held"] = self._bytes_held
+        lookups = stats["hits"] + stats["misses"] + stats["stale"] + stats["memo_hits"]
+        stats["hit_rate"] = (stats["hits"] + stats["memo_hits"]) / lookups if lookups else 0.0
+        return stats
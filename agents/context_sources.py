@@ -0,0 +1,193 @@
+# cmbs_reminder_system/agents/context_sources.py
+from .context_cache import ContextCache
+from models import Task, PropertyContext, LoanContext
+from pydantic import BaseModel
+from typing import Optional, Dict, List, Any, Callable
+import os
+import sqlite3
+import threading
+
+CONTEXT_MODELS = {'property': PropertyContext, 'loan': LoanContext}
+
+def property_key(property_id: str) -> str:
+    return f"property:{property_id}"
+
+def loan_key(loan_id: str) -> str:
+    return f"loan:{loan_id}"
+
+def market_news_key(property_id: str) -> str:
+    return f"market_news:{property_id}"
+
+class ContextSource:
+    """
+    A source of task context. `fetch` returns a partial set of CombinedContext fields
+    (property_context, loan_context, market_news_summary). `prefetch` may bulk-load what a
+    whole sweep needs and returns entries for the per-sweep memo later passed to `fetch`.
+    Sources are queried concurrently; one that exceeds its timeout is left out of the result.
+    """
+    name = "context_source"
+
+    def __init__(self, timeout_seconds: Optional[float] = None, prefetch_timeout_seconds: Optional[float] = None):
+        self.timeout_seconds = timeout_seconds or float(os.getenv("CONTEXT_SOURCE_TIMEOUT_SECONDS", 2))
+        self.prefetch_timeout_seconds = prefetch_timeout_seconds or float(os.getenv("CONTEXT_PREFETCH_TIMEOUT_SECONDS", 30))
+
+    def prefetch(self, tasks: List[Task]) -> Dict[str, Any]:
+        return {}
+
+    def fetch(self, task: Task, prefetched: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+class SQLContextSource(ContextSource):
+    """
+    Property and loan context from the primary SQL store. SQLite is the local stand-in;
+    each thread gets its own connection.
+    """
+    name = "sql"
+
+    def __init__(self, db_path: str, timeout_seconds: Optional[float] = None, prefetch_timeout_seconds: Optional[float] = None):
+        super().__init__(timeout_seconds, prefetch_timeout_seconds)
+        self.db_path = db_path
+        self._local = threading.local()
+        self._ensure_schema()
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=self.timeout_seconds)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def _ensure_schema(self):
+        with self.connection() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS properties (
+                    property_id TEXT PRIMARY KEY, property_type TEXT NOT NULL,
+                    occupancy_rate REAL NOT NULL, square_footage INTEGER);
+                CREATE TABLE IF NOT EXISTS loans (
+                    loan_id TEXT PRIMARY KEY, loan_type TEXT NOT NULL,
+                    maturity_date TEXT NOT NULL, dscr_covenant REAL);
+                CREATE TABLE IF NOT EXISTS market_news (
+                    property_type TEXT PRIMARY KEY, summary TEXT NOT NULL);
+            """)
+
+    def seed(self, properties: List[PropertyContext], loans: List[LoanContext], market_news: Dict[str, str]):
+        with self.connection() as connection:
+            connection.executemany("INSERT OR REPLACE INTO properties VALUES (:property_id, :property_type, :occupancy_rate, :square_footage)",
+                                   [prop.model_dump(mode="json") for prop in properties])
+            connection.executemany("INSERT OR REPLACE INTO loans VALUES (:loan_id, :loan_type, :maturity_date, :dscr_covenant)",
+                                   [loan.model_dump(mode="json") for loan in loans])
+            connection.executemany("INSERT OR REPLACE INTO market_news VALUES (?, ?)", list(market_news.items()))
+
+    def _select(self, query: str, ids: List[str]) -> List[sqlite3.Row]:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        return self.connection().execute(query.format(placeholders=",".join("?" * len(ids))), ids).fetchall()
+
+    def load_properties(self, property_ids: List[str]) -> Dict[str, PropertyContext]:
+        rows = self._select("SELECT * FROM properties WHERE property_id IN ({placeholders})", property_ids)
+        return {property_key(row["property_id"]): PropertyContext(**dict(row)) for row in rows}
+
+    def load_loans(self, loan_ids: List[str]) -> Dict[str, LoanContext]:
+        rows = self._select("SELECT * FROM loans WHERE loan_id IN ({placeholders})", loan_ids)
+        return {loan_key(row["loan_id"]): LoanContext(**dict(row)) for row in rows}
+
+    def prefetch(self, tasks: List[Task]) -> Dict[str, Any]:
+        prefetched: Dict[str, Any] = {}
+        prefetched.update(self.load_properties([task.property_id for task in tasks if task.property_id]))
+        prefetched.update(self.load_loans([task.loan_id for task in tasks if task.loan_id]))
+        return prefetched
+
+    def fetch(self, task: Task, prefetched: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        if task.property_id:
+            key = property_key(task.property_id)
+            result["property_context"] = prefetched[key] if key in prefetched else self.load_properties([task.property_id]).get(key)
+        if task.loan_id:
+            key = loan_key(task.loan_id)
+            result["loan_context"] = prefetched[key] if key in prefetched else self.load_loans([task.loan_id]).get(key)
+        return result
+
+class MarketNewsSource(ContextSource):
+    """
+    Market-news provider adapter. The local stand-in serves the latest summary for the
+    property's type from the SQL store's market_news table.
+    """
+    name = "market_news"
+
+    def __init__(self, sql_source: SQLContextSource, timeout_seconds: Optional[float] = None, prefetch_timeout_seconds: Optional[float] = None):
+        super().__init__(timeout_seconds, prefetch_timeout_seconds)
+        self.sql_source = sql_source
+
+    def _load(self, property_ids: List[str]) -> Dict[str, Optional[str]]:
+        rows = self.sql_source._select(
+            "SELECT p.property_id, m.summary FROM properties p JOIN market_news m ON m.property_type = p.property_type "
+            "WHERE p.property_id IN ({placeholders})", property_ids)
+        news = {market_news_key(property_id): None for property_id in property_ids}
+        news.update({market_news_key(row["property_id"]): row["summary"] for row in rows})
+        return news
+
+    def prefetch(self, tasks: List[Task]) -> Dict[str, Any]:
+        return self._load([task.property_id for task in tasks if task.property_id])
+
+    def fetch(self, task: Task, prefetched: Dict[str, Any]) -> Dict[str, Any]:
+        if not task.property_id:
+            return {}
+        key = market_news_key(task.property_id)
+        summary = prefetched[key] if key in prefetched else self._load([task.property_id]).get(key)
+        return {"market_news_summary": summary}
+
+class RedisReadThroughSource(ContextSource):
+    """
+    Property/loan context from Redis through the process-wide ContextCache. With an `origin`,
+    contexts missing from Redis are read from it and written back (read-through cache).
+    """
+    name = "redis"
+
+    def __init__(self, context_cache: ContextCache, origin: Optional[SQLContextSource] = None,
+                 save: Optional[Callable[[str, BaseModel], None]] = None,
+                 timeout_seconds: Optional[float] = None, prefetch_timeout_seconds: Optional[float] = None):
+        super().__init__(timeout_seconds, prefetch_timeout_seconds)
+        self.context_cache = context_cache
+        self.origin = origin
+        self.save = save
+
+    @staticmethod
+    def _keys(tasks: List[Task]) -> List[str]:
+        keys = []
+        for task in tasks:
+            if task.property_id:
+                keys.append(property_key(task.property_id))
+            if task.loan_id:
+                keys.append(loan_key(task.loan_id))
+        return keys
+
+    def prefetch(self, tasks: List[Task]) -> Dict[str, Any]:
+        contexts: Dict[str, Any] = self.context_cache.get_many(self._keys(tasks), CONTEXT_MODELS)
+        missing = [key for key, model in contexts.items() if model is None]
+        if missing and self.origin:
+            loaded: Dict[str, BaseModel] = {}
+            loaded.update(self.origin.load_properties([key.split(':', 1)[1] for key in missing if key.startswith('property:')]))
+            loaded.update(self.origin.load_loans([key.split(':', 1)[1] for key in missing if key.startswith('loan:')]))
+            for key, model in loaded.items():
+                if self.save:
+                    self.save(key.split(':', 1)[0], model)
+                contexts[key] = model
+        return contexts
+
+    def fetch(self, task: Task, prefetched: Dict[str, Any]) -> Dict[str, Any]:
+        keys = self._keys([task])
+        if all(key in prefetched for key in keys):
+            for _ in keys:
+                self.context_cache.count_memo_hit()
+            contexts = prefetched
+        else:
+            contexts = self.prefetch([task])
+
+        result: Dict[str, Any] = {}
+        if task.property_id:
+            result["property_context"] = contexts.get(property_key(task.property_id))
+        if task.loan_id:
+            result["loan_context"] = contexts.get(loan_key(task.loan_id))
+        return result
@@ -1,45 +1,105 @@
 # cmbs_reminder_system/agents/contextualizer.py
-from .base import Agent, r
-from ..models import Task, PropertyContext, LoanContext, CombinedContext
+from .base import Agent
+from .context_cache import ContextCache
+from .context_sources import ContextSource, SQLContextSource, MarketNewsSource, RedisReadThroughSource
+from .telemetry import span
+from models import Task, PropertyContext, LoanContext, CombinedContext
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, List, Any, Callable
 import datetime
+import os
+import time
+
+DUMMY_PROPERTIES = [
+    PropertyContext(property_id="PROP-GRND", property_type="Office", occupancy_rate=0.85, square_footage=150000),
+    PropertyContext(property_id="PROP-RETAIL", property_type="Retail", occupancy_rate=0.92, square_footage=80000),
+]
+DUMMY_LOANS = [
+    LoanContext(loan_id="LOAN-GWR-001", loan_type="CMBS", maturity_date=datetime.date(2030, 6, 30), dscr_covenant=1.25),
+    LoanContext(loan_id="LOAN-RT-002", loan_type="Bridge", maturity_date=datetime.date(2027, 1, 15), dscr_covenant=1.10),
+]
+# Market insight by property type; also used when no market-news source is configured.
+DUMMY_MARKET_NEWS = {
+    "Office": "Recent reports indicate rising office vacancies in downtown areas, impacting rent growth potential.",
+    "Retail": "Retail sector showing resilience with increased foot traffic in suburban malls.",
+}
 
 class ContextualizerAgent(Agent):
     """
     Gathers and synthesizes all relevant context for a task from various sources.
+
+    Each ContextSource is queried concurrently with its own timeout; a slow or failing
+    source is dropped from that task's context rather than failing the reminder. Without
+    CONTEXT_DB_PATH, property/loan context comes from Redis alone; with it, Redis acts as a
+    read-through cache in front of the SQL store, which also backs the market-news source.
     """
-    def __init__(self):
+    def __init__(self, context_cache: Optional[ContextCache] = None, sources: Optional[List[ContextSource]] = None):
         super().__init__("ContextualizerAgent")
-        self._populate_dummy_data()
-
-    def _populate_dummy_data(self):
-        prop_grnd = PropertyContext(property_id="PROP-GRND", property_type="Office", occupancy_rate=0.85, square_footage=150000)
-        prop_retail = PropertyContext(property_id="PROP-RETAIL", property_type="Retail", occupancy_rate=0.92, square_footage=80000)
-        self._save_to_redis('property', prop_grnd)
-        self._save_to_redis('property', prop_retail)
-
-        loan_gwr_001 = LoanContext(loan_id="LOAN-GWR-001", loan_type="CMBS", maturity_date=datetime.date(2030, 6, 30), dscr_covenant=1.25)
-        loan_rt_002 = LoanContext(loan_id="LOAN-RT-002", loan_type="Bridge", maturity_date=datetime.date(2027, 1, 15), dscr_covenant=1.10)
-        self._save_to_redis('loan', loan_gwr_001)
-        self._save_to_redis('loan', loan_rt_002)
-        print(f"[{self.name}] Dummy property and loan data populated in Redis.")
-
-    def gather_context(self, task: Task) -> CombinedContext:
-        print(f"[{self.name}] Gathering context for task {task.task_id}...")
-        
-        property_context: Optional[PropertyContext] = None
-        loan_context: Optional[LoanContext] = None
-        market_news_summary: Optional[str] = None
-
-        if task.property_id:
-            property_context = self._load_from_redis('property', task.property_id, PropertyContext)
-        
-        if task.loan_id:
-            loan_context = self._load_from_redis('loan', task.loan_id, LoanContext)
-        
-        if property_context and property_context.property_type == "Office":
-             market_news_summary = "Recent reports indicate rising office vacancies in downtown areas, impacting rent growth potential."
-        elif property_context and property_context.property_type == "Retail":
-             market_news_summary = "Retail sector showing resilience with increased foot traffic in suburban malls."
+        self.context_cache = context_cache or ContextCache()
+        self.sources = sources if sources is not None else self._default_sources()
+        self._source_pool = ThreadPoolExecutor(max_workers=int(os.getenv("CONTEXT_SOURCE_WORKERS", 8)), thread_name_prefix="context-source")
+
+    def _default_sources(self) -> List[ContextSource]:
+        db_path = os.getenv("CONTEXT_DB_PATH")
+        if not db_path:
+            return [RedisReadThroughSource(self.context_cache)]
+        sql_source = SQLContextSource(db_path)
+        return [RedisReadThroughSource(self.context_cache, origin=sql_source, save=self._save_to_redis), MarketNewsSource(sql_source)]
+
+    def seed_dummy_data(self):
+        """Writes the demo properties and loans (and market news, with CONTEXT_DB_PATH); run by `manage.py seed`."""
+        for prop in DUMMY_PROPERTIES:
+            self._save_to_redis('property', prop)
+        for loan in DUMMY_LOANS:
+            self._save_to_redis('loan', loan)
+        if os.getenv("CONTEXT_DB_PATH"):
+            SQLContextSource(os.getenv("CONTEXT_DB_PATH")).seed(DUMMY_PROPERTIES, DUMMY_LOANS, DUMMY_MARKET_NEWS)
+        self.log.info("Dummy property and loan data populated in Redis.")
+
+    def _fan_out(self, call: Callable[[ContextSource], Dict[str, Any]], prefetch: bool = False) -> List[Dict[str, Any]]:
+        """Runs `call` against every source concurrently; results from sources that time out or fail are left out."""
+        started_at = time.monotonic()
+        futures = [(source, self._source_pool.submit(call, source)) for source in self.sources]
+        results = []
+        for source, future in futures:
+            timeout_seconds = source.prefetch_timeout_seconds if prefetch else source.timeout_seconds
+            try:
+                results.append(future.result(timeout=max(started_at + timeout_seconds - time.monotonic(), 0)))
+            except FutureTimeoutError:
+                self.log.warning("Context source '%s' timed out after %gs; continuing without it.", source.name, timeout_seconds)
+            except Exception as e:
+                self.log.warning("Context source '%s' failed: %s; continuing without it.", source.name, e)
+        return results
+
+    def prefetch(self, tasks: List[Task]) -> Dict[str, Any]:
+        """
+        Bulk-loads from every source what `tasks` need (e.g. property/loan contexts in at most
+        two Redis round trips). The result is the per-sweep memo accepted by `gather_context`.
+        """
+        prefetched: Dict[str, Any] = {}
+        with span("prefetch", tasks=len(tasks)) as prefetch:
+            if tasks:
+                for partial in self._fan_out(lambda source: source.prefetch(tasks), prefetch=True):
+                    prefetched.update(partial)
+            prefetch.set("entries", len(prefetched))
+        self.log.info("Prefetched %s context entries for %s tasks.", len(prefetched), len(tasks))
+        return prefetched
+
+    def gather_context(self, task: Task, prefetched: Optional[Dict[str, Any]] = None) -> CombinedContext:
+        self.log.debug("Gathering context for task %s...", task.task_id, extra={"task_id": task.task_id})
+
+        fields: Dict[str, Any] = {}
+        with span("context", task_id=task.task_id):
+            for partial in self._fan_out(lambda source: source.fetch(task, prefetched or {})):
+                for field, value in partial.items():
+                    if fields.get(field) is None:
+                        fields[field] = value
+
+        property_context: Optional[PropertyContext] = fields.get("property_context")
+        loan_context: Optional[LoanContext] = fields.get("loan_context")
+        market_news_summary: Optional[str] = fields.get("market_news_summary")
+        if market_news_summary is None and property_context:
+            market_news_summary = DUMMY_MARKET_NEWS.get(property_context.property_type)
 
         combined_context = CombinedContext(
             task_context=task,
@@ -47,5 +107,5 @@ class ContextualizerAgent(Agent):
             loan_context=loan_context,
             market_news_summary=market_news_summary
         )
-        print(f"[{self.name}] Context gathered for task {task.task_id}.")
-        return combined_context
\ No newline at end of file
+        self.log.debug("Context gathered for task %s.", task.task_id, extra={"task_id": task.task_id})
+        return combined_context
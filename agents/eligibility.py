@@ -0,0 +1,182 @@
+# cmbs_reminder_system/agents/eligibility.py
+from .base import Agent, r
+from .task_manager import TaskManagerAgent
+from models import Task
+from typing import List, Optional, Dict, Any, Callable
+import datetime
+import threading
+import uuid
+
+class ReminderEligibilityEngine(Agent):
+    """
+    Keeps the set of tasks currently due for a reminder materialized in Redis, so a sweep does
+    work in proportion to what changed rather than to the portfolio.
+
+    Each tick (one per sweep) re-evaluates only
+    - tasks whose next reminder time (tasks:open:by_next_reminder) passed since the last tick, and
+    - tasks named in task_events since the last tick (created, status changed, reminder sent).
+    Tasks found due go into one sorted set per priority (eligibility:due:<priority>) and stay there
+    until an event or re-check shows they are no longer due, so failed sends are retried next tick.
+    Due tasks are re-checked against their full record before being returned, which also drops
+    entries left stale by concurrent ticks.
+
+    The first tick, and a tick after the event stream was trimmed past the stored cursor, evaluates
+    every task whose reminder time has passed. A request for an earlier date than the last tick is
+    answered by the full due check and leaves the materialized state alone. Only the default reminder
+    policy is materialized.
+    """
+    STATE_KEY = "eligibility:state"
+    DUE_PRIORITY_KEY = "eligibility:due_priority"
+
+    def __init__(self, task_manager: TaskManagerAgent, event_batch_size: int = 1000):
+        super().__init__("ReminderEligibilityEngine")
+        self.task_manager = task_manager
+        self.event_batch_size = event_batch_size
+        self._lock = threading.Lock()
+        self._last_tick_stats: Dict[str, Any] = {}
+
+    @staticmethod
+    def _due_key(priority: str) -> str:
+        return f"eligibility:due:{priority}"
+
+    def tick(self, current_date: datetime.date) -> Dict[str, Any]:
+        """Brings the due sets up to date for `current_date`; returns counts of the work done."""
+        with self._lock:
+            now = datetime.datetime.combine(current_date, datetime.time.min)
+            state = r.hgetall(self.STATE_KEY)
+            last_tick = datetime.datetime.fromisoformat(state["last_tick"]) if "last_tick" in state else None
+            cursor = state.get("last_event_id", "0-0")
+
+            full = last_tick is None or (cursor != "0-0" and not self.task_manager.event_exists(cursor))
+            changed: List[str] = []
+            if full:
+                # Take the cursor before reading the index, so no later change is missed.
+                cursor = self.task_manager.last_event_id()
+                self._clear_due_sets()
+                fired = self.task_manager.get_fired_task_ids(None, now)
+            else:
+                while True:
+                    events = self.task_manager.read_events(cursor, count=self.event_batch_size)
+                    if not events:
+                        break
+                    changed.extend(fields["task_id"] for _, fields in events)
+                    cursor = events[-1][0]
+                fired = self.task_manager.get_fired_task_ids(last_tick, now) if now > last_tick else []
+
+            candidates = list(dict.fromkeys(fired + changed))
+            due = self._evaluate(candidates, current_date)
+            r.hset(self.STATE_KEY, mapping={"last_tick": max(now, last_tick or now).isoformat(), "last_event_id": cursor})
+            self._last_tick_stats = {"current_date": current_date.isoformat(), "full": full, "events": len(changed),
+                                     "fired": len(fired), "evaluated": len(candidates), "became_due": due}
+            return dict(self._last_tick_stats)
+
+    def _evaluate(self, task_ids: List[str], current_date: datetime.date) -> int:
+        """Moves each task into or out of the due sets; returns how many are due."""
+        if not task_ids:
+            return 0
+        stubs = self.task_manager.get_reminder_stubs(task_ids)
+        previous = r.hmget(self.DUE_PRIORITY_KEY, task_ids)
+        due = 0
+        pipe = r.pipeline()
+        for task_id, task, previous_priority in zip(task_ids, stubs, previous):
+            is_due = task is not None and self.task_manager.is_due_for_reminder(task, current_date)
+            if previous_priority is not None and (not is_due or previous_priority != task.priority):
+                pipe.zrem(self._due_key(previous_priority), task_id)
+                pipe.hdel(self.DUE_PRIORITY_KEY, task_id)
+            if is_due:
+                due += 1
+                pipe.zadd(self._due_key(task.priority), {task_id: task.due_date.toordinal()})
+                pipe.hset(self.DUE_PRIORITY_KEY, task_id, task.priority)
+        pipe.execute()
+        return due
+
+    def _clear_due_sets(self):
+        priorities = set(r.hvals(self.DUE_PRIORITY_KEY))
+        r.delete(self.DUE_PRIORITY_KEY, *[self._due_key(priority) for priority in priorities])
+
+    def _drop(self, task_ids: List[str]):
+        priorities = r.hmget(self.DUE_PRIORITY_KEY, task_ids)
+        pipe = r.pipeline()
+        for task_id, priority in zip(task_ids, priorities):
+            if priority is not None:
+                pipe.zrem(self._due_key(priority), task_id)
+            pipe.hdel(self.DUE_PRIORITY_KEY, task_id)
+        pipe.execute()
+
+    def _last_tick(self) -> Optional[datetime.datetime]:
+        last_tick = r.hget(self.STATE_KEY, "last_tick")
+        return datetime.datetime.fromisoformat(last_tick) if last_tick else None
+
+    def get_tasks_due_for_reminder(self, current_date: datetime.date, priorities: Optional[List[str]] = None,
+                                   assigned_to: Optional[List[str]] = None, include: Optional[Callable[[Task], bool]] = None,
+                                   limit: Optional[int] = None) -> List[Task]:
+        """
+        Drop-in for TaskManagerAgent.get_tasks_due_for_reminder, served from the materialized due sets in
+        due-date order. With `limit`, the due sets are merged server-side and ranged a page at a time.
+        """
+        last_tick = self._last_tick()
+        if last_tick is not None and datetime.datetime.combine(current_date, datetime.time.min) < last_tick:
+            return self.task_manager.get_tasks_due_for_reminder(current_date, priorities=priorities, assigned_to=assigned_to,
+                                                                include=include, limit=limit)
+        self.tick(current_date)
+        if priorities is None:
+            priorities = list(set(r.hvals(self.DUE_PRIORITY_KEY)))
+        recipients = set(assigned_to) if assigned_to else None
+
+        if limit is None:
+            pipe = r.pipeline(transaction=False)
+            for priority in priorities:
+                pipe.zrange(self._due_key(priority), 0, -1, withscores=True)
+            scored = {task_id: score for entries in (pipe.execute() if priorities else []) for task_id, score in entries}
+            tasks = self._check_due(sorted(scored, key=lambda task_id: (scored[task_id], task_id)), current_date, recipients, include)
+        else:
+            tasks = self._page_due(priorities, current_date, recipients, include, limit)
+        self.log.info("%s tasks due for reminder on %s (%s re-evaluated this tick).",
+                      len(tasks), current_date, self._last_tick_stats.get('evaluated', 0))
+        return tasks
+
+    def _page_due(self, priorities: List[str], current_date: datetime.date, recipients: Optional[set],
+                  include: Optional[Callable[[Task], bool]], limit: int) -> List[Task]:
+        if not priorities:
+            return []
+        keys = [self._due_key(priority) for priority in priorities]
+        due_key = keys[0]
+        if len(keys) > 1:
+            # A scratch union (by due date, ties by task id) that expires on its own if this process dies.
+            due_key = f"eligibility:due:page:{uuid.uuid4().hex}"
+            pipe = r.pipeline()
+            pipe.zunionstore(due_key, keys, aggregate="MIN")
+            pipe.expire(due_key, 300)
+            pipe.execute()
+        try:
+            tasks: List[Task] = []
+            page_size = max(limit, self.task_manager.due_scan_page_size)
+            start = 0
+            while len(tasks) < limit:
+                due_ids = r.zrange(due_key, start, start + page_size - 1)
+                tasks.extend(self._check_due(due_ids, current_date, recipients, include))
+                if len(due_ids) < page_size:
+                    break
+                start += page_size
+            return tasks[:limit]
+        finally:
+            if due_key not in keys:
+                r.delete(due_key)
+
+    def _check_due(self, due_ids: List[str], current_date: datetime.date, recipients: Optional[set],
+                   include: Optional[Callable[[Task], bool]]) -> List[Task]:
+        """Re-checks due ids against their full records, dropping stale ones, then applies the filters in order."""
+        tasks, stale = [], []
+        for task_id, task in zip(due_ids, self.task_manager.get_tasks(due_ids)):
+            if task is not None and self.task_manager.is_due_for_reminder(task, current_date):
+                tasks.append(task)
+            else:
+                stale.append(task_id)
+        if stale:
+            self._drop(stale)
+        tasks = [task for task in tasks if recipients is None or task.assigned_to in recipients]
+        self.task_manager.attach_dependency_statuses(tasks)
+        return [task for task in tasks if include is None or include(task)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"last_tick": dict(self._last_tick_stats), "due": r.hlen(self.DUE_PRIORITY_KEY)}
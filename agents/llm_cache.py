@@ -0,0 +1,131 @@
+# cmbs_reminder_system/agents/llm_cache.py
+from .base import r
+from models import CombinedContext
+from collections import OrderedDict
+from typing import Optional, Dict
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Bump when the prompt changes in a way that should invalidate cached reminders.
+CACHE_VERSION = "v2"
+
+# (upper bound in days overdue, bucket label); days <= 0 are handled separately.
+_OVERDUE_BUCKETS = [(3, "overdue_1_3"), (7, "overdue_4_7"), (14, "overdue_8_14"), (30, "overdue_15_30")]
+
+def overdue_bucket(due_date: datetime.date, today: datetime.date) -> str:
+    """Coarse overdue band used wherever the exact day count should not matter."""
+    days_overdue = (today - due_date).days
+    if days_overdue < 0:
+        return "due_soon"
+    if days_overdue == 0:
+        return "due_today"
+    for upper_bound, label in _OVERDUE_BUCKETS:
+        if days_overdue <= upper_bound:
+            return label
+    return "overdue_30_plus"
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of LLM reminder output.
+    L1 is an in-process LRU; L2 is Redis with a TTL, bounded to `max_entries` by
+    evicting the least recently used keys (tracked in a sorted set of access times).
+    """
+    def __init__(self, namespace: str = "llm_cache", ttl_seconds: Optional[int] = None,
+                 max_entries: Optional[int] = None, l1_max_entries: Optional[int] = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds or int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+        self.l1_max_entries = l1_max_entries or int(os.getenv("LLM_CACHE_L1_MAX_ENTRIES", 2000))
+        self._lru_key = f"{namespace}:lru"
+        self._l1: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def make_key(self, context: CombinedContext, today: datetime.date) -> str:
+        task = context.task_context
+        inputs = {
+            "version": CACHE_VERSION,
+            "task": task.model_dump(mode="json", exclude={"last_reminder_sent", "dependent_tasks_status"}),
+            "dependencies": dict(sorted(task.dependent_tasks_status.items())),
+            "property": context.property_context.model_dump(mode="json") if context.property_context else None,
+            "loan": context.loan_context.model_dump(mode="json") if context.loan_context else None,
+            "market_news": context.market_news_summary,
+            "overdue_bucket": overdue_bucket(task.due_date, today),
+        }
+        payload = json.dumps(_normalize(inputs), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _remember(self, key: str, value: str):
+        with self._lock:
+            self._l1[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._l1.move_to_end(key)
+                self._counters["l1_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._l1[key]
+
+        pipe = r.pipeline(transaction=False)
+        pipe.get(self._redis_key(key))
+        pipe.zadd(self._lru_key, {key: time.time()}, xx=True)
+        value, _ = pipe.execute()
+        if value is None:
+            self._count("misses")
+            return None
+        self._count("l2_hits")
+        self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        pipe = r.pipeline(transaction=False)
+        pipe.set(self._redis_key(key), value, ex=self.ttl_seconds)
+        pipe.zadd(self._lru_key, {key: now})
+        # Drop bookkeeping for entries Redis has already expired.
+        pipe.zremrangebyscore(self._lru_key, "-inf", now - self.ttl_seconds)
+        pipe.zcard(self._lru_key)
+        size = pipe.execute()[-1]
+
+        if size > self.max_entries:
+            evicted = r.zpopmin(self._lru_key, size - self.max_entries)
+            if evicted:
+                r.delete(*[self._redis_key(member) for member, _ in evicted])
+                self._count("evictions", len(evicted))
+        self._count("stores")
+        self._remember(key, value)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["l1_entries"] = len(self._l1)
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["l1_hits"] + stats["l2_hits"]) / lookups if lookups else 0.0
+        stats["l2_entries"] = r.zcard(self._lru_key)
+        return stats
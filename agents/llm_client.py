@@ -0,0 +1,182 @@
+# cmbs_reminder_system/agents/llm_client.py
+from .telemetry import Span, span, record_llm_tokens
+from typing import Optional, Any
+import os
+import random
+import threading
+import time
+
+# HTTP status codes (as exposed on google.api_core exceptions' `code`) worth retrying.
+RETRIABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRIABLE_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                         "DeadlineExceeded", "GatewayTimeout", "TimeoutError", "ConnectionError"}
+
+class LLMCallError(Exception):
+    """Typed failure of an LLM call; `retriable` tells whether the provider was unhealthy rather than the request bad."""
+    def __init__(self, message: str, retriable: bool = False):
+        super().__init__(message)
+        self.retriable = retriable
+
+class CircuitOpenError(LLMCallError):
+    """Raised without calling the provider while the circuit breaker is open."""
+    def __init__(self, message: str = "LLM provider circuit breaker is open."):
+        super().__init__(message, retriable=True)
+
+def is_retriable(error: Exception) -> bool:
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in RETRIABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRIABLE_ERROR_NAMES
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`; `acquire` blocks until tokens are available."""
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+                self._updated_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait_seconds = (amount - self._tokens) / self.rate_per_second
+            time.sleep(wait_seconds)
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. After `reset_timeout_seconds` a single
+    trial request is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+class ResilientLLMClient:
+    """
+    Wraps a Gemini-style model (anything with generate_content(prompt)) with RPM/TPM rate limiting,
+    jittered exponential retry on retriable errors, and a circuit breaker. Failures raise LLMCallError.
+    """
+    # Rough output allowance charged against the TPM budget on top of the prompt estimate.
+    OUTPUT_TOKEN_ALLOWANCE = 600
+
+    def __init__(self, model: Any, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_retries: Optional[int] = None, base_delay_seconds: float = 1.0, max_delay_seconds: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.model = model
+        self.request_limiter = TokenBucket(requests_per_minute or float(os.getenv("GEMINI_RPM", 60)))
+        self.token_limiter = TokenBucket(tokens_per_minute or float(os.getenv("GEMINI_TPM", 1000000)))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("GEMINI_MAX_RETRIES", 4))
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", 5)),
+            reset_timeout_seconds=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", 30)),
+        )
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return len(text) // 4 + 1
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        # "Full jitter": uniform over [0, capped exponential delay].
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt))
+
+    def generate(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        """
+        Sends `prompt` with `system_instruction`: as the model's own system instruction when it declares
+        `supports_system_instruction`, so the provider can reuse it across calls, and otherwise as an
+        unchanging prefix of the prompt.
+        """
+        with span("llm_call") as call:
+            return self._generate(prompt, system_instruction, call)
+
+    def _generate(self, prompt: str, system_instruction: Optional[str], call: Span) -> str:
+        if not self.breaker.allow_request():
+            raise CircuitOpenError()
+
+        if system_instruction and not getattr(self.model, "supports_system_instruction", False):
+            prompt, system_instruction = f"{system_instruction}\n\n{prompt}", None
+        prompt_tokens = self.estimate_tokens(prompt) + (self.estimate_tokens(system_instruction) if system_instruction else 0)
+        estimated_tokens = prompt_tokens + self.OUTPUT_TOKEN_ALLOWANCE
+        # Every exit settles the breaker, so a half-open trial request can never leave it half-open.
+        healthy = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                call.set("attempts", attempt + 1)
+                self.request_limiter.acquire()
+                self.token_limiter.acquire(estimated_tokens)
+                try:
+                    if system_instruction:
+                        response = self.model.generate_content(prompt, system_instruction=system_instruction)
+                    else:
+                        response = self.model.generate_content(prompt)
+                except Exception as e:
+                    if not is_retriable(e):
+                        # A provider rejecting this request (an HTTP-style code such as 400) still answered;
+                        # anything else (e.g. the model failing to load) counts against the provider.
+                        healthy = isinstance(getattr(e, "code", None), int)
+                        raise LLMCallError(f"LLM request failed: {e}", retriable=False) from e
+                    if attempt == self.max_retries:
+                        raise LLMCallError(f"LLM request failed after {attempt + 1} attempts: {e}", retriable=True) from e
+                    time.sleep(self._backoff_seconds(attempt))
+                    continue
+
+                healthy = True
+                if not response.candidates:
+                    raise LLMCallError("LLM returned no candidates for the prompt.", retriable=False)
+                # Assuming the first candidate is the desired response
+                text = response.candidates[0].content.parts[0].text
+                self._record_usage(call, response, prompt_tokens, text)
+                return text
+        finally:
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def _record_usage(self, call: Span, response: Any, estimated_prompt_tokens: int, text: str):
+        # The provider's counts when it reports them (Gemini's usage_metadata), estimates otherwise.
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        completion_tokens = getattr(usage, "candidates_token_count", None)
+        call.set("token_source", "provider" if prompt_tokens is not None else "estimate")
+        if prompt_tokens is None:
+            prompt_tokens = estimated_prompt_tokens
+        if completion_tokens is None:
+            completion_tokens = self.estimate_tokens(text)
+        call.set("prompt_tokens", prompt_tokens)
+        call.set("completion_tokens", completion_tokens)
+        record_llm_tokens(prompt_tokens, completion_tokens)
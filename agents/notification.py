@@ -1,17 +1,93 @@
 # cmbs_reminder_system/agents/notification.py
-from .base import Agent
+from .base import Agent, r
+from .channels import Channel, Delivery, channels_from_env
+from .telemetry import span
+from models import DeliveryReceipt
+from concurrent.futures import Future
+from typing import Optional, List
+import os
+import threading
+
+class DeliveryOutcomeUnknown(TimeoutError):
+    """A send timed out while a channel was already sending it, so the reminder may or may not have gone out."""
 
 class NotificationAgent(Agent):
     """
     Handles dispatching reminders via various channels (e.g., email, Slack).
+
+    Every reminder goes to each configured channel's send queue. Channels send in micro-batches
+    over pooled connections with their own concurrency limits, so many concurrent callers share a
+    few connections. Each send leaves a DeliveryReceipt in the delivery_receipts stream. A reminder
+    counts as sent once at least one channel delivered it.
+
+    A send that times out withdraws every delivery still queued, so nothing goes out after the
+    caller has given up on it. If a channel had already taken the message, the outcome is unknown
+    and `send_reminder` raises DeliveryOutcomeUnknown.
     """
-    def __init__(self):
+    RECEIPTS_STREAM_KEY = "delivery_receipts"
+
+    def __init__(self, channels: Optional[List[Channel]] = None, send_timeout_seconds: Optional[float] = None,
+                 receipts_max_len: Optional[int] = None):
         super().__init__("NotificationAgent")
+        self.channels = channels if channels is not None else channels_from_env()
+        self.send_timeout_seconds = send_timeout_seconds or float(os.getenv("NOTIFICATION_SEND_TIMEOUT_SECONDS", 30))
+        self.receipts_max_len = receipts_max_len or int(os.getenv("NOTIFICATION_RECEIPTS_MAX_LEN", 100000))
+        for channel in self.channels:
+            channel.receipt_sink = self._record_receipts
+        self.log.info("Channels: %s.", ', '.join(channel.name for channel in self.channels) or 'none')
+
+    def _record_receipts(self, receipts: List[DeliveryReceipt]):
+        pipe = r.pipeline(transaction=False)
+        for receipt in receipts:
+            pipe.xadd(self.RECEIPTS_STREAM_KEY, {"receipt": receipt.model_dump_json()},
+                      maxlen=self.receipts_max_len, approximate=True)
+        pipe.execute()
+
+    def send_reminder_async(self, recipient: str, subject: str, message: str, task_ids: Optional[List[str]] = None) -> "Future[bool]":
+        """Queues the reminder on every channel; the future resolves once all channels have reported."""
+        return self._submit([Delivery(recipient, subject, message, task_ids) for _ in self.channels])
+
+    def _submit(self, deliveries: List[Delivery]) -> "Future[bool]":
+        futures = [channel.submit(delivery) for channel, delivery in zip(self.channels, deliveries)]
+        result: "Future[bool]" = Future()
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            result.set_result(any(future.result().status == "delivered" for future in futures))
+
+        if not futures:
+            result.set_result(False)
+        for future in futures:
+            future.add_done_callback(on_done)
+        return result
+
+    def send_reminder(self, recipient: str, subject: str, message: str, task_ids: Optional[List[str]] = None) -> bool:
+        with span("notify", recipient=recipient, tasks=len(task_ids or [])) as notify:
+            deliveries = [Delivery(recipient, subject, message, task_ids) for _ in self.channels]
+            try:
+                sent = self._submit(deliveries).result(timeout=self.send_timeout_seconds)
+            except TimeoutError:
+                self.log.warning("Timed out after %gs waiting to send '%s' to %s.", self.send_timeout_seconds, subject, recipient)
+                taken = [delivery for delivery in deliveries if not delivery.cancel()]
+                if any(delivery.future.done() and delivery.future.result().status == "delivered" for delivery in taken):
+                    sent = True
+                elif any(not delivery.future.done() for delivery in taken):
+                    raise DeliveryOutcomeUnknown(f"Timed out after {self.send_timeout_seconds:g}s while '{subject}' was being sent to {recipient}")
+                else:
+                    sent = False
+            notify.set("sent", sent)
+            return sent
+
+    def recent_receipts(self, count: int = 50) -> List[DeliveryReceipt]:
+        return [DeliveryReceipt.model_validate_json(fields["receipt"])
+                for _, fields in r.xrevrange(self.RECEIPTS_STREAM_KEY, count=count)]
 
-    def send_reminder(self, recipient: str, subject: str, message: str) -> bool:
-        print(f"\n--- [{self.name}] Sending Reminder ---")
-        print(f"To: {recipient}")
-        print(f"Subject: {subject}")
-        print(f"Message (truncated):\n{message[:500]}...")
-        print(f"------------------------------------\n")
-        return True
\ No newline at end of file
+    def close(self):
+        """Flushes every channel's queue and closes its connections."""
+        for channel in self.channels:
+            channel.close()
@@ -1,43 +1,378 @@
 # cmbs_reminder_system/agents/orchestrator.py
 from .base import Agent
-from .task_manager import TaskManagerAgent
+from .task_manager import TaskManagerAgent, ReminderClaim
 from .contextualizer import ContextualizerAgent
 from .prompt_generator import GenAIPromptGeneratorAgent
-from .notification import NotificationAgent
-from ..models import ReminderRequest, ReminderResponse, Task
-from typing import List
+from .notification import NotificationAgent, DeliveryOutcomeUnknown
+from .work_queue import ReminderWorkQueue
+from .eligibility import ReminderEligibilityEngine
+from .telemetry import span, record_reminder_outcome
+from models import ReminderRequest, ReminderResponse, Task
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Optional, Any, Callable
+import contextvars
 import datetime
+import os
+import threading
+import time
+
+class _GenerationJob:
+    """
+    Context + LLM stage for one unit of work (a single task, or a batch of one recipient's tasks).
+    Its timeout runs from when it was queued, so a job stuck behind a provider call that never
+    returns still times out. A job that timed out is marked cancelled: it never starts if it was
+    still queued, stops before its next task otherwise, and its results are never delivered.
+    """
+    def __init__(self, tasks: List[Task]):
+        self.tasks = tasks
+        self.cancelled = threading.Event()
+        self.queued_at = time.monotonic()
+        self.future: Optional[Future] = None
+
+class _ResponseCollector(dict):
+    """Responses by task id; `add` also passes each one to the sweep's `on_response` callback as it completes."""
+    def __init__(self, on_response: Optional[Callable[[ReminderResponse], None]] = None):
+        super().__init__()
+        self.on_response = on_response
+
+    def add(self, response: ReminderResponse):
+        self[response.task_id] = response
+        if self.on_response is not None:
+            self.on_response(response)
 
 class OrchestratorAgent(Agent):
     """
     Coordinates the entire reminder workflow. Delegates tasks to other agents.
+
+    With max_concurrency > 1, context gathering and LLM generation run on a bounded
+    thread pool so LLM latency overlaps across tasks. Notifications to the same recipient
+    are still sent one at a time, in due-task order.
+
+    In batch mode, each recipient's tasks are generated together in batched LLM requests;
+    with digest enabled, each recipient gets a single email covering all of their reminders.
+
+    With an eligibility engine, due tasks come from its incrementally maintained due sets
+    instead of a due check over every task whose reminder time has passed.
+
+    `blocked_policy` decides what happens to due tasks blocked by unresolved dependencies:
+    "remind" treats them like any other, "defer" processes them after the unblocked ones,
+    and "suppress" skips them until their dependencies are resolved.
     """
-    def __init__(self, task_manager: TaskManagerAgent, contextualizer: ContextualizerAgent, 
-                 prompt_generator: GenAIPromptGeneratorAgent, notifier: NotificationAgent):
+    BLOCKED_POLICIES = ("remind", "defer", "suppress")
+
+    def __init__(self, task_manager: TaskManagerAgent, contextualizer: ContextualizerAgent,
+                 prompt_generator: GenAIPromptGeneratorAgent, notifier: NotificationAgent,
+                 max_concurrency: Optional[int] = None, task_timeout_seconds: Optional[float] = None,
+                 batch_mode: Optional[bool] = None, digest: Optional[bool] = None,
+                 eligibility: Optional[ReminderEligibilityEngine] = None, blocked_policy: Optional[str] = None):
         super().__init__("OrchestratorAgent")
         self.task_manager = task_manager
         self.contextualizer = contextualizer
         self.prompt_generator = prompt_generator
         self.notifier = notifier
+        self.max_concurrency = max_concurrency or int(os.getenv("REMINDER_MAX_CONCURRENCY", 1))
+        self.task_timeout_seconds = task_timeout_seconds or float(os.getenv("REMINDER_TASK_TIMEOUT_SECONDS", 120))
+        self.batch_mode = batch_mode if batch_mode is not None else os.getenv("REMINDER_BATCH_MODE", "false").lower() == "true"
+        self.digest = digest if digest is not None else os.getenv("REMINDER_DIGEST", "false").lower() == "true"
+        self.eligibility = eligibility
+        self.blocked_policy = blocked_policy or os.getenv("REMINDER_BLOCKED_POLICY", "remind")
+        if self.blocked_policy not in self.BLOCKED_POLICIES:
+            raise ValueError(f"Unknown blocked-task policy '{self.blocked_policy}'; expected one of {', '.join(self.BLOCKED_POLICIES)}.")
+
+    def process_reminder_request(self, reminder_req: ReminderRequest,
+                                 on_response: Optional[Callable[[ReminderResponse], None]] = None) -> List[ReminderResponse]:
+        """
+        Runs a sweep and returns its responses in due-date order. `on_response`, if given, is called
+        with each response as soon as its task finishes (from worker threads when concurrent).
+        """
+        self.log.info("Received reminder request for date: %s", reminder_req.current_date)
 
-    def process_reminder_request(self, reminder_req: ReminderRequest) -> List[ReminderResponse]:
-        print(f"[{self.name}] Received reminder request for date: {reminder_req.current_date}")
-        responses = []
-        
-        tasks_to_remind = self.task_manager.get_tasks_due_for_reminder(reminder_req.current_date)
+        with span("sweep", current_date=reminder_req.current_date.isoformat(), dry_run=reminder_req.dry_run) as sweep:
+            tasks_to_remind = self._select_due_tasks(reminder_req)
+            sweep.set("tasks", len(tasks_to_remind))
+            if reminder_req.dry_run:
+                return self._dry_run(tasks_to_remind, on_response)
+            return self._process_tasks(tasks_to_remind, on_response)
 
+    def enqueue_reminder_sweep(self, reminder_req: ReminderRequest, queue: ReminderWorkQueue) -> tuple[str, int]:
+        """Selects the due tasks and queues them for reminder workers; returns the sweep id to poll and the number queued."""
+        tasks_to_remind = self._select_due_tasks(reminder_req)
+        sweep_id = queue.create_sweep(reminder_req.current_date, [task.task_id for task in tasks_to_remind])
+        self.log.info("Queued %s reminders as sweep %s.", len(tasks_to_remind), sweep_id)
+        return sweep_id, len(tasks_to_remind)
+
+    def _select_due_tasks(self, reminder_req: ReminderRequest) -> List[Task]:
+        source = self.eligibility or self.task_manager
+        with span("select", incremental=self.eligibility is not None) as selection:
+            query = dict(priorities=reminder_req.priorities, assigned_to=reminder_req.assigned_to)
+            if reminder_req.limit is None:
+                tasks = self._apply_blocked_policy(source.get_tasks_due_for_reminder(reminder_req.current_date, **query))
+            else:
+                # Only the requested page is read from the due index; the blocked policy is applied while reading.
+                wanted = reminder_req.offset + reminder_req.limit
+                is_blocked = self.task_manager.is_blocked
+                if self.blocked_policy == "remind":
+                    tasks = source.get_tasks_due_for_reminder(reminder_req.current_date, limit=wanted, **query)
+                else:
+                    tasks = source.get_tasks_due_for_reminder(reminder_req.current_date, include=lambda task: not is_blocked(task),
+                                                              limit=wanted, **query)
+                    if self.blocked_policy == "defer" and len(tasks) < wanted:
+                        tasks += source.get_tasks_due_for_reminder(reminder_req.current_date, include=is_blocked,
+                                                                   limit=wanted - len(tasks), **query)
+            tasks = tasks[reminder_req.offset:]
+            selection.set("tasks", len(tasks))
+            return tasks
+
+    def _apply_blocked_policy(self, tasks: List[Task]) -> List[Task]:
+        if self.blocked_policy == "remind":
+            return tasks
+        blocked = [task for task in tasks if self.task_manager.is_blocked(task)]
+        if not blocked:
+            return tasks
+        unblocked = [task for task in tasks if not self.task_manager.is_blocked(task)]
+        if self.blocked_policy == "suppress":
+            self.log.info("Suppressed %s reminders for tasks blocked by unresolved dependencies.", len(blocked))
+            return unblocked
+        return unblocked + blocked
+
+    def _dry_run(self, tasks: List[Task], on_response: Optional[Callable[[ReminderResponse], None]] = None) -> List[ReminderResponse]:
+        responses = _ResponseCollector(on_response)
+        for task in tasks:
+            responses.add(ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject="", message="", status="Due"))
+        return list(responses.values())
+
+    def process_queued_tasks(self, task_ids: List[str], current_date: datetime.date) -> List[ReminderResponse]:
+        """
+        Runs the reminder pipeline for task ids taken off the work queue. Eligibility is re-checked,
+        since the task may have changed or been reminded since it was queued. Responses are aligned with `task_ids`.
+        """
+        responses: Dict[str, ReminderResponse] = {}
+        tasks_to_remind: List[Task] = []
+        for task_id, task in zip(task_ids, self.task_manager.get_tasks(task_ids)):
+            if task is None:
+                responses[task_id] = ReminderResponse(task_id=task_id, recipient="", subject="Error", message="", status="Failed", error="Task not found")
+            elif task_id in responses or any(queued.task_id == task_id for queued in tasks_to_remind):
+                continue
+            elif not self.task_manager.is_due_for_reminder(task, current_date):
+                responses[task_id] = ReminderResponse(task_id=task_id, recipient=task.assigned_to, subject="", message="", status="Skipped")
+            else:
+                tasks_to_remind.append(task)
+
+        self.task_manager.attach_dependency_statuses(tasks_to_remind)
+        for response in self._process_tasks(tasks_to_remind):
+            responses[response.task_id] = response
+        return [responses[task_id] for task_id in task_ids]
+
+    def _process_tasks(self, tasks_to_remind: List[Task],
+                       on_response: Optional[Callable[[ReminderResponse], None]] = None) -> List[ReminderResponse]:
+        # Claim every reminder before any LLM work, so concurrent sweeps never generate or send the same one.
+        with span("claim", tasks=len(tasks_to_remind)):
+            claims = self.task_manager.claim_reminders(tasks_to_remind)
+        responses = _ResponseCollector(on_response)
+        for task in tasks_to_remind:
+            if task.task_id not in claims:
+                responses.add(ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject="", message="", status="Skipped",
+                                               error="Reminder is closed, in progress or already sent elsewhere."))
+        claimed_tasks = [task for task in tasks_to_remind if task.task_id in claims]
+        # Per-sweep memo of property/loan contexts shared by every task below.
+        prefetched = self.contextualizer.prefetch(claimed_tasks)
+
+        if self.batch_mode or self.digest or (self.max_concurrency > 1 and len(claimed_tasks) > 1):
+            self._process_in_units(claimed_tasks, claims, responses, prefetched)
+        else:
+            self._process_sequentially(claimed_tasks, claims, responses, prefetched)
         for task in tasks_to_remind:
+            if task.task_id not in responses:
+                responses.add(self._failed_response(task, claims[task.task_id], RuntimeError("No reminder was processed for this task.")))
+        for response in responses.values():
+            record_reminder_outcome(response.status)
+        return [responses[task.task_id] for task in tasks_to_remind]
+
+    def _generate(self, task: Task, prefetched: Optional[Dict[str, Any]] = None) -> tuple[str, str]:
+        combined_context = self.contextualizer.gather_context(task, prefetched)
+        return self.prompt_generator.generate_reminder_prompt(combined_context)
+
+    def _deliver(self, task: Task, claim: ReminderClaim, subject: str, message: str) -> ReminderResponse:
+        try:
+            success = self.notifier.send_reminder(task.assigned_to, subject, message, task_ids=[task.task_id])
+        except DeliveryOutcomeUnknown as e:
+            # A channel may still deliver it; committing keeps the next sweep from sending it a second time.
+            self.log.warning("%s; recording task %s as reminded.", e, task.task_id)
+            self.task_manager.commit_reminder(claim, datetime.datetime.now())
+            return ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject=subject, message=message,
+                                    status="Reminder Sent", error=f"Delivery unconfirmed: {e}")
+
+        if success:
+            self.task_manager.commit_reminder(claim, datetime.datetime.now())
+            return ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject=subject, message=message, status="Reminder Sent")
+        self.task_manager.release_reminder(claim)
+        return ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject=subject, message="", status="Failed to Send Reminder")
+
+    def _failed_response(self, task: Task, claim: ReminderClaim, error: Exception) -> ReminderResponse:
+        self.log.error("Error processing task %s: %s", task.task_id, error)
+        try:
+            self.task_manager.release_reminder(claim)
+        except Exception as e:
+            self.log.warning("Could not release claim on %s; it lapses on its own: %s", task.task_id, e)
+        return ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject="Error", message="", status="Failed", error=str(error))
+
+    def _process_sequentially(self, tasks: List[Task], claims: Dict[str, ReminderClaim], responses: _ResponseCollector,
+                              prefetched: Optional[Dict[str, Any]] = None):
+        """
+        One task at a time, in due order. Generation runs on a helper thread so the per-task timeout
+        applies here too; a generation that overruns is abandoned with its thread, and the next task
+        gets a fresh one.
+        """
+        generation_pool: Optional[ThreadPoolExecutor] = None
+        try:
+            for task in tasks:
+                if generation_pool is None:
+                    generation_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reminder-generate")
+                job = _GenerationJob([task])
+                job.future = generation_pool.submit(contextvars.copy_context().run, self._run_generation, job, prefetched)
+                try:
+                    subject, message = self._await_generation(job)[task.task_id]
+                    responses.add(self._deliver(task, claims[task.task_id], subject, message))
+                except Exception as e:
+                    if job.cancelled.is_set():
+                        generation_pool.shutdown(wait=False)
+                        generation_pool = None
+                    responses.add(self._failed_response(task, claims[task.task_id], e))
+        finally:
+            if generation_pool is not None:
+                generation_pool.shutdown(wait=False)
+
+    # --- Concurrent / batched execution ---
+
+    def _generate_batch(self, tasks: List[Task], prefetched: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Returns (subject, message), or the exception raised for that task, per task_id."""
+        results: Dict[str, Any] = {}
+        contexts = []
+        for task in tasks:
+            try:
+                contexts.append(self.contextualizer.gather_context(task, prefetched))
+            except Exception as e:
+                results[task.task_id] = e
+        if contexts:
+            results.update(self.prompt_generator.generate_reminder_prompts_batch(contexts))
+        return results
+
+    def _run_generation(self, job: _GenerationJob, prefetched: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if self.batch_mode:
+            return self._generate_batch(job.tasks, prefetched)
+        results = {}
+        for task in job.tasks:
+            if job.cancelled.is_set():
+                break
+            results[task.task_id] = self._generate(task, prefetched)
+        return results
+
+    def _await_generation(self, job: _GenerationJob) -> Dict[str, Any]:
+        remaining = job.queued_at + self.task_timeout_seconds - time.monotonic()
+        try:
+            return job.future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            # The claims are released once this raises; the job must not deliver after the next sweep re-claims them.
+            job.cancelled.set()
+            job.future.cancel()
+            raise TimeoutError(f"Reminder generation exceeded {self.task_timeout_seconds:g}s")
+
+    def _deliver_for_recipient(self, recipient: str, jobs: List[_GenerationJob], claims: Dict[str, ReminderClaim],
+                               responses: _ResponseCollector):
+        generated = []
+        for job in jobs:
+            try:
+                results = self._await_generation(job)
+            except Exception as e:
+                results = {task.task_id: e for task in job.tasks}
+            if job.cancelled.is_set():
+                # Never deliver anything a timed-out job produced: its claims are released and may be re-claimed.
+                results = {task_id: result for task_id, result in results.items() if isinstance(result, Exception)}
+
+            for task in job.tasks:
+                result = results.get(task.task_id, RuntimeError("No reminder was generated for this task."))
+                if isinstance(result, Exception):
+                    responses.add(self._failed_response(task, claims[task.task_id], result))
+                elif self.digest:
+                    generated.append((task, *result))
+                else:
+                    try:
+                        responses.add(self._deliver(task, claims[task.task_id], *result))
+                    except Exception as e:
+                        responses.add(self._failed_response(task, claims[task.task_id], e))
+
+        if len(generated) == 1:
+            task, subject, message = generated[0]
             try:
-                combined_context = self.contextualizer.gather_context(task)
-                subject, message = self.prompt_generator.generate_reminder_prompt(combined_context)
-                success = self.notifier.send_reminder(task.assigned_to, subject, message)
+                responses.add(self._deliver(task, claims[task.task_id], subject, message))
+            except Exception as e:
+                responses.add(self._failed_response(task, claims[task.task_id], e))
+        elif generated:
+            self._deliver_digest(recipient, generated, claims, responses)
 
+    def _deliver_digest(self, recipient: str, generated: List[tuple[Task, str, str]], claims: Dict[str, ReminderClaim],
+                        responses: _ResponseCollector):
+        try:
+            subject, message = self.prompt_generator.build_digest(recipient, [(task.task_id, task_subject, task_message) for task, task_subject, task_message in generated])
+            task_ids = [task.task_id for task, _, _ in generated]
+            try:
+                success, unconfirmed = self.notifier.send_reminder(recipient, subject, message, task_ids=task_ids), None
+            except DeliveryOutcomeUnknown as e:
+                # As in _deliver: commit, so the next sweep does not send a digest that may already be on its way.
+                self.log.warning("%s; recording %s tasks as reminded.", e, len(task_ids))
+                success, unconfirmed = True, f"Delivery unconfirmed: {e}"
+        except Exception as e:
+            for task, _, _ in generated:
+                responses.add(self._failed_response(task, claims[task.task_id], e))
+            return
+
+        sent_at = datetime.datetime.now()
+        for task, task_subject, task_message in generated:
+            try:
                 if success:
-                    self.task_manager.update_last_reminder_sent(task.task_id, datetime.datetime.now())
-                    responses.append(ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject=subject, message=message, status="Reminder Sent"))
+                    self.task_manager.commit_reminder(claims[task.task_id], sent_at)
+                    responses.add(ReminderResponse(task_id=task.task_id, recipient=recipient, subject=task_subject, message=task_message,
+                                                   status="Reminder Sent", error=unconfirmed))
                 else:
-                    responses.append(ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject=subject, message="", status="Failed to Send Reminder"))
+                    self.task_manager.release_reminder(claims[task.task_id])
+                    responses.add(ReminderResponse(task_id=task.task_id, recipient=recipient, subject=task_subject, message="", status="Failed to Send Reminder"))
             except Exception as e:
-                print(f"[{self.name}] Error processing task {task.task_id}: {e}")
-                responses.append(ReminderResponse(task_id=task.task_id, recipient=task.assigned_to, subject="Error", message="", status="Failed", error=str(e)))
-        return responses
\ No newline at end of file
+                responses.add(self._failed_response(task, claims[task.task_id], e))
+
+    def _process_in_units(self, tasks: List[Task], claims: Dict[str, ReminderClaim], responses: _ResponseCollector,
+                          prefetched: Optional[Dict[str, Any]] = None):
+        if not tasks:
+            return
+        self.log.info("Processing %s reminders with concurrency %s%s%s.", len(tasks), self.max_concurrency,
+                      ", batched" if self.batch_mode else "", ", as digests" if self.digest else "")
+        tasks_by_recipient: Dict[str, List[Task]] = {}
+        for task in tasks:
+            tasks_by_recipient.setdefault(task.assigned_to, []).append(task)
+        unit_size = self.prompt_generator.batch_size if self.batch_mode else 1
+
+        jobs_by_recipient: Dict[str, List[_GenerationJob]] = {}
+        generation_pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="reminder-generate")
+        try:
+            for recipient, recipient_tasks in tasks_by_recipient.items():
+                for start in range(0, len(recipient_tasks), unit_size):
+                    job = _GenerationJob(recipient_tasks[start:start + unit_size])
+                    # Run in a copy of this context so the job's spans stay in the sweep's trace.
+                    job.future = generation_pool.submit(contextvars.copy_context().run, self._run_generation, job, prefetched)
+                    jobs_by_recipient.setdefault(recipient, []).append(job)
+
+            delivery_workers = min(self.max_concurrency, len(jobs_by_recipient))
+            with ThreadPoolExecutor(max_workers=delivery_workers, thread_name_prefix="reminder-deliver") as delivery_pool:
+                deliveries = {recipient: delivery_pool.submit(contextvars.copy_context().run, self._deliver_for_recipient,
+                                                              recipient, jobs, claims, responses)
+                              for recipient, jobs in jobs_by_recipient.items()}
+            for recipient, delivery in deliveries.items():
+                error = delivery.exception()
+                if error is None:
+                    continue
+                self.log.error("Delivery to %s failed: %s", recipient, error)
+                for task in tasks_by_recipient[recipient]:
+                    if task.task_id not in responses:
+                        responses.add(self._failed_response(task, claims[task.task_id], error))
+        finally:
+            # Timed-out generations may still be running; don't block the sweep on them.
+            generation_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,183 @@
+# cmbs_reminder_system/agents/prompt_builder.py
+"""
+Reminder prompts in two parts:
+- a static system instruction (role, guidelines, example email), built once at import and sent
+  as the model's system instruction where supported, otherwise as an unchanging prompt prefix;
+- a compact per-task section kept within a token budget. When a section is over budget, long
+  free text is trimmed first, then optional fields are dropped in DROP_ORDER. The task's
+  identity, recipient, dates, status and priority are always kept.
+"""
+from .llm_client import ResilientLLMClient
+from models import CombinedContext, Blocker
+from typing import Optional, List, Dict, Tuple
+import datetime
+import os
+
+_REMINDER_GUIDELINES = """\
+- Clearly state the current status (e.g., overdue, due soon) and its exact duration (e.g., "overdue by X days").
+- **Emphasize the importance and potential implications** based on task type, property, and loan context (e.g., compliance risks, impact on valuation/surveillance, market trends, covenant breaches). A loan's DSCR covenant matters most for financial statements and performance reviews.
+- **Reference the last update** and suggest **concrete, actionable next steps** based on the current situation and previous attempts. If dependencies are met, mention that. If open dependencies or the last update notes suggest a blocker, provide advice to overcome it.
+- Maintain a professional, concise, and actionable tone suitable for an internal asset manager.
+- Address the reminder to the task's "Assigned To" recipient."""
+
+_EXAMPLE_REMINDER = """\
+Example for an overdue financial statement task:
+Subject: URGENT: Action Required - Overdue Q1 2025 Financial Statements for Grand Tower Office (PROP-GRND)
+
+Dear [Asset Manager Name],
+
+This is an urgent follow-up regarding your task **TASK-XXXX: [Description]** for **[Property Name] ([Property ID])**, associated with **Loan [Loan ID]**. The original due date was [Original Due Date], meaning this task is now **overdue by X days**.
+
+**Criticality & Impact:**
+Timely submission of these financials is paramount. [Explain loan covenant implications, market impact, etc.].
+
+**Current Status & Immediate Next Steps:**
+Your last update on [Last Update Date] indicated you "[Last Update Notes]". It's been [Days since last update] since your last outreach.
+
+**Please prioritize the following actions immediately:**
+1. [Concrete step 1]
+2. [Concrete step 2]
+3. [Concrete step 3, e.g., escalation]
+
+You should have all preliminary information, as dependent tasks like [List completed dependencies] are completed.
+
+Your prompt action on this overdue and critical item is highly appreciated to maintain loan compliance and ensure accurate portfolio reporting.
+
+Best regards,
+
+CMBS Asset Management System"""
+
+SYSTEM_INSTRUCTION = f"""You are an AI assistant specialized in CMBS (Commercial Mortgage-Backed Securities) asset management.
+Your goal is to generate a highly detailed, urgent, and actionable follow-up email reminder for an asset manager about the task in the request.
+The reminder should be professional, concise, and guide the user on critical next steps.
+
+The reminder should:
+- Start with "Subject: " followed by the email subject line, then two newlines, then the email body.
+{_REMINDER_GUIDELINES}
+
+{_EXAMPLE_REMINDER}"""
+
+BATCH_SYSTEM_INSTRUCTION = f"""You are an AI assistant specialized in CMBS (Commercial Mortgage-Backed Securities) asset management.
+Your goal is to generate one highly detailed, urgent, and actionable follow-up email reminder for each task in the request.
+Each reminder should be professional, concise, and guide the user on critical next steps.
+
+Each reminder should:
+{_REMINDER_GUIDELINES}
+
+{_EXAMPLE_REMINDER}
+
+Respond with a single JSON object and nothing else. Use each Task ID as a key, mapped to an object
+with a "subject" string (the email subject line) and a "body" string (the email body), for example:
+{{"TASK-0001": {{"subject": "...", "body": "..."}}}}"""
+
+# Optional fields, least useful first: the order they are dropped in when a task's section is over budget.
+DROP_ORDER = ("market_news", "property", "completed_dependencies", "upstream_blockers", "loan", "last_update", "open_dependencies")
+
+class BuiltPrompt:
+    """A prompt's static system instruction and per-call text, with what the budget removed."""
+    def __init__(self, system_instruction: str, text: str, dropped: List[str], trimmed: bool):
+        self.system_instruction = system_instruction
+        self.text = text
+        self.dropped = dropped
+        self.trimmed = trimmed
+
+    @property
+    def static_tokens(self) -> int:
+        return ResilientLLMClient.estimate_tokens(self.system_instruction)
+
+    @property
+    def dynamic_tokens(self) -> int:
+        return ResilientLLMClient.estimate_tokens(self.text)
+
+class PromptBuilder:
+    """Builds budgeted reminder prompts; `token_budget` applies to each task's section."""
+    def __init__(self, token_budget: Optional[int] = None, max_text_chars: Optional[int] = None):
+        self.token_budget = token_budget or int(os.getenv("PROMPT_TOKEN_BUDGET", 400))
+        self.max_text_chars = max_text_chars or int(os.getenv("PROMPT_MAX_TEXT_CHARS", 300))
+
+    def build(self, context: CombinedContext, today: datetime.date) -> BuiltPrompt:
+        text, dropped, trimmed = self.task_section(context, today)
+        return BuiltPrompt(SYSTEM_INSTRUCTION, text, dropped, trimmed)
+
+    def build_batch(self, contexts: List[CombinedContext], today: datetime.date) -> BuiltPrompt:
+        sections, dropped, trimmed = [], [], False
+        for context in contexts:
+            text, section_dropped, section_trimmed = self.task_section(context, today)
+            sections.append(f"### Task {context.task_context.task_id}\n{text}")
+            dropped.extend(f"{context.task_context.task_id}:{field}" for field in section_dropped)
+            trimmed = trimmed or section_trimmed
+        return BuiltPrompt(BATCH_SYSTEM_INSTRUCTION, "\n\n".join(sections), dropped, trimmed)
+
+    def task_section(self, context: CombinedContext, today: datetime.date) -> Tuple[str, List[str], bool]:
+        """The task's fields, one per line, within budget; also returns the dropped fields and whether text was trimmed."""
+        fields = self._fields(context, today, trim=False)
+        if self._tokens(fields) <= self.token_budget:
+            return self._join(fields), [], False
+        fields = self._fields(context, today, trim=True)
+        dropped = []
+        for name in DROP_ORDER:
+            if self._tokens(fields) <= self.token_budget:
+                break
+            if any(field == name for field, _ in fields):
+                fields = [(field, line) for field, line in fields if field != name]
+                dropped.append(name)
+        return self._join(fields), dropped, True
+
+    def _fields(self, context: CombinedContext, today: datetime.date, trim: bool) -> List[Tuple[Optional[str], str]]:
+        """(field, line) pairs; required lines have no field name and are never dropped."""
+        task = context.task_context
+        text = self._trim if trim else (lambda value: value)
+        days = (task.due_date - today).days
+        timing = "due today" if days == 0 else f"overdue by {-days} days" if days < 0 else f"due in {days} days"
+        status = f"Status: {task.status}; Priority: {task.priority}" + (f"; Type: {task.task_type}" if task.task_type else "")
+        fields: List[Tuple[Optional[str], str]] = [
+            (None, f"Task ID: {task.task_id}"),
+            (None, f"Description: {text(task.description)}"),
+            (None, f"Assigned To: {task.assigned_to}"),
+            (None, f"Due Date: {task.due_date:%Y-%m-%d} ({timing}; today is {today:%Y-%m-%d})"),
+            (None, status),
+        ]
+        assets = [f"Property {task.property_id}" if task.property_id else None, f"Loan {task.loan_id}" if task.loan_id else None]
+        if any(assets):
+            fields.append((None, f"Assets: {', '.join(asset for asset in assets if asset)}"))
+
+        prop, loan = context.property_context, context.loan_context
+        if prop:
+            size = f", {prop.square_footage:,} sq ft" if prop.square_footage else ""
+            fields.append(("property", f"Property: {prop.property_type}, {prop.occupancy_rate * 100:.0f}% occupied{size}"))
+        if loan:
+            fields.append(("loan", f"Loan: {loan.loan_type}, matures {loan.maturity_date:%Y-%m-%d}, DSCR covenant {loan.dscr_covenant or 'N/A'}"))
+        if task.last_update_notes or task.last_update_date:
+            updated = f"{task.last_update_date:%Y-%m-%d}" if task.last_update_date else "N/A"
+            fields.append(("last_update", f"Last Update ({updated}): {text(task.last_update_notes or 'None')}"))
+
+        completed = [dep_id for dep_id, status in task.dependent_tasks_status.items() if status == "Completed"]
+        if completed:
+            fields.append(("completed_dependencies", f"Completed Dependencies: {', '.join(completed)}"))
+        blockers = {blocker.task_id: blocker for blocker in task.blocker_chain}
+        open_dependencies = [self._describe(dep_id, status, blockers) for dep_id, status in task.dependent_tasks_status.items() if status != "Completed"]
+        if open_dependencies:
+            fields.append(("open_dependencies", f"Open Dependencies: {'; '.join(open_dependencies)}"))
+        upstream = [self._describe(blocker.task_id, blocker.status, blockers) for blocker in task.blocker_chain
+                    if blocker.task_id not in task.dependent_tasks_status]
+        if upstream:
+            fields.append(("upstream_blockers", f"Upstream Blockers: {'; '.join(upstream)}"))
+        if context.market_news_summary:
+            fields.append(("market_news", f"Market Insight: {text(context.market_news_summary)}"))
+        return fields
+
+    @staticmethod
+    def _describe(task_id: str, status: str, blockers: Dict[str, Blocker]) -> str:
+        blocker = blockers.get(task_id)
+        waiting = f" (waiting on {', '.join(blocker.waiting_on)})" if blocker and blocker.waiting_on else ""
+        return f"{task_id} {status}{waiting}"
+
+    def _trim(self, value: str) -> str:
+        return value if len(value) <= self.max_text_chars else value[:self.max_text_chars - 3].rstrip() + "..."
+
+    @staticmethod
+    def _join(fields: List[Tuple[Optional[str], str]]) -> str:
+        return "\n".join(line for _, line in fields)
+
+    def _tokens(self, fields: List[Tuple[Optional[str], str]]) -> int:
+        return ResilientLLMClient.estimate_tokens(self._join(fields))
@@ -1,149 +1,298 @@
 # cmbs_reminder_system/agents/prompt_generator.py
 from .base import Agent
-from ..models import CombinedContext
+from .llm_cache import LLMResponseCache
+from .llm_client import ResilientLLMClient, LLMCallError, CircuitOpenError
+from .templates import ReminderTemplateRouter, TierStats
+from .prompt_builder import PromptBuilder, BuiltPrompt
+from .telemetry import Span, get_logger, span
+from models import CombinedContext
 import datetime
+import json
 import os # To get API key from environment variables
+import threading
+import time
+from typing import Optional, Any, List, Dict
 
-# Import the Google Generative AI SDK
-import google.generativeai as genai
-
-class GenAIPromptGeneratorAgent(Agent):
+class LazyGeminiModel:
     """
-    Leverages a Generative AI model (LLM) to create highly detailed,
-    context-aware reminder messages.
+    Stands in for genai.GenerativeModel until the model is first needed. The Google SDK is
+    imported and configured on the first generate_content call (or `load`), so constructing
+    the agent is cheap and does not require GOOGLE_API_KEY. A failed load is retried on the
+    next call.
     """
-    def __init__(self):
-        super().__init__("GenAIPromptGeneratorAgent")
-        
+    def __init__(self, model_name: Optional[str] = None, system_instruction: Optional[bool] = None):
+        self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-pro")
+        if system_instruction is None:
+            setting = os.getenv("GEMINI_SYSTEM_INSTRUCTION", "auto").lower()
+            # Gemini 1.0 models reject system instructions; the LLM client then sends them as a prompt prefix.
+            system_instruction = setting == "true" if setting != "auto" else not self.model_name.startswith(("gemini-pro", "gemini-1.0"))
+        self.supports_system_instruction = system_instruction
+        self.error: Optional[str] = None
+        self._model: Optional[Any] = None
+        self._instructed_models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def status(self) -> str:
+        """One of "ready" (loaded), "error" (last load failed) or "cold" (not loaded yet)."""
+        if self._model is not None:
+            return "ready"
+        return "error" if self.error else "cold"
+
+    def load(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        self._model = self._configure_gemini()
+                        self.error = None
+                    except Exception as e:
+                        self.error = f"{type(e).__name__}: {e}"
+                        raise
+        return self._model
+
+    def _configure_gemini(self) -> Any:
         # --- Configure Gemini LLM ---
         # It's highly recommended to load your API key from an environment variable
         # For example: export GOOGLE_API_KEY='your_api_key_here'
-        GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY") 
+        GEMINI_API_KEY = os.getenv("GOOGLE_API_KEY")
         if not GEMINI_API_KEY:
             raise ValueError("GOOGLE_API_KEY environment variable not set. Please set it before running.")
-        
+
+        # Importing the SDK takes longer than the rest of the service's imports, so it waits until here.
+        import google.generativeai as genai
         genai.configure(api_key=GEMINI_API_KEY)
-        
+
         # Choose the model. 'gemini-pro' is a good general-purpose text generation model.
-        self.llm_model = genai.GenerativeModel('gemini-pro') 
-        print(f"[{self.name}] Gemini LLM initialized.")
+        llm_model = genai.GenerativeModel(self.model_name)
+        get_logger("GenAIPromptGeneratorAgent").info("Gemini LLM initialized (%s).", self.model_name)
+        return llm_model
+
+    def generate_content(self, prompt: str, system_instruction: Optional[str] = None):
+        model = self.load()
+        if system_instruction:
+            model = self._instructed_model(system_instruction)
+        return model.generate_content(prompt)
+
+    def _instructed_model(self, system_instruction: str) -> Any:
+        # One model per distinct (static) instruction, so it is configured once and reused on every call.
+        model = self._instructed_models.get(system_instruction)
+        if model is None:
+            import google.generativeai as genai
+            with self._lock:
+                model = self._instructed_models.setdefault(
+                    system_instruction, genai.GenerativeModel(self.model_name, system_instruction=system_instruction))
+        return model
 
+class GenAIPromptGeneratorAgent(Agent):
+    """
+    Leverages a Generative AI model (LLM) to create highly detailed,
+    context-aware reminder messages.
+    """
+    def __init__(self, llm_model: Optional[Any] = None, response_cache: Optional[LLMResponseCache] = None):
+        super().__init__("GenAIPromptGeneratorAgent")
+        # Any object exposing Gemini's generate_content(prompt) can be injected,
+        # e.g. a stub model for local runs and benchmarks. Gemini itself is loaded on first use.
+        self.llm_model = llm_model if llm_model is not None else LazyGeminiModel()
+        self.llm_client = ResilientLLMClient(self.llm_model)
+        if response_cache is None and os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true":
+            response_cache = LLMResponseCache()
+        self.response_cache = response_cache
+        # Maximum number of tasks packed into one request by generate_reminder_prompts_batch.
+        self.batch_size = int(os.getenv("LLM_BATCH_SIZE", 10))
+        # Routine reminders are rendered from templates; the router also provides the LLM-outage fallback.
+        self.template_router = ReminderTemplateRouter()
+        self.template_routing = os.getenv("TEMPLATE_ROUTING_ENABLED", "true").lower() == "true"
+        self.tier_stats = TierStats()
+        # Static instructions are built once; each call sends only the budgeted task section with them.
+        self.prompt_builder = PromptBuilder()
 
-    def _call_gemini_llm(self, prompt: str) -> str:
+    def warm_up(self) -> str:
+        """Loads the LLM provider ahead of the first reminder; returns `provider_status()`."""
+        load = getattr(self.llm_model, "load", None)
+        if load is not None:
+            try:
+                load()
+            except Exception as e:
+                self.log.warning("Gemini LLM could not be initialized: %s", e)
+        return self.provider_status()
+
+    def provider_status(self) -> str:
+        """The provider's load status (see LazyGeminiModel.status); injected models are always "ready"."""
+        return getattr(self.llm_model, "status", "ready")
+
+    def _call_gemini_llm(self, prompt: BuiltPrompt) -> str:
         """
-        Calls the Gemini LLM API with the given prompt.
+        Calls the Gemini LLM API with the given prompt, rate limited and retried by the LLM client.
+        Raises LLMCallError (CircuitOpenError while the provider is considered unhealthy).
         """
+        self.log.debug("Calling Gemini LLM with prompt (truncated):\n%s...", prompt.text[:500])
         try:
-            print(f"[{self.name}] Calling Gemini LLM with prompt (truncated):\n{prompt[:500]}...")
-            
-            # The actual API call
-            response = self.llm_model.generate_content(prompt)
-            
-            # Extract the text content from the response
-            if response.candidates:
-                # Assuming the first candidate is the desired response
-                return response.candidates[0].content.parts[0].text
-            else:
-                print(f"[{self.name}] Gemini returned no candidates for the prompt.")
-                return "Error: Could not generate reminder message."
-
-        except Exception as e:
-            print(f"[{self.name}] Error calling Gemini LLM: {e}")
-            return f"Error generating reminder: {e}"
+            return self.llm_client.generate(prompt.text, system_instruction=prompt.system_instruction)
+        except LLMCallError as e:
+            self.log.warning("Error calling Gemini LLM: %s", e)
+            raise
 
     def generate_reminder_prompt(self, context: CombinedContext) -> tuple[str, str]:
-        print(f"[{self.name}] Constructing prompt for task {context.task_context.task_id}...")
+        self.log.debug("Constructing prompt for task %s...", context.task_context.task_id, extra={"task_id": context.task_context.task_id})
         task = context.task_context
-        prop = context.property_context
-        loan = context.loan_context
-
-        # Construct a comprehensive prompt for the LLM
-        llm_prompt = f"""
-        You are an AI assistant specialized in CMBS (Commercial Mortgage-Backed Securities) asset management.
-        Your goal is to generate a highly detailed, urgent, and actionable follow-up email reminder for an asset manager.
-        The reminder should be professional, concise, and guide the user on critical next steps.
-
-        Here are the task details:
-        - Task ID: {task.task_id}
-        - Description: {task.description}
-        - Assigned To: {task.assigned_to}
-        - Original Due Date: {task.due_date.strftime('%Y-%m-%d')}
-        - Current Date: {datetime.date.today().strftime('%Y-%m-%d')}
-        - Status: {task.status}
-        - Priority: {task.priority}
-        - Task Type: {task.task_type}
-        - Property ID: {task.property_id or 'N/A'}
-        - Loan ID: {task.loan_id or 'N/A'}
-        - Last Update Date: {task.last_update_date.strftime('%Y-%m-%d') if task.last_update_date else 'N/A'}
-        - Last Update Notes: {task.last_update_notes or 'None'}
-        """
 
-        if task.dependencies:
-            llm_prompt += "\nDependent Tasks Status:\n"
-            for dep_id, dep_status in task.dependent_tasks_status.items():
-                llm_prompt += f"- {dep_id}: {dep_status}\n"
+        today = datetime.date.today()
+        started_at = time.perf_counter()
+        llm_reason = self.template_router.llm_reason(context, today) if self.template_routing else "template routing disabled"
+        if llm_reason is None:
+            tier = "template"
+            generated_content = self.template_router.render(context, today)
+        else:
+            cache_key = self._cache_key(context)
+            generated_content = self.response_cache.get(cache_key) if cache_key else None
+            if generated_content is not None:
+                tier = "cache"
+                self.log.debug("Reusing cached reminder for task %s.", task.task_id, extra={"task_id": task.task_id})
+            else:
+                try:
+                    tier = "llm"
+                    self.log.debug("Routing task %s to the LLM (%s).", task.task_id, llm_reason, extra={"task_id": task.task_id})
+                    generated_content = self._generate_uncached(context, cache_key)
+                except CircuitOpenError:
+                    tier = "fallback"
+                    self.log.warning("LLM provider unavailable; using template fallback for task %s.", task.task_id)
+                    generated_content = self._render_fallback(context)
+        self.tier_stats.record(tier, time.perf_counter() - started_at)
 
-        if prop:
-            llm_prompt += f"""
-        Property Context:
-        - Property Type: {prop.property_type}
-        - Current Occupancy: {prop.occupancy_rate*100:.0f}%
-        """
-        
-        if loan:
-            llm_prompt += f"""
-        Loan Context:
-        - Loan Type: {loan.loan_type}
-        - Maturity Date: {loan.maturity_date.strftime('%Y-%m-%d')}
-        - DSCR Covenant: {loan.dscr_covenant or 'N/A'} (important for financial statements and performance reviews)
+        subject_line, body = self._parse_llm_output(generated_content)
+        self.log.debug("Prompt generated for task %s.", task.task_id, extra={"task_id": task.task_id, "tier": tier})
+        return subject_line, body
+
+    def generate_reminder_prompts_batch(self, contexts: List[CombinedContext]) -> Dict[str, tuple[str, str]]:
         """
-        
-        if context.market_news_summary:
-            llm_prompt += f"""
-        Relevant Market Insight:
-        - {context.market_news_summary}
+        Generates reminders for several tasks, packing up to `batch_size` uncached tasks into
+        one request that asks for JSON keyed by task_id. Any task missing from the parsed
+        output falls back to a single-task call, unless the batch failed because the provider
+        is throttling or unavailable. Returns (subject, body) per task_id, or the LLMCallError
+        for tasks whose reminder could not be generated.
         """
+        results: Dict[str, Any] = {}
+        today = datetime.date.today()
+        pending = []
+        for context in contexts:
+            task_id = context.task_context.task_id
+            started_at = time.perf_counter()
+            if self.template_routing and self.template_router.llm_reason(context, today) is None:
+                results[task_id] = self._parse_llm_output(self.template_router.render(context, today))
+                self.tier_stats.record("template", time.perf_counter() - started_at)
+                continue
+            cache_key = self._cache_key(context)
+            cached_content = self.response_cache.get(cache_key) if cache_key else None
+            if cached_content is not None:
+                results[task_id] = self._parse_llm_output(cached_content)
+                self.tier_stats.record("cache", time.perf_counter() - started_at)
+            else:
+                pending.append((context, cache_key))
 
-        llm_prompt += f"""
-
-        The reminder should:
-        - Start with "Subject: " followed by the email subject line, then two newlines, then the email body.
-        - Clearly state the current status (e.g., overdue, due soon) and its exact duration (e.g., "overdue by X days").
-        - **Emphasize the importance and potential implications** based on task type, property, and loan context (e.g., compliance risks, impact on valuation/surveillance, market trends, covenant breaches).
-        - **Reference the last update** and suggest **concrete, actionable next steps** based on the current situation and previous attempts. If dependencies are met, mention that. If the last update notes suggest a blocker, provide advice to overcome it.
-        - Maintain a professional, concise, and actionable tone suitable for an internal asset manager.
-        - The recipient is {task.assigned_to}.
+        for start in range(0, len(pending), self.batch_size):
+            chunk = pending[start:start + self.batch_size]
+            batch_output: Dict[str, tuple[str, str]] = {}
+            batch_error: Optional[LLMCallError] = None
+            if len(chunk) > 1:
+                self.log.debug("Generating %d reminders in one batched request...", len(chunk))
+                started_at = time.perf_counter()
+                try:
+                    batch_output = self._parse_batch_output(self._call_gemini_llm(self._build_batch_prompt([context for context, _ in chunk])))
+                except LLMCallError as e:
+                    batch_error = e # Unless retriable, every task in the chunk falls back to its own call below.
+                if batch_output:
+                    self.tier_stats.record("llm", (time.perf_counter() - started_at) / len(batch_output), count=len(batch_output))
 
-        Example for an overdue financial statement task:
-        Subject: URGENT: Action Required - Overdue Q1 2025 Financial Statements for Grand Tower Office (PROP-GRND)
+            for context, cache_key in chunk:
+                task_id = context.task_context.task_id
+                if task_id in batch_output:
+                    subject_line, body = batch_output[task_id]
+                    generated_content = f"Subject: {subject_line}\n\n{body}"
+                    if cache_key:
+                        self.response_cache.set(cache_key, generated_content)
+                else:
+                    started_at = time.perf_counter()
+                    try:
+                        if batch_error is not None and batch_error.retriable:
+                            # A call per task would only add load to a provider that is already throttling.
+                            raise batch_error
+                        if len(chunk) > 1:
+                            self.log.warning("Task %s missing from batched output; falling back to a single call.", task_id)
+                        generated_content = self._generate_uncached(context, cache_key)
+                        tier = "llm"
+                    except CircuitOpenError:
+                        generated_content = self._render_fallback(context)
+                        tier = "fallback"
+                    except LLMCallError as e:
+                        results[task_id] = e
+                        continue
+                    self.tier_stats.record(tier, time.perf_counter() - started_at)
+                results[task_id] = self._parse_llm_output(generated_content)
+        return results
 
-        Dear [Asset Manager Name],
+    def build_digest(self, recipient: str, reminders: List[tuple[str, str, str]]) -> tuple[str, str]:
+        """
+        Combines several (task_id, subject, body) reminders for one recipient into a single email.
+        """
+        subject_line = f"Reminder digest: {len(reminders)} tasks need your attention"
+        body = f"Dear {recipient},\n\nThe following {len(reminders)} tasks need your attention:\n"
+        for i, (task_id, task_subject, _) in enumerate(reminders, start=1):
+            body += f"{i}. {task_subject} ({task_id})\n"
+        for task_id, task_subject, task_body in reminders:
+            body += f"\n---\n\n**{task_id}: {task_subject}**\n\n{task_body}\n"
+        body += "\nBest regards,\n\nCMBS Asset Management System"
+        return subject_line, body
 
-        This is an urgent follow-up regarding your task **TASK-XXXX: [Description]** for **[Property Name] ([Property ID])**, associated with **Loan [Loan ID]**. The original due date was [Original Due Date], meaning this task is now **overdue by X days**.
+    def _cache_key(self, context: CombinedContext) -> Optional[str]:
+        return self.response_cache.make_key(context, datetime.date.today()) if self.response_cache else None
 
-        **Criticality & Impact:**
-        Timely submission of these financials is paramount. [Explain loan covenant implications, market impact, etc.].
+    def _generate_uncached(self, context: CombinedContext, cache_key: Optional[str]) -> str:
+        # Call Gemini LLM
+        generated_content = self._call_gemini_llm(self._build_prompt(context))
+        if cache_key:
+            self.response_cache.set(cache_key, generated_content)
+        return generated_content
 
-        **Current Status & Immediate Next Steps:**
-        Your last update on [Last Update Date] indicated you "[Last Update Notes]". It's been [Days since last update] since your last outreach.
+    def _render_fallback(self, context: CombinedContext) -> str:
+        """Deterministic reminder used while the LLM provider is unavailable; never cached."""
+        return self.template_router.render(context, datetime.date.today())
 
-        **Please prioritize the following actions immediately:**
-        1. [Concrete step 1]
-        2. [Concrete step 2]
-        3. [Concrete step 3, e.g., escalation]
+    def _build_prompt(self, context: CombinedContext) -> BuiltPrompt:
+        with span("prompt_build", task_id=context.task_context.task_id) as build:
+            return self._record_prompt(build, self.prompt_builder.build(context, datetime.date.today()))
 
-        You should have all preliminary information, as dependent tasks like [List completed dependencies] are completed.
+    def _build_batch_prompt(self, contexts: List[CombinedContext]) -> BuiltPrompt:
+        with span("prompt_build", tasks=len(contexts)) as build:
+            return self._record_prompt(build, self.prompt_builder.build_batch(contexts, datetime.date.today()))
 
-        Your prompt action on this overdue and critical item is highly appreciated to maintain loan compliance and ensure accurate portfolio reporting.
+    def _record_prompt(self, build: Span, prompt: BuiltPrompt) -> BuiltPrompt:
+        build.set("static_tokens", prompt.static_tokens)
+        build.set("dynamic_tokens", prompt.dynamic_tokens)
+        build.set("dropped", ",".join(prompt.dropped) or None)
+        build.set("trimmed", prompt.trimmed)
+        return prompt
 
-        Best regards,
+    def _parse_batch_output(self, generated_content: str) -> Dict[str, tuple[str, str]]:
+        # Tolerate prose or a ```json fence around the object; anything unusable is treated as missing.
+        start, end = generated_content.find("{"), generated_content.rfind("}")
+        if start == -1 or end <= start:
+            return {}
+        try:
+            data = json.loads(generated_content[start:end + 1])
+        except json.JSONDecodeError as e:
+            self.log.warning("Could not parse batched LLM output as JSON: %s", e)
+            return {}
+        if not isinstance(data, dict):
+            return {}
 
-        CMBS Asset Management System
-        """
+        parsed = {}
+        for task_id, entry in data.items():
+            if isinstance(entry, dict) and isinstance(entry.get("subject"), str) and isinstance(entry.get("body"), str) and entry["body"].strip():
+                parsed[task_id] = (entry["subject"].strip(), entry["body"].strip())
+        return parsed
 
-        # Call Gemini LLM
-        generated_content = self._call_gemini_llm(llm_prompt)
-        
+    def _parse_llm_output(self, generated_content: str) -> tuple[str, str]:
         # Attempt to parse subject and body from LLM output
         subject_line = "Automated Reminder" # Default subject
         body = generated_content
@@ -168,5 +317,4 @@ class GenAIPromptGeneratorAgent(Agent):
         if "Best regards," in body:
             body = body.split("Best regards,")[0].strip() # Remove sign-off
 
-        print(f"[{self.name}] Prompt generated for task {task.task_id}.")
         return subject_line, body
\ No newline at end of file
@@ -0,0 +1,331 @@
+# cmbs_reminder_system/agents/scheduler.py
+from .base import Agent, r
+from .orchestrator import OrchestratorAgent
+from .work_queue import ReminderWorkQueue
+from models import ReminderRequest
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Set
+import datetime
+import os
+import threading
+import uuid
+
+# name|cron expression|comma-separated priorities ("*" for all), separated by ";".
+DEFAULT_SCHEDULES = "urgent|0 * * * *|Critical,High;routine|0 8 * * *|Medium,Low"
+
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class CronSchedule:
+    """
+    Standard five-field cron expression (minute hour day-of-month month day-of-week) supporting
+    '*', lists, ranges and steps. Day-of-week 0 and 7 are Sunday. As in cron, when both day fields
+    are restricted a day matches if either does.
+    """
+    _FIELDS = [("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7)]
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: '{expression}'")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(part, low, high) for part, (_, low, high) in zip(parts, self._FIELDS))
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for item in field.split(","):
+            range_part, _, step = item.partition("/")
+            if range_part == "*":
+                start, end = low, high
+            elif "-" in range_part:
+                start, end = (int(value) for value in range_part.split("-", 1))
+            else:
+                start = end = int(range_part)
+                if step:
+                    end = high
+            if not (low <= start <= end <= high):
+                raise ValueError(f"Cron field '{field}' out of range {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment: datetime.datetime) -> bool:
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day and self.any_weekday:
+            return True
+        if self.any_day:
+            return weekday_match
+        if self.any_weekday:
+            return day_match
+        return day_match or weekday_match
+
+    def next_after(self, after: datetime.datetime) -> datetime.datetime:
+        """First matching minute strictly after `after`."""
+        moment = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = moment + datetime.timedelta(days=5 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + datetime.timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
+class ReminderSchedule:
+    """A reminder class: the task priorities it covers and the cron schedule its sweeps run on."""
+    def __init__(self, name: str, cron: str, priorities: Optional[List[str]] = None):
+        self.name = name
+        self.cron = CronSchedule(cron)
+        self.priorities = priorities
+
+def parse_schedules(spec: str) -> List[ReminderSchedule]:
+    schedules = []
+    for entry in filter(None, (entry.strip() for entry in spec.split(";"))):
+        name, cron, priorities = (part.strip() for part in entry.split("|"))
+        schedules.append(ReminderSchedule(name, cron, None if priorities == "*" else priorities.split(",")))
+    return schedules
+
+class RedisLease:
+    """
+    Expiring lock held under a random token: SET NX PX to acquire, and compare-and-renew /
+    compare-and-delete scripts so a holder whose lease already lapsed cannot touch its successor's.
+    """
+    def __init__(self, key: str, ttl_seconds: float):
+        self.key = key
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return bool(r.set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    def renew(self) -> bool:
+        return bool(r.eval(_RENEW_SCRIPT, 1, self.key, self.token, self.ttl_ms))
+
+    def release(self) -> bool:
+        return bool(r.eval(_RELEASE_SCRIPT, 1, self.key, self.token))
+
+    def renew_until(self, stop: threading.Event) -> bool:
+        """Renews the lease every third of its TTL until `stop` is set; returns False as soon as the lease is lost."""
+        while not stop.wait(self.ttl_ms / 3000):
+            if not self.renew():
+                return False
+        return True
+
+class SchedulerAgent(Agent):
+    """
+    Runs reminder sweeps on cron schedules, one schedule per reminder class. Every process runs a
+    scheduler, but only the one holding the Redis leader lease fires schedules; the others take over
+    when the lease lapses. Sweeps call the orchestrator in-process (or enqueue for workers when given
+    a queue) on a single sweep thread. A trigger for a class that is already running or pending is
+    merged into one follow-up sweep, and a class already being swept by another process is skipped.
+    The per-class sweep lock is renewed from a heartbeat thread for as long as the sweep runs.
+    """
+    LEADER_KEY = "scheduler:leader"
+    LAST_RUN_KEY = "scheduler:last_run"
+
+    def __init__(self, orchestrator: OrchestratorAgent, schedules: Optional[List[ReminderSchedule]] = None,
+                 queue: Optional[ReminderWorkQueue] = None, lease_seconds: Optional[float] = None,
+                 tick_seconds: Optional[float] = None, sweep_lock_seconds: Optional[float] = None):
+        super().__init__("SchedulerAgent")
+        self.orchestrator = orchestrator
+        self.schedules = {schedule.name: schedule for schedule in
+                          (schedules or parse_schedules(os.getenv("REMINDER_SCHEDULES", DEFAULT_SCHEDULES)))}
+        self.queue = queue
+        self.tick_seconds = tick_seconds or float(os.getenv("SCHEDULER_TICK_SECONDS", 5))
+        self.sweep_lock_seconds = sweep_lock_seconds or float(os.getenv("SCHEDULER_SWEEP_LOCK_SECONDS", 60))
+        self.lease = RedisLease(self.LEADER_KEY, lease_seconds or float(os.getenv("SCHEDULER_LEASE_SECONDS", 30)))
+        self.is_leader = False
+        self._next_runs: Dict[str, datetime.datetime] = {}
+        self._pending: "OrderedDict[str, ReminderRequest]" = OrderedDict()
+        self._running: Optional[str] = None
+        self._last_results: Dict[str, Dict[str, Any]] = {}
+        self._counters = {"triggered": 0, "merged": 0, "skipped": 0, "completed": 0, "failed": 0}
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    # --- Lifecycle ---
+
+    def start(self, run_schedules: bool = True):
+        """Starts the sweep thread and, unless `run_schedules` is False (manual triggers only), leader election."""
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._sweep_loop, name="scheduler-sweeps", daemon=True)]
+        if run_schedules:
+            self._threads.append(threading.Thread(target=self._tick_loop, name="scheduler-tick", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        if run_schedules:
+            self.log.info("Started with schedules: %s",
+                          ", ".join(f"{name} ({schedule.cron.expression})" for name, schedule in self.schedules.items()))
+
+    @property
+    def is_running(self) -> bool:
+        return not self._stop.is_set() and any(thread.is_alive() for thread in self._threads)
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=self.tick_seconds)
+        if self.is_leader:
+            self.lease.release()
+            self.is_leader = False
+        self.log.info("Stopped.")
+
+    # --- Leadership and cron ---
+
+    def _tick_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick(datetime.datetime.now())
+            except Exception as e:
+                self.log.error("Scheduler tick failed: %s", e)
+            self._stop.wait(self.tick_seconds)
+
+    def _update_leadership(self, now: datetime.datetime):
+        if self.is_leader:
+            if self.lease.renew():
+                return
+            self.log.warning("Lost scheduler leadership.")
+            self.is_leader = False
+            self._next_runs.clear()
+        if self.lease.acquire():
+            self.log.info("Acquired scheduler leadership.")
+            self.is_leader = True
+            # Resume from the last fire times recorded by any previous leader, so a missed
+            # run fires once on takeover instead of being lost or repeated.
+            last_runs = r.hgetall(self.LAST_RUN_KEY)
+            for name, schedule in self.schedules.items():
+                last_run = last_runs.get(name)
+                self._next_runs[name] = schedule.cron.next_after(datetime.datetime.fromisoformat(last_run) if last_run else now)
+
+    def tick(self, now: datetime.datetime):
+        """Renews or contends for leadership and, as leader, triggers every schedule that has come due."""
+        self._update_leadership(now)
+        if not self.is_leader:
+            return
+        for name, schedule in self.schedules.items():
+            if self._next_runs[name] <= now:
+                r.hset(self.LAST_RUN_KEY, name, self._next_runs[name].isoformat())
+                self._next_runs[name] = schedule.cron.next_after(now)
+                self.trigger(name, now.date())
+
+    # --- Sweeps ---
+
+    def trigger(self, reminder_class: Optional[str] = None, current_date: Optional[datetime.date] = None) -> str:
+        """
+        Requests a sweep of one reminder class (all tasks when None). Returns "scheduled", or "merged"
+        when an identical sweep is already pending.
+        """
+        if reminder_class is not None and reminder_class not in self.schedules:
+            raise ValueError(f"Unknown reminder class '{reminder_class}'")
+        name = reminder_class or "all"
+        priorities = self.schedules[reminder_class].priorities if reminder_class else None
+        request = ReminderRequest(current_date=current_date or datetime.date.today(), priorities=priorities)
+        with self._condition:
+            self._counters["triggered"] += 1
+            if name in self._pending:
+                self._pending[name] = request
+                self._counters["merged"] += 1
+                return "merged"
+            self._pending[name] = request
+            self._condition.notify_all()
+        return "scheduled"
+
+    def _sweep_loop(self):
+        while not self._stop.is_set():
+            with self._condition:
+                while not self._pending and not self._stop.is_set():
+                    self._condition.wait()
+                if self._stop.is_set():
+                    return
+                name, request = self._pending.popitem(last=False)
+                self._running = name
+            try:
+                self._run_sweep(name, request)
+            finally:
+                with self._condition:
+                    self._running = None
+
+    def _run_sweep(self, name: str, request: ReminderRequest):
+        sweep_lock = RedisLease(f"scheduler:sweep:{name}", self.sweep_lock_seconds)
+        if not sweep_lock.acquire():
+            self.log.info("Skipping '%s' sweep: already running in another process.", name)
+            self._count("skipped")
+            return
+        started_at = datetime.datetime.now()
+        self.log.info("Running '%s' sweep for %s.", name, request.current_date)
+        # A sweep can outlive the lock's TTL (slow LLM calls), so keep renewing it while the sweep runs.
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_sweep_lock, args=(name, sweep_lock, heartbeat_stop),
+                                     name=f"scheduler-sweep-lock-{name}", daemon=True)
+        heartbeat.start()
+        try:
+            if self.queue is not None:
+                sweep_id, total = self.orchestrator.enqueue_reminder_sweep(request, self.queue)
+                result: Dict[str, Any] = {"sweep_id": sweep_id, "total": total}
+            else:
+                responses = self.orchestrator.process_reminder_request(request)
+                result = {"processed": len(responses),
+                          "failed": sum(1 for response in responses if response.status == "Failed")}
+            self._count("completed")
+        except Exception as e:
+            self.log.error("'%s' sweep failed: %s", name, e)
+            result = {"error": str(e)}
+            self._count("failed")
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+            sweep_lock.release()
+        result.update({"current_date": request.current_date.isoformat(), "started_at": started_at.isoformat(),
+                       "finished_at": datetime.datetime.now().isoformat()})
+        with self._condition:
+            self._last_results[name] = result
+
+    def _renew_sweep_lock(self, name: str, sweep_lock: RedisLease, stop: threading.Event):
+        try:
+            if not sweep_lock.renew_until(stop):
+                self.log.warning("Lost the '%s' sweep lock while the sweep was running.", name)
+        except Exception as e:
+            self.log.error("Could not renew the '%s' sweep lock: %s", name, e)
+
+    def _count(self, counter: str):
+        with self._condition:
+            self._counters[counter] += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "leader": self.is_leader,
+                "running": self._running,
+                "pending": list(self._pending),
+                "schedules": {
+                    name: {"cron": schedule.cron.expression, "priorities": schedule.priorities,
+                           "next_run": self._next_runs[name].isoformat() if name in self._next_runs else None,
+                           "last_result": self._last_results.get(name)}
+                    for name, schedule in self.schedules.items()
+                },
+                "last_manual_result": self._last_results.get("all"),
+                **self._counters,
+            }
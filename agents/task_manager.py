@@ -1,77 +1,679 @@
 # cmbs_reminder_system/agents/task_manager.py
-from .base import Agent, r
-from ..models import Task, ReminderRequest
+from .base import Agent, r, encode_hash_fields, decode_hash_fields, TRANSIENT_FIELDS
+from .telemetry import span
+from models import Task, Blocker
 import datetime
-from typing import List, Optional, Any
+import os
+import uuid
+import json
+import redis
+from typing import List, Optional, Any, Dict, Callable
+
+OPEN_STATUSES = ("Pending", "In Progress")
+# A dependency in any other status (including a missing task) blocks the tasks that depend on it.
+RESOLVED_DEPENDENCY_STATUSES = ("Completed",)
+DEFAULT_REMINDER_INTERVAL_HOURS = 24
+DEFAULT_DUE_SOON_THRESHOLD_DAYS = 7
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# Everything the due check and the indexes need; the rest of a task is loaded only once it is due.
+REMINDER_CHECK_FIELDS = ['status', 'priority', 'due_date', 'last_reminder_sent']
+
+# KEYS: task key, claim key. ARGV: token, lease ms. Claims only open tasks whose window is unclaimed.
+_CLAIM_SCRIPT = """
+local status = redis.call('hget', KEYS[1], 'status')
+if not status then
+    return 'missing'
+end
+if status ~= 'Pending' and status ~= 'In Progress' then
+    return 'closed'
+end
+if redis.call('set', KEYS[2], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 'claimed'
+end
+return 'held'
+"""
+# KEYS: claim key. ARGV: token, retention ms. Marks the window as sent if the claim is still ours.
+_COMMIT_CLAIM_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('set', KEYS[1], 'sent', 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+# KEYS: claim key. ARGV: token. Frees the window for a later sweep if the claim is still ours.
+_RELEASE_CLAIM_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# KEYS: dependency status hash, blocked-task set. ARGV: task id, 'set' or 'nx', the number of resolved statuses,
+# the resolved statuses, then dependency id/status pairs. Writes the statuses (HSETNX with 'nx'), then files the
+# task as blocked while any dependency's status is not a resolved one.
+_SET_DEPENDENCY_STATUSES_SCRIPT = """
+local write = ARGV[2] == 'nx' and 'hsetnx' or 'hset'
+local first_pair = 4 + tonumber(ARGV[3])
+local resolved = {}
+for i = 4, first_pair - 1 do
+    resolved[ARGV[i]] = true
+end
+for i = first_pair, #ARGV, 2 do
+    redis.call(write, KEYS[1], ARGV[i], ARGV[i + 1])
+end
+for _, status in ipairs(redis.call('hvals', KEYS[1])) do
+    if not resolved[status] then
+        redis.call('sadd', KEYS[2], ARGV[1])
+        return 1
+    end
+end
+redis.call('srem', KEYS[2], ARGV[1])
+return 0
+"""
+
+class DependencyCycleError(ValueError):
+    """Raised by `add_task` when the new task's dependencies lead back to the task itself."""
+    def __init__(self, cycle: List[str]):
+        super().__init__(f"Dependency cycle: {' -> '.join(cycle)}")
+        self.cycle = cycle
+
+class ReminderClaim:
+    """Exclusive right to send the reminder for one task in one reminder window."""
+    def __init__(self, task_id: str, window: str, token: str):
+        self.task_id = task_id
+        self.window = window
+        self.token = token
+
+    @property
+    def key(self) -> str:
+        return f"reminder_claim:{self.task_id}:{self.window}"
 
 class TaskManagerAgent(Agent):
     """
     Manages task data (CRUD operations) and handles task persistence in Redis.
     Also responsible for identifying tasks due for a reminder.
+
+    Open tasks are kept in two sorted-set indexes so the due check is a range
+    query instead of a scan over every task key:
+    - tasks:open:by_due            scored by due date (date ordinal)
+    - tasks:open:by_next_reminder  scored by the next time a reminder may fire
+
+    Every write also appends a change event to the task_events stream (read by the
+    ReminderEligibilityEngine) in the same transaction as the index update.
+
+    Dependencies form a graph kept current as statuses change:
+    - task_dependency_status:<id>  hash of the task's dependencies (its forward edges) to their statuses
+    - task_dependents:<id>         set of tasks depending on it (reverse edges), so a status change
+                                   is pushed to exactly the caches that hold it
+    - tasks:blocked                set of tasks with at least one unresolved dependency
+    `add_task` rejects dependencies that would close a cycle. Selected tasks get their dependency
+    statuses and blocker chain from these caches, without walking the graph per sweep.
     """
-    def __init__(self):
+    EVENTS_STREAM_KEY = "task_events"
+    def __init__(self, claim_lease_seconds: Optional[float] = None, claim_retention_seconds: Optional[float] = None):
         super().__init__("TaskManagerAgent")
+        self.claim_lease_ms = int(1000 * (claim_lease_seconds or float(os.getenv("REMINDER_CLAIM_LEASE_SECONDS", 600))))
+        self.claim_retention_ms = int(1000 * (claim_retention_seconds or float(os.getenv("REMINDER_CLAIM_RETENTION_SECONDS", 7 * 24 * 3600))))
         self._next_task_id_key = "next_task_id"
-        if not r.exists(self._next_task_id_key):
-            r.set(self._next_task_id_key, 1)
+        self._open_by_due_key = "tasks:open:by_due"
+        self._open_by_next_reminder_key = "tasks:open:by_next_reminder"
+        self._blocked_key = "tasks:blocked"
+        self.events_max_len = int(os.getenv("TASK_EVENTS_MAX_LEN", 100000))
+        self.blocker_chain_max_depth = int(os.getenv("DEPENDENCY_CHAIN_MAX_DEPTH", 5))
+        # Index entries read per round trip when a sweep asks for only the first few due tasks.
+        self.due_scan_page_size = int(os.getenv("REMINDER_DUE_SCAN_PAGE_SIZE", 500))
+
+    @staticmethod
+    def _dependents_key(task_id: str) -> str:
+        return f"task_dependents:{task_id}"
+
+    @staticmethod
+    def _dependency_status_key(task_id: str) -> str:
+        return f"task_dependency_status:{task_id}"
 
     def add_task(self, task_data: dict) -> Task:
-        task_id_int = r.incr(self._next_task_id_key)
-        task_data['task_id'] = f"TASK-{task_id_int:04d}"
-        task = Task(**task_data)
-        self._save_to_redis('task', task)
-        print(f"[{self.name}] Task added: {task.task_id} - {task.description}")
+        task = self._allocate_task(task_data)
+        dep_statuses = self._load_statuses(task.dependencies)
+        # The hash, its reverse edges, dependency statuses, indexes and "created" event are written in one transaction.
+        key = self._get_redis_key('task', task.task_id)
+        mapping, _ = encode_hash_fields(task.model_dump(mode='json', exclude=TRANSIENT_FIELDS['task']))
+        pipe = r.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=mapping)
+        for dep_id in task.dependencies:
+            pipe.sadd(self._dependents_key(dep_id), task.task_id)
+        if dep_statuses:
+            self._set_dependency_statuses(pipe, task.task_id, dep_statuses)
+        self._index_task(task, pipe)
+        self._publish_event(pipe, task, "created")
+        pipe.execute()
+        # Tasks may name a dependency before it exists; tell them it does now.
+        self._propagate_status(task)
+        self.log.info("Task added: %s - %s", task.task_id, task.description)
         return task
 
+    def _allocate_task(self, task_data: dict) -> Task:
+        """
+        Validates the new task and checks it for dependency cycles under the id it is about to take, and
+        only then takes that id, so a rejected task leaves no gap in the ids. The id counter is WATCHed,
+        and the check is redone if another task takes the id in between.
+        """
+        with r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self._next_task_id_key)
+                    task_data['task_id'] = f"TASK-{int(pipe.get(self._next_task_id_key) or 0) + 1:04d}"
+                    task = Task(**task_data)
+                    cycle = self._find_cycle(task)
+                    if cycle:
+                        raise DependencyCycleError(cycle)
+                    pipe.multi()
+                    pipe.incr(self._next_task_id_key)
+                    pipe.execute()
+                    return task
+                except redis.WatchError:
+                    continue
+
     def get_task(self, task_id: str) -> Optional[Task]:
         return self._load_from_redis('task', task_id, Task)
 
+    def get_tasks(self, task_ids: List[str]) -> List[Optional[Task]]:
+        """Batch counterpart of `get_task`; results are aligned with `task_ids`."""
+        return self._load_many_from_redis('task', task_ids, Task)
+
+    def get_task_fields(self, task_ids: List[str], fields: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Loads only `fields` (plus task_id) of each task; results are aligned with `task_ids`."""
+        return self._load_fields_from_redis('task', task_ids, Task, fields)
+
+    def _get_task_stubs(self, task_ids: List[str]) -> List[Optional[Task]]:
+        """Unvalidated Task objects carrying only REMINDER_CHECK_FIELDS, for the due check and indexing."""
+        return [Task.model_construct(**fields) if fields else None
+                for fields in self.get_task_fields(task_ids, REMINDER_CHECK_FIELDS)]
+
     def update_task_status(self, task_id: str, new_status: str, notes: Optional[str] = None) -> Optional[Task]:
         updates = {
             'status': new_status,
             'last_update_date': datetime.date.today().isoformat(),
             'last_update_notes': notes
         }
-        if self._update_in_redis('task', task_id, updates):
-            return self.get_task(task_id)
-        return None
-    
+        task = self._update_task(task_id, updates, "status_changed")
+        self._propagate_status(task)
+        return task
+
     def update_last_reminder_sent(self, task_id: str, timestamp: datetime.datetime) -> Optional[Task]:
-        updates = {'last_reminder_sent': timestamp.isoformat()}
-        if self._update_in_redis('task', task_id, updates):
-            return self.get_task(task_id)
+        return self._update_task(task_id, {'last_reminder_sent': timestamp.isoformat()}, "reminder_sent")
+
+    def _update_task(self, task_id: str, updates: Dict[str, Any], event: str) -> Optional[Task]:
+        """
+        Writes `updates` to the task hash, moves the task in the open-task indexes and publishes `event`
+        in one MULTI/EXEC; returns the updated task, or None if it does not exist. The task is read under
+        WATCH, so the index scores and event come from exactly the state being written, and a concurrent
+        write retries it. Only the changed fields are written, so a concurrent update to other fields is
+        never lost.
+        """
+        key = self._get_redis_key('task', task_id)
+        mapping, removed = encode_hash_fields(updates)
+        with r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    fields = pipe.hgetall(key)
+                    if not fields:
+                        pipe.unwatch()
+                        return None
+                    task = Task.model_validate({**decode_hash_fields(Task, fields), **updates})
+                    pipe.multi()
+                    if mapping:
+                        pipe.hset(key, mapping=mapping)
+                    if removed:
+                        pipe.hdel(key, *removed)
+                    self._index_task(task, pipe)
+                    self._publish_event(pipe, task, event)
+                    pipe.execute()
+                    return task
+                except redis.WatchError:
+                    continue
+
+    # --- Change events and dependency statuses ---
+
+    def _publish_event(self, pipe: Any, task: Task, event: str):
+        pipe.xadd(self.EVENTS_STREAM_KEY, {"task_id": task.task_id, "event": event, "status": task.status},
+                  maxlen=self.events_max_len, approximate=True)
+
+    def _propagate_status(self, task: Optional[Task]):
+        """Writes `task`'s status into the cached dependency statuses of every task that depends on it."""
+        if task is None:
+            return
+        dependents = r.smembers(self._dependents_key(task.task_id))
+        if not dependents:
+            return
+        pipe = r.pipeline(transaction=False)
+        for dependent_id in dependents:
+            self._set_dependency_statuses(pipe, dependent_id, {task.task_id: task.status})
+        pipe.execute()
+
+    def _set_dependency_statuses(self, pipe: Any, task_id: str, statuses: Dict[str, str], only_missing: bool = False):
+        """Queues a cache write of `task_id`'s dependency statuses plus the matching blocked-set update."""
+        args = [arg for item in statuses.items() for arg in item]
+        pipe.eval(_SET_DEPENDENCY_STATUSES_SCRIPT, 2, self._dependency_status_key(task_id), self._blocked_key,
+                  task_id, 'nx' if only_missing else 'set', len(RESOLVED_DEPENDENCY_STATUSES), *RESOLVED_DEPENDENCY_STATUSES, *args)
+
+    def _find_cycle(self, task: Task) -> Optional[List[str]]:
+        """
+        The dependency path from `task` back to itself, if any; None when its dependencies form no cycle.
+        Walks upstream from the task's dependencies one level (one round trip) at a time. A cycle is
+        possible because tasks may name a dependency before it exists, including the id `task` now takes.
+        """
+        parents: Dict[str, Optional[str]] = {task.task_id: None}
+        dependencies = {task.task_id: task.dependencies}
+        frontier = [task.task_id]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for dep_id in dependencies.get(node, []):
+                    if dep_id == task.task_id:
+                        path = [node]
+                        while parents[path[-1]] is not None:
+                            path.append(parents[path[-1]])
+                        return path[::-1] + [task.task_id]
+                    if dep_id not in parents:
+                        parents[dep_id] = node
+                        next_frontier.append(dep_id)
+            frontier = next_frontier
+            if frontier:
+                dependencies = {dep_id: fields.get('dependencies', []) if fields else []
+                                for dep_id, fields in zip(frontier, self.get_task_fields(frontier, ['dependencies']))}
         return None
 
-    def get_tasks_due_for_reminder(self, current_date: datetime.date, reminder_interval_hours: int = 24, due_soon_threshold_days: int = 7) -> List[Task]:
-        print(f"[{self.name}] Checking for tasks due for reminder on {current_date}...")
-        all_task_keys = r.keys(self._get_redis_key('task', '*'))
-        tasks_to_remind: List[Task] = []
-        
-        for key in all_task_keys:
-            task = self.get_task(key.split(':')[1])
-            if not task or task.status not in ["Pending", "In Progress"]:
-                continue
+    @staticmethod
+    def is_blocked(task: Task) -> bool:
+        """True while any of the task's (attached) dependency statuses is unresolved."""
+        return any(status not in RESOLVED_DEPENDENCY_STATUSES for status in task.dependent_tasks_status.values())
+
+    def get_blocked_task_ids(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """
+        Open tasks with an unresolved dependency, by due date, from `offset` (at most `limit` of them).
+        The intersection is stored, ranged and deleted in one transaction, so only the page is returned.
+        """
+        page_key = f"{self._blocked_key}:by_due"
+        pipe = r.pipeline()
+        pipe.zinterstore(page_key, {self._open_by_due_key: 1, self._blocked_key: 0})
+        pipe.zrange(page_key, offset, offset + limit - 1 if limit is not None else -1)
+        pipe.delete(page_key)
+        return pipe.execute()[1]
+
+    def rebuild_dependency_graph(self, batch_size: int = 1000) -> int:
+        """
+        Rebuilds the reverse edges, dependency status caches and blocked set from the task:* keys,
+        e.g. for tasks written before they existed. Run it with the service stopped. Returns the
+        number of tasks that have dependencies.
+        """
+        self.log.info("Rebuilding the dependency graph...")
+        statuses: Dict[str, str] = {}
+        dependencies: Dict[str, List[str]] = {}
+        keys: List[str] = []
+
+        def load(batch: List[str]):
+            task_ids = [key.split(':', 1)[1] for key in batch]
+            for task_id, fields in zip(task_ids, self.get_task_fields(task_ids, ['status', 'dependencies'])):
+                if fields:
+                    statuses[task_id] = fields.get('status', "Pending")
+                    if fields.get('dependencies'):
+                        dependencies[task_id] = fields['dependencies']
+
+        for key in r.scan_iter(match=self._get_redis_key('task', '*'), count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                load(keys)
+                keys = []
+        if keys:
+            load(keys)
+
+        for pattern in (self._dependents_key('*'), self._dependency_status_key('*')):
+            for stale in self._batched(r.scan_iter(match=pattern, count=batch_size), batch_size):
+                r.unlink(*stale)
+        r.delete(self._blocked_key)
+        for batch in self._batched(dependencies.items(), batch_size):
+            pipe = r.pipeline(transaction=False)
+            for task_id, dep_ids in batch:
+                for dep_id in dep_ids:
+                    pipe.sadd(self._dependents_key(dep_id), task_id)
+                self._set_dependency_statuses(pipe, task_id, {dep_id: statuses.get(dep_id, "Not Found") for dep_id in dep_ids})
+            pipe.execute()
+        self.log.info("Rebuilt dependencies of %s tasks.", len(dependencies))
+        return len(dependencies)
+
+    @staticmethod
+    def _batched(items: Any, size: int) -> Any:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _load_statuses(self, task_ids: List[str]) -> Dict[str, str]:
+        return {task_id: fields['status'] if fields else "Not Found"
+                for task_id, fields in zip(task_ids, self.get_task_fields(task_ids, ['status']))}
+
+    def read_events(self, after_id: str, count: int = 1000) -> List[tuple]:
+        """Change events newer than stream id `after_id`, oldest first, as (event_id, fields) pairs."""
+        events = r.xrange(self.EVENTS_STREAM_KEY, min=after_id, count=count + 1)
+        return [event for event in events if event[0] != after_id][:count]
 
-            send_reminder_now = False
+    def last_event_id(self) -> str:
+        latest = r.xrevrange(self.EVENTS_STREAM_KEY, count=1)
+        return latest[0][0] if latest else "0-0"
+
+    def event_exists(self, event_id: str) -> bool:
+        return bool(r.xrange(self.EVENTS_STREAM_KEY, min=event_id, max=event_id, count=1))
+
+    def migrate_task_hashes(self, batch_size: int = 1000) -> int:
+        """
+        Converts tasks stored in the old one-JSON-string-per-key format into hashes. Uses SCAN and
+        converts each batch in one MULTI/EXEC. Safe to re-run: keys that are
+        already hashes are skipped. Run it with the service stopped.
+        """
+        self.log.info("Migrating tasks to hash storage...")
+        migrated = 0
+        keys: List[str] = []
+
+        def flush(batch: List[str]) -> int:
+            pipe = r.pipeline(transaction=False)
+            for key in batch:
+                pipe.type(key)
+            string_keys = [key for key, key_type in zip(batch, pipe.execute()) if key_type == 'string']
+            if not string_keys:
+                return 0
+            pipe = r.pipeline()
+            for key, task_json in zip(string_keys, r.mget(string_keys)):
+                if not task_json:
+                    continue
+                mapping, _ = encode_hash_fields(json.loads(task_json))
+                for field in TRANSIENT_FIELDS['task']:
+                    mapping.pop(field, None)
+                pipe.delete(key)
+                pipe.hset(key, mapping=mapping)
+            pipe.execute()
+            return len(string_keys)
+
+        for key in r.scan_iter(match=self._get_redis_key('task', '*'), count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                migrated += flush(keys)
+                keys = []
+        if keys:
+            migrated += flush(keys)
+        self.log.info("Migrated %s tasks.", migrated)
+        return migrated
+
+    # --- Reminder claims ---
+
+    def claim_reminders(self, tasks: List[Task]) -> Dict[str, ReminderClaim]:
+        """
+        Atomically claims the current reminder window of each task, in one round trip. The window is
+        the task's next reminder time, which only moves once a reminder is recorded as sent, so every
+        sweep that saw the same state contends for the same claim. Returns the claims won, by task_id;
+        tasks that are closed, missing, or claimed or already sent by another sweep are left out.
+        """
+        claims = [ReminderClaim(task.task_id, self._next_reminder_at(task).isoformat(), uuid.uuid4().hex) for task in tasks]
+        pipe = r.pipeline(transaction=False)
+        for claim in claims:
+            pipe.eval(_CLAIM_SCRIPT, 2, self._get_redis_key('task', claim.task_id), claim.key, claim.token, self.claim_lease_ms)
+        outcomes = pipe.execute() if claims else []
+
+        won = {claim.task_id: claim for claim, outcome in zip(claims, outcomes) if outcome == 'claimed'}
+        if len(won) < len(claims):
+            self.log.info("Claimed %s of %s reminders; the rest are closed or handled by another sweep.", len(won), len(claims))
+        return won
+
+    def commit_reminder(self, claim: ReminderClaim, sent_at: datetime.datetime) -> Optional[Task]:
+        """Records the reminder as sent and marks its window so no other sweep sends it again."""
+        with span("commit", task_id=claim.task_id):
+            if not r.eval(_COMMIT_CLAIM_SCRIPT, 1, claim.key, claim.token, self.claim_retention_ms):
+                self.log.warning("Claim on %s expired before its reminder was recorded as sent.", claim.task_id)
+            return self.update_last_reminder_sent(claim.task_id, sent_at)
+
+    def release_reminder(self, claim: ReminderClaim):
+        """Gives up a claim without sending, so a later sweep can retry the reminder."""
+        r.eval(_RELEASE_CLAIM_SCRIPT, 1, claim.key, claim.token)
+
+    # --- Secondary indexes ---
+
+    @staticmethod
+    def _datetime_score(value: datetime.datetime) -> float:
+        # Naive datetimes are used throughout; score them against a naive epoch
+        # so the index does not depend on the server's local timezone.
+        return (value - _EPOCH).total_seconds()
+
+    @staticmethod
+    def _next_reminder_at(task: Task, reminder_interval_hours: int = DEFAULT_REMINDER_INTERVAL_HOURS,
+                          due_soon_threshold_days: int = DEFAULT_DUE_SOON_THRESHOLD_DAYS) -> datetime.datetime:
+        """
+        Earliest check time (midnight of a scheduler date) at which `_is_reminder_due` becomes true.
+        """
+        first_eligible_date = task.due_date - datetime.timedelta(days=due_soon_threshold_days)
+        if not task.last_reminder_sent:
+            return datetime.datetime.combine(first_eligible_date, datetime.time.min)
+
+        candidates = []
+        # Due soon / due today: at most one reminder per calendar day.
+        next_day = task.last_reminder_sent.date() + datetime.timedelta(days=1)
+        upcoming_date = max(first_eligible_date, next_day)
+        if upcoming_date <= task.due_date:
+            candidates.append(upcoming_date)
+
+        # Overdue: reminders spaced by the reminder interval, evaluated at midnight.
+        interval_elapsed = task.last_reminder_sent + datetime.timedelta(hours=reminder_interval_hours)
+        overdue_date = interval_elapsed.date()
+        if interval_elapsed.time() != datetime.time.min:
+            overdue_date += datetime.timedelta(days=1)
+        candidates.append(max(task.due_date + datetime.timedelta(days=1), overdue_date))
+
+        return datetime.datetime.combine(min(candidates), datetime.time.min)
+
+    def _index_task(self, task: Optional[Task], pipe: Any = None):
+        if task is None:
+            return
+        client = pipe if pipe is not None else r.pipeline()
+        if task.status in OPEN_STATUSES:
+            client.zadd(self._open_by_due_key, {task.task_id: task.due_date.toordinal()})
+            client.zadd(self._open_by_next_reminder_key,
+                        {task.task_id: self._datetime_score(self._next_reminder_at(task))})
+        else:
+            client.zrem(self._open_by_due_key, task.task_id)
+            client.zrem(self._open_by_next_reminder_key, task.task_id)
+        if pipe is None:
+            client.execute()
+
+    def reindex_tasks(self, batch_size: int = 1000) -> int:
+        """
+        Rebuilds the open-task indexes from the existing task:* keys.
+        Uses SCAN so Redis is not blocked, and swaps the new indexes in atomically.
+        """
+        self.log.info("Rebuilding task indexes...")
+        tmp_due_key = f"{self._open_by_due_key}:rebuild"
+        tmp_next_key = f"{self._open_by_next_reminder_key}:rebuild"
+        r.delete(tmp_due_key, tmp_next_key)
+
+        indexed = 0
+        keys: List[str] = []
+
+        def flush(batch: List[str]) -> int:
+            count = 0
+            pipe = r.pipeline(transaction=False)
+            for task in self._get_task_stubs([key.split(':', 1)[1] for key in batch]):
+                if task and task.status in OPEN_STATUSES:
+                    pipe.zadd(tmp_due_key, {task.task_id: task.due_date.toordinal()})
+                    pipe.zadd(tmp_next_key, {task.task_id: self._datetime_score(self._next_reminder_at(task))})
+                    count += 1
+            pipe.execute()
+            return count
+
+        for key in r.scan_iter(match=self._get_redis_key('task', '*'), count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                indexed += flush(keys)
+                keys = []
+        if keys:
+            indexed += flush(keys)
+
+        pipe = r.pipeline()
+        pipe.delete(self._open_by_due_key, self._open_by_next_reminder_key)
+        if indexed:
+            pipe.rename(tmp_due_key, self._open_by_due_key)
+            pipe.rename(tmp_next_key, self._open_by_next_reminder_key)
+        pipe.execute()
+        self.log.info("Indexed %s open tasks.", indexed)
+        return indexed
+
+    # --- Reminder selection ---
+
+    def _is_reminder_due(self, task: Task, current_date: datetime.date, reminder_interval_hours: int, due_soon_threshold_days: int) -> bool:
+        current_datetime = datetime.datetime.combine(current_date, datetime.datetime.min.time())
+
+        if task.due_date == current_date:
+            return not task.last_reminder_sent or task.last_reminder_sent.date() < current_date
+        elif task.due_date < current_date:
+            return not task.last_reminder_sent or (current_datetime - task.last_reminder_sent).total_seconds() / 3600 >= reminder_interval_hours
+        elif 0 < (task.due_date - current_date).days <= due_soon_threshold_days:
+            return not task.last_reminder_sent or task.last_reminder_sent.date() < current_date
+        return False
+
+    def is_due_for_reminder(self, task: Task, current_date: datetime.date) -> bool:
+        """Re-checks a single task under the default reminder policy, e.g. when a queued task is picked up."""
+        return task.status in OPEN_STATUSES and self._is_reminder_due(task, current_date, DEFAULT_REMINDER_INTERVAL_HOURS, DEFAULT_DUE_SOON_THRESHOLD_DAYS)
+
+    def attach_dependency_statuses(self, tasks: List[Task]):
+        """
+        Fills `dependent_tasks_status` from each task's cached dependency statuses, in one round trip.
+        Statuses missing from the cache (tasks written before it existed) are loaded in one batch
+        and backfilled, along with the reverse edges that keep them current.
+        """
+        with_deps = [task for task in tasks if task.dependencies]
+        pipe = r.pipeline(transaction=False)
+        for task in with_deps:
+            pipe.hgetall(self._dependency_status_key(task.task_id))
+        cached = pipe.execute() if with_deps else []
+
+        missing = list(dict.fromkeys(dep_id for task, statuses in zip(with_deps, cached)
+                                     for dep_id in task.dependencies if dep_id not in statuses))
+        if missing:
+            loaded = self._load_statuses(missing)
+            pipe = r.pipeline(transaction=False)
+            for task, statuses in zip(with_deps, cached):
+                backfill = {dep_id: loaded[dep_id] for dep_id in task.dependencies if dep_id not in statuses}
+                for dep_id in backfill:
+                    pipe.sadd(self._dependents_key(dep_id), task.task_id)
+                if backfill:
+                    statuses.update(backfill)
+                    # Only missing fields: a status propagated meanwhile is newer than the one just loaded.
+                    self._set_dependency_statuses(pipe, task.task_id, backfill, only_missing=True)
+            pipe.execute()
+
+        cached_by_id = {task.task_id: statuses for task, statuses in zip(with_deps, cached)}
+        for task in tasks:
+            statuses = cached_by_id.get(task.task_id, {})
+            task.dependent_tasks_status = {dep_id: statuses[dep_id] for dep_id in task.dependencies}
+        self._attach_blocker_chains([task for task in tasks if self.is_blocked(task)])
+
+    def _attach_blocker_chains(self, tasks: List[Task]):
+        """
+        Fills `blocker_chain` for blocked tasks: their unresolved dependencies, then what those wait on,
+        up to `blocker_chain_max_depth` levels. Each level is one pipelined read of the status caches
+        for every task at once.
+        """
+        status_by_id: Dict[str, str] = {}
+        waiting_on: Dict[str, List[str]] = {}
+        frontier: List[str] = []
+        for task in tasks:
+            for dep_id, status in task.dependent_tasks_status.items():
+                if status not in RESOLVED_DEPENDENCY_STATUSES and dep_id not in status_by_id:
+                    status_by_id[dep_id] = status
+                    frontier.append(dep_id)
+        for _ in range(self.blocker_chain_max_depth):
+            if not frontier:
+                break
+            pipe = r.pipeline(transaction=False)
+            for blocker_id in frontier:
+                pipe.hgetall(self._dependency_status_key(blocker_id))
+            next_frontier = []
+            for blocker_id, statuses in zip(frontier, pipe.execute()):
+                waiting_on[blocker_id] = [dep_id for dep_id, status in statuses.items() if status not in RESOLVED_DEPENDENCY_STATUSES]
+                for dep_id in waiting_on[blocker_id]:
+                    if dep_id not in status_by_id:
+                        status_by_id[dep_id] = statuses[dep_id]
+                        next_frontier.append(dep_id)
+            frontier = next_frontier
+
+        for task in tasks:
+            chain: List[Blocker] = []
+            queue = [dep_id for dep_id, status in task.dependent_tasks_status.items() if status not in RESOLVED_DEPENDENCY_STATUSES]
+            seen = set(queue)
+            while queue:
+                blocker_id = queue.pop(0)
+                chain.append(Blocker(task_id=blocker_id, status=status_by_id[blocker_id], waiting_on=waiting_on.get(blocker_id, [])))
+                for dep_id in waiting_on.get(blocker_id, []):
+                    if dep_id not in seen and dep_id != task.task_id:
+                        seen.add(dep_id)
+                        queue.append(dep_id)
+            task.blocker_chain = chain
+
+    def get_fired_task_ids(self, after: Optional[datetime.datetime], until: datetime.datetime) -> List[str]:
+        """Open tasks whose next reminder time lies in (`after`, `until`]; all up to `until` when `after` is None."""
+        low = '-inf' if after is None else f"({self._datetime_score(after)}"
+        return r.zrangebyscore(self._open_by_next_reminder_key, low, self._datetime_score(until))
+
+    def get_reminder_stubs(self, task_ids: List[str]) -> List[Optional[Task]]:
+        """Tasks with only the fields the due check needs (see REMINDER_CHECK_FIELDS); aligned with `task_ids`."""
+        return self._get_task_stubs(task_ids)
+
+    def get_tasks_due_for_reminder(self, current_date: datetime.date, reminder_interval_hours: int = DEFAULT_REMINDER_INTERVAL_HOURS, due_soon_threshold_days: int = DEFAULT_DUE_SOON_THRESHOLD_DAYS,
+                                   priorities: Optional[List[str]] = None, assigned_to: Optional[List[str]] = None,
+                                   include: Optional[Callable[[Task], bool]] = None, limit: Optional[int] = None) -> List[Task]:
+        """
+        Open tasks due for a reminder on `current_date`, in index order, optionally only those with one of
+        `priorities`, assigned to one of `assigned_to`, and passing `include` (called with dependency
+        statuses attached). With `limit`, the index is ranged a page at a time and reading stops as soon
+        as `limit` tasks are found, so a small page of a large backlog costs a few small reads.
+        """
+        self.log.debug("Checking for tasks due for reminder on %s...", current_date)
+        if (reminder_interval_hours, due_soon_threshold_days) == (DEFAULT_REMINDER_INTERVAL_HOURS, DEFAULT_DUE_SOON_THRESHOLD_DAYS):
             current_datetime = datetime.datetime.combine(current_date, datetime.datetime.min.time())
+            index_key, max_score = self._open_by_next_reminder_key, self._datetime_score(current_datetime)
+        else:
+            # The next-reminder index is materialised for the default policy only;
+            # for a custom policy, range over the due-date window instead.
+            last_due_date = current_date + datetime.timedelta(days=due_soon_threshold_days)
+            index_key, max_score = self._open_by_due_key, last_due_date.toordinal()
+        recipients = set(assigned_to) if assigned_to else None
+
+        tasks_to_remind: List[Task] = []
+        page_size = max(limit, self.due_scan_page_size) if limit is not None else None
+        start = 0
+        while True:
+            if page_size is None:
+                candidate_ids = r.zrangebyscore(index_key, '-inf', max_score)
+            else:
+                candidate_ids = r.zrangebyscore(index_key, '-inf', max_score, start=start, num=page_size)
+            due_ids = [
+                task.task_id for task in self._get_task_stubs(candidate_ids)
+                if task and task.status in OPEN_STATUSES
+                and (priorities is None or task.priority in priorities)
+                and self._is_reminder_due(task, current_date, reminder_interval_hours, due_soon_threshold_days)
+            ]
+            page = [task for task in self.get_tasks(due_ids) if task and (recipients is None or task.assigned_to in recipients)]
+            self.attach_dependency_statuses(page)
+            tasks_to_remind.extend(task for task in page if include is None or include(task))
+            if page_size is None or len(candidate_ids) < page_size or len(tasks_to_remind) >= limit:
+                break
+            start += page_size
+        if limit is not None:
+            tasks_to_remind = tasks_to_remind[:limit]
 
-            if task.due_date == current_date:
-                if not task.last_reminder_sent or task.last_reminder_sent.date() < current_date:
-                    send_reminder_now = True
-            elif task.due_date < current_date:
-                if not task.last_reminder_sent or (current_datetime - task.last_reminder_sent).total_seconds() / 3600 >= reminder_interval_hours:
-                    send_reminder_now = True
-            elif 0 < (task.due_date - current_date).days <= due_soon_threshold_days:
-                 if not task.last_reminder_sent or task.last_reminder_sent.date() < current_date:
-                    send_reminder_now = True
-
-            if send_reminder_now:
-                dependent_statuses = {}
-                for dep_task_id in task.dependencies:
-                    dep_task = self.get_task(dep_task_id)
-                    dependent_statuses[dep_task_id] = dep_task.status if dep_task else "Not Found"
-                task.dependent_tasks_status = dependent_statuses
-                tasks_to_remind.append(task)
-        
-        print(f"[{self.name}] Found {len(tasks_to_remind)} tasks requiring reminders.")
-        return tasks_to_remind
\ No newline at end of file
+        self.log.info("Found %s tasks requiring reminders.", len(tasks_to_remind))
+        return tasks_to_remind
@@ -0,0 +1,198 @@
+# cmbs_reminder_system/agents/telemetry.py
+"""
+Logging, tracing and metrics shared by the agents.
+
+- `get_logger(name)` returns a logger under "cmbs."; `configure_logging()` (called by the
+  service entry points) sets the level from LOG_LEVEL (default INFO) and the format from
+  LOG_FORMAT: "json" (default; one object per line, with any `extra` fields) or "text".
+- `span(stage, **attributes)` times one pipeline stage. The duration goes to the
+  reminder_stage_seconds histogram and to a DEBUG log record carrying the trace and parent
+  span ids. When the OpenTelemetry API is installed, the span is mirrored to it as well.
+- `InstrumentedRedis` counts and times every Redis command and pipeline.
+- `metrics_payload()` renders every metric in the Prometheus text format.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from redis.client import Pipeline
+from typing import Optional, Any, Dict, Iterator, Tuple
+import datetime
+import json
+import logging
+import os
+import redis
+import sys
+import time
+import uuid
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # optional: spans are still timed and logged without it
+    _otel_trace = None
+
+STAGE_SECONDS = Histogram(
+    "reminder_stage_seconds", "Duration of reminder pipeline stages.", ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+STAGE_ERRORS = Counter("reminder_stage_errors_total", "Pipeline stages that raised.", ["stage"])
+LLM_TOKENS = Counter("reminder_llm_tokens_total", "Tokens sent to and received from the LLM.", ["direction"])
+LLM_CALL_TOKENS = Histogram(
+    "reminder_llm_call_tokens", "Tokens per LLM call, prompt (system instruction included) and completion.", ["direction"],
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+REMINDERS = Counter("reminder_outcomes_total", "Reminder outcomes reported by sweeps.", ["status"])
+REDIS_COMMANDS = Counter("redis_commands_total", "Redis commands issued, pipelined ones included.", ["command"])
+REDIS_SECONDS = Histogram(
+    "redis_request_seconds", "Redis round-trip latency: one command, or one pipeline execute.", ["operation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+REDIS_ERRORS = Counter("redis_errors_total", "Redis round trips that raised.", ["operation"])
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# --- Logging ---
+
+_STANDARD_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, the active span, and any `extra` fields."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        current = _current_span.get()
+        if current is not None:
+            entry.update(trace_id=current.trace_id, span_id=current.span_id)
+        entry.update((key, value) for key, value in vars(record).items() if key not in _STANDARD_RECORD_FIELDS)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.getenv("LOG_FORMAT", "json")
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JSONFormatter() if fmt == "json" else logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    root = logging.getLogger("cmbs")
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    root.propagate = False
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"cmbs.{name}")
+
+_span_logger = get_logger("trace")
+
+# --- Tracing ---
+
+class Span:
+    """One timed pipeline stage; attributes set on it are logged and, with OpenTelemetry, exported."""
+    def __init__(self, stage: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.stage = stage
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self._otel_span: Any = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self._otel_span is not None and value is not None:
+            self._otel_span.set_attribute(key, value)
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[Span]:
+    current = Span(stage, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    otel_context = None
+    if _otel_trace is not None:
+        otel_context = _otel_trace.get_tracer("cmbs.reminders").start_as_current_span(
+            stage, attributes={key: value for key, value in attributes.items() if value is not None})
+    if otel_context is not None:
+        current._otel_span = otel_context.__enter__()
+    started = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        if error is not None:
+            STAGE_ERRORS.labels(stage).inc()
+        if otel_context is not None:
+            otel_context.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+        _current_span.reset(token)
+        if _span_logger.isEnabledFor(logging.DEBUG):
+            _span_logger.debug("span %s finished in %.1f ms", stage, elapsed * 1000, extra={
+                "stage": stage, "duration_ms": round(elapsed * 1000, 3), "trace_id": current.trace_id,
+                "span_id": current.span_id, "parent_id": current.parent_id, "error": repr(error) if error else None,
+                **current.attributes,
+            })
+
+def record_llm_tokens(prompt_tokens: int, completion_tokens: int):
+    LLM_TOKENS.labels("prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels("completion").inc(completion_tokens)
+    LLM_CALL_TOKENS.labels("prompt").observe(prompt_tokens)
+    LLM_CALL_TOKENS.labels("completion").observe(completion_tokens)
+
+def record_reminder_outcome(status: str):
+    REMINDERS.labels(status).inc()
+
+# --- Redis ---
+
+def _observe_redis(operation: str, started: float, failed: bool):
+    REDIS_SECONDS.labels(operation).observe(time.perf_counter() - started)
+    if failed:
+        REDIS_ERRORS.labels(operation).inc()
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        for args, _ in self.command_stack:
+            REDIS_COMMANDS.labels(str(args[0]).upper()).inc()
+        started, failed = time.perf_counter(), True
+        try:
+            result = super().execute(raise_on_error)
+            failed = False
+            return result
+        finally:
+            _observe_redis("PIPELINE", started, failed)
+
+    def immediate_execute_command(self, *args, **options):
+        # Commands issued directly on a pipeline while it WATCHes keys.
+        command = str(args[0]).upper()
+        REDIS_COMMANDS.labels(command).inc()
+        started, failed = time.perf_counter(), True
+        try:
+            result = super().immediate_execute_command(*args, **options)
+            failed = False
+            return result
+        finally:
+            _observe_redis(command, started, failed)
+
+class InstrumentedRedis(redis.StrictRedis):
+    """A Redis client that counts every command and times every round trip."""
+    def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        REDIS_COMMANDS.labels(command).inc()
+        started, failed = time.perf_counter(), True
+        try:
+            result = super().execute_command(*args, **options)
+            failed = False
+            return result
+        finally:
+            _observe_redis(command, started, failed)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+# --- Exposition ---
+
+def metrics_payload() -> Tuple[bytes, str]:
+    """The default Prometheus registry, rendered for a /metrics response."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,188 @@
+# cmbs_reminder_system/agents/templates.py
+from .llm_cache import overdue_bucket
+from models import CombinedContext
+from string import Template
+from typing import Optional, Dict, List
+import datetime
+import os
+import re
+import threading
+
+_SIGN_OFF = "\n\nBest regards,\n\nCMBS Asset Management System"
+
+# Keyed by (task_type, priority, timing); None matches any value. Lookup goes from most to least
+# specific, task type before priority, so every timing has a generic template. Templates are compiled once at import.
+_TEMPLATE_SOURCES = {
+    (None, None, "due_soon"): (
+        "Upcoming: $description ($task_id) due $due_date",
+        "This is a reminder that your task $task_id, \"$description\"$asset_clause, is due on $due_date "
+        "($days_until_due from now). Current status: $status; priority: $priority.$update_sentence"
+        "$dependency_sentence\n\nPlease make sure it is on track and update the task once it is complete.",
+    ),
+    (None, None, "due_today"): (
+        "Due today: $description ($task_id)",
+        "Your task $task_id, \"$description\"$asset_clause, is due today ($due_date). "
+        "Current status: $status; priority: $priority.$update_sentence$dependency_sentence\n\n"
+        "Please complete it today or update the task with a revised timeline.",
+    ),
+    (None, None, "overdue"): (
+        "Overdue by $days_overdue: $description ($task_id)",
+        "Your task $task_id, \"$description\"$asset_clause, was due on $due_date and is now overdue by "
+        "$days_overdue. Current status: $status; priority: $priority.$update_sentence$dependency_sentence\n\n"
+        "Please complete it as soon as possible or update the task with the reason for the delay and a new target date.",
+    ),
+    # Critical tasks normally go to the LLM; these are used while the LLM is unavailable.
+    (None, "Critical", "due_today"): (
+        "CRITICAL - due today: $description ($task_id)",
+        "Your critical task $task_id, \"$description\"$asset_clause, is due today ($due_date). "
+        "Current status: $status.$update_sentence$dependency_sentence\n\n"
+        "Please complete it today. If it cannot be completed, escalate now and update the task with a revised timeline.",
+    ),
+    (None, "Critical", "overdue"): (
+        "CRITICAL - overdue by $days_overdue: $description ($task_id)",
+        "Your critical task $task_id, \"$description\"$asset_clause, was due on $due_date and is now overdue by "
+        "$days_overdue. Current status: $status.$update_sentence$dependency_sentence\n\n"
+        "This needs your immediate attention. Please complete it or escalate today, and update the task with a new target date.",
+    ),
+    (None, "High", "overdue"): (
+        "Action required - overdue by $days_overdue: $description ($task_id)",
+        "Your high-priority task $task_id, \"$description\"$asset_clause, was due on $due_date and is now overdue by "
+        "$days_overdue. Current status: $status.$update_sentence$dependency_sentence\n\n"
+        "Please make it a priority to complete it, or update the task with the reason for the delay and a new target date.",
+    ),
+    (None, "Low", "due_soon"): (
+        "Heads-up: $description ($task_id) due $due_date",
+        "A quick heads-up that your task $task_id, \"$description\"$asset_clause, is due on $due_date "
+        "($days_until_due from now). Current status: $status.$update_sentence$dependency_sentence\n\n"
+        "No action is needed yet if it is on track.",
+    ),
+    ("Financial Statement Collection", None, "due_soon"): (
+        "Upcoming: financial statements due $due_date ($task_id)",
+        "Financial statements for $property_id are due on $due_date ($days_until_due from now) under task "
+        "$task_id, \"$description\".$update_sentence$dependency_sentence\n\n"
+        "Please confirm with the property manager that the statements will be delivered on time.",
+    ),
+    ("Financial Statement Collection", None, "overdue"): (
+        "Overdue by $days_overdue: financial statements for $property_id ($task_id)",
+        "Financial statements for $property_id under task $task_id, \"$description\", were due on $due_date and are "
+        "now overdue by $days_overdue.$update_sentence$dependency_sentence\n\n"
+        "Please follow up with the property manager and record the expected delivery date on the task.",
+    ),
+    ("Inspection Schedule", None, "due_soon"): (
+        "Upcoming: inspection for $property_id due $due_date ($task_id)",
+        "The inspection for $property_id (task $task_id, \"$description\") is due on $due_date "
+        "($days_until_due from now).$update_sentence$dependency_sentence\n\n"
+        "Please confirm the inspection date with the site contact.",
+    ),
+}
+_TEMPLATES = {key: (Template(subject), Template(body + _SIGN_OFF)) for key, (subject, body) in _TEMPLATE_SOURCES.items()}
+
+def _days(count: int) -> str:
+    return f"{count} day" if count == 1 else f"{count} days"
+
+# Whole words or phrases; a trailing * matches any word starting with the stem (escalat* matches escalated).
+_DEFAULT_BLOCKER_KEYWORDS = "no response,blocked,blocker,waiting on,delay*,unable,issue,issues,dispute*,escalat*,default*"
+
+def _keyword_pattern(keywords: List[str]) -> Optional[re.Pattern]:
+    """Compiles the keywords into one case-insensitive regex matching on word boundaries."""
+    alternatives = []
+    for keyword in keywords:
+        prefix = keyword.endswith("*")
+        words = keyword.rstrip("*").split()
+        if words:
+            alternatives.append(r"\s+".join(map(re.escape, words)) + ("" if prefix else r"\b"))
+    return re.compile(r"\b(?:" + "|".join(alternatives) + ")", re.IGNORECASE) if alternatives else None
+
+class TierStats:
+    """Thread-safe count and latency per generation tier (template, cache, llm, fallback)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict[str, float]] = {}
+
+    def record(self, tier: str, seconds: float, count: int = 1):
+        with self._lock:
+            tier_stats = self._tiers.setdefault(tier, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            tier_stats["count"] += count
+            tier_stats["total_seconds"] += seconds * count
+            tier_stats["max_seconds"] = max(tier_stats["max_seconds"], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            total = sum(tier_stats["count"] for tier_stats in self._tiers.values())
+            return {
+                tier: {
+                    "count": tier_stats["count"],
+                    "share": tier_stats["count"] / total if total else 0.0,
+                    "avg_seconds": tier_stats["total_seconds"] / tier_stats["count"] if tier_stats["count"] else 0.0,
+                    "max_seconds": tier_stats["max_seconds"],
+                }
+                for tier, tier_stats in self._tiers.items()
+            }
+
+class ReminderTemplateRouter:
+    """
+    Rule-driven first tier of reminder generation. Routine reminders are rendered from precompiled
+    templates selected by task type, priority and overdue bucket; cases that need a richer narrative
+    (high-stakes priorities, covenant work, blockers, long-overdue tasks) are routed to the LLM.
+    """
+    def __init__(self, llm_priorities: Optional[List[str]] = None, max_template_days_overdue: Optional[int] = None,
+                 blocker_keywords: Optional[List[str]] = None):
+        self.llm_priorities = set(llm_priorities or os.getenv("TEMPLATE_LLM_PRIORITIES", "Critical").split(","))
+        self.max_template_days_overdue = max_template_days_overdue if max_template_days_overdue is not None else int(os.getenv("TEMPLATE_MAX_DAYS_OVERDUE", 7))
+        self.blocker_keywords = [keyword.strip().lower() for keyword in
+                                 (blocker_keywords or os.getenv("TEMPLATE_BLOCKER_KEYWORDS", _DEFAULT_BLOCKER_KEYWORDS).split(","))]
+        self._blocker_pattern = _keyword_pattern(self.blocker_keywords)
+
+    def llm_reason(self, context: CombinedContext, today: datetime.date) -> Optional[str]:
+        """Returns why the reminder needs the LLM, or None if a template is good enough."""
+        task = context.task_context
+        if task.priority in self.llm_priorities:
+            return f"priority {task.priority}"
+        if "covenant" in f"{task.task_type or ''} {task.description}".lower():
+            return "covenant-related"
+        if self._blocker_pattern and self._blocker_pattern.search(task.last_update_notes or ""):
+            return "blocker in last update"
+        if any(dep_status != "Completed" for dep_status in task.dependent_tasks_status.values()):
+            return "open dependencies"
+        if (today - task.due_date).days > self.max_template_days_overdue:
+            return "long overdue"
+        return None
+
+    def render(self, context: CombinedContext, today: datetime.date) -> str:
+        """Renders the best matching template as 'Subject: ...' followed by the body."""
+        task = context.task_context
+        bucket = overdue_bucket(task.due_date, today)
+        timing = "overdue" if bucket.startswith("overdue") else bucket
+        for key in ((task.task_type, task.priority, timing), (task.task_type, None, timing),
+                    (None, task.priority, timing), (None, None, timing)):
+            if key in _TEMPLATES:
+                subject_template, body_template = _TEMPLATES[key]
+                break
+
+        assets = [value for value in (task.property_id, f"Loan {task.loan_id}" if task.loan_id else None) if value]
+        update_sentence = ""
+        if task.last_update_notes:
+            update_sentence = f" Your last update ({task.last_update_date or 'N/A'}) noted: \"{task.last_update_notes}\"."
+        open_dependencies = [dep_id for dep_id, dep_status in task.dependent_tasks_status.items() if dep_status != "Completed"]
+        dependency_sentence = ""
+        if open_dependencies:
+            dependency_sentence = f" Outstanding dependencies: {', '.join(open_dependencies)}."
+            upstream = [blocker.task_id for blocker in task.blocker_chain if blocker.task_id not in task.dependent_tasks_status]
+            if upstream:
+                dependency_sentence += f" They are in turn waiting on {', '.join(upstream)}."
+        elif task.dependent_tasks_status:
+            dependency_sentence = " All dependent tasks are completed."
+        values = {
+            "task_id": task.task_id,
+            "description": task.description,
+            "asset_clause": f" for {', '.join(assets)}" if assets else "",
+            "property_id": task.property_id or "the property",
+            "due_date": task.due_date.strftime('%Y-%m-%d'),
+            "days_overdue": _days((today - task.due_date).days),
+            "days_until_due": _days((task.due_date - today).days),
+            "status": task.status,
+            "priority": task.priority,
+            "update_sentence": update_sentence,
+            "dependency_sentence": dependency_sentence,
+        }
+        return f"Subject: {subject_template.substitute(values)}\n\n{body_template.substitute(values)}"
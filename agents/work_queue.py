@@ -0,0 +1,177 @@
+# cmbs_reminder_system/agents/work_queue.py
+from .base import r
+from .telemetry import get_logger
+from models import ReminderResponse, SweepStatus
+from typing import Optional, List, Dict, Any
+import datetime
+import os
+import redis
+import socket
+import time
+import uuid
+
+class ReminderWorkQueue:
+    """
+    Redis Streams queue of due task ids, consumed by a consumer group of reminder workers.
+
+    A message stays pending until a worker acks it. Messages left pending for longer than
+    the visibility timeout (e.g. their worker crashed) are reclaimed by other workers; after
+    `max_deliveries` attempts they are moved to the dead-letter stream. Each sweep keeps its
+    progress in a sweep:<id> hash and its per-task results in a sweep:<id>:results list.
+
+    Acked messages are deleted from the queue stream, since their outcome lives in the sweep's
+    results. Both streams are also capped at about `queue_max_len`/`dead_letter_max_len` entries.
+    """
+    def __init__(self, stream_key: str = "reminders:queue", group: str = "reminder-workers",
+                 dead_letter_key: str = "reminders:dead_letter", visibility_timeout_seconds: Optional[float] = None,
+                 max_deliveries: Optional[int] = None, sweep_ttl_seconds: int = 7 * 24 * 3600,
+                 queue_max_len: Optional[int] = None, dead_letter_max_len: Optional[int] = None):
+        self.stream_key = stream_key
+        self.group = group
+        self.dead_letter_key = dead_letter_key
+        self.visibility_timeout_ms = int(1000 * (visibility_timeout_seconds or float(os.getenv("REMINDER_QUEUE_VISIBILITY_TIMEOUT_SECONDS", 300))))
+        self.max_deliveries = max_deliveries or int(os.getenv("REMINDER_QUEUE_MAX_DELIVERIES", 3))
+        self.sweep_ttl_seconds = sweep_ttl_seconds
+        self.queue_max_len = queue_max_len or int(os.getenv("REMINDER_QUEUE_MAX_LEN", 1000000))
+        self.dead_letter_max_len = dead_letter_max_len or int(os.getenv("REMINDER_DEAD_LETTER_MAX_LEN", 100000))
+
+    def ensure_group(self):
+        try:
+            r.xgroup_create(self.stream_key, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def _sweep_key(sweep_id: str) -> str:
+        return f"sweep:{sweep_id}"
+
+    # --- Producer side ---
+
+    def create_sweep(self, current_date: datetime.date, task_ids: List[str]) -> str:
+        self.ensure_group()
+        sweep_id = uuid.uuid4().hex
+        sweep_key = self._sweep_key(sweep_id)
+        pipe = r.pipeline()
+        pipe.hset(sweep_key, mapping={
+            "status": "queued" if task_ids else "completed",
+            "current_date": current_date.isoformat(),
+            "total": len(task_ids),
+            "done": 0,
+            "failed": 0,
+            "created_at": datetime.datetime.now().isoformat(),
+        })
+        pipe.expire(sweep_key, self.sweep_ttl_seconds)
+        for task_id in task_ids:
+            pipe.xadd(self.stream_key, {"sweep_id": sweep_id, "task_id": task_id, "current_date": current_date.isoformat()},
+                      maxlen=self.queue_max_len, approximate=True)
+        pipe.execute()
+        return sweep_id
+
+    def get_sweep(self, sweep_id: str, include_results: bool = False, offset: int = 0, limit: int = 100) -> Optional[SweepStatus]:
+        """The sweep's progress and, with `include_results`, one page of its per-task outcomes in completion order."""
+        sweep_key = self._sweep_key(sweep_id)
+        fields = r.hgetall(sweep_key)
+        if not fields:
+            return None
+        results = []
+        if include_results:
+            results = [ReminderResponse.model_validate_json(result)
+                       for result in r.lrange(f"{sweep_key}:results", offset, offset + limit - 1)]
+        return SweepStatus(sweep_id=sweep_id, results=results, **fields)
+
+    # --- Consumer side ---
+
+    def read(self, consumer: str, count: int = 10, block_ms: int = 5000) -> List[tuple[str, Dict[str, str]]]:
+        """Returns up to `count` messages: first ones reclaimed from crashed workers, then new ones."""
+        messages = self._reclaim_stale(consumer, count)
+        if len(messages) < count:
+            streams = r.xreadgroup(self.group, consumer, {self.stream_key: ">"}, count=count - len(messages),
+                                   block=None if messages else block_ms)
+            for _, stream_messages in streams or []:
+                messages.extend(stream_messages)
+        return messages
+
+    def _reclaim_stale(self, consumer: str, count: int) -> List[tuple[str, Dict[str, str]]]:
+        pending = r.xpending_range(self.stream_key, self.group, min="-", max="+", count=count, idle=self.visibility_timeout_ms)
+        to_claim = []
+        for entry in pending:
+            if entry["times_delivered"] >= self.max_deliveries:
+                self._dead_letter(entry["message_id"], f"Exceeded {self.max_deliveries} deliveries")
+            else:
+                to_claim.append(entry["message_id"])
+        if not to_claim:
+            return []
+        return [(message_id, fields) for message_id, fields in
+                r.xclaim(self.stream_key, self.group, consumer, min_idle_time=self.visibility_timeout_ms, message_ids=to_claim)
+                if fields]
+
+    def _dead_letter(self, message_id: str, reason: str):
+        entries = r.xrange(self.stream_key, min=message_id, max=message_id)
+        if entries:
+            fields = entries[0][1]
+            r.xadd(self.dead_letter_key, {**fields, "message_id": message_id, "reason": reason},
+                   maxlen=self.dead_letter_max_len, approximate=True)
+            response = ReminderResponse(task_id=fields["task_id"], recipient="", subject="Error", message="", status="Failed", error=reason)
+            self.ack(message_id, fields["sweep_id"], response)
+        else:
+            r.xack(self.stream_key, self.group, message_id)
+            r.xdel(self.stream_key, message_id)
+
+    def ack(self, message_id: str, sweep_id: str, response: ReminderResponse):
+        """Acknowledges and deletes a message, and records its outcome against the sweep."""
+        sweep_key = self._sweep_key(sweep_id)
+        succeeded = response.status in ("Reminder Sent", "Skipped")
+        pipe = r.pipeline()
+        pipe.xack(self.stream_key, self.group, message_id)
+        pipe.xdel(self.stream_key, message_id)
+        pipe.rpush(f"{sweep_key}:results", response.model_dump_json())
+        pipe.expire(f"{sweep_key}:results", self.sweep_ttl_seconds)
+        pipe.hincrby(sweep_key, "done" if succeeded else "failed", 1)
+        pipe.hset(sweep_key, "status", "running")
+        pipe.hmget(sweep_key, "total", "done", "failed")
+        total, done, failed = (int(value) for value in pipe.execute()[-1])
+        if done + failed >= total:
+            r.hset(sweep_key, mapping={"status": "completed", "finished_at": datetime.datetime.now().isoformat()})
+
+class ReminderWorker:
+    """
+    Consumes the reminder queue: loads each batch of queued tasks, runs context, LLM and
+    notification through the orchestrator, and acks every message with its outcome.
+    """
+    def __init__(self, orchestrator: Any, queue: ReminderWorkQueue, consumer: Optional[str] = None, batch_size: int = 10):
+        self.orchestrator = orchestrator
+        self.queue = queue
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.name = f"ReminderWorker[{self.consumer}]"
+        self.log = get_logger(self.name)
+
+    def run_once(self, block_ms: int = 5000) -> int:
+        messages = self.queue.read(self.consumer, count=self.batch_size, block_ms=block_ms)
+        by_date: Dict[str, List[tuple[str, Dict[str, str]]]] = {}
+        for message_id, fields in messages:
+            by_date.setdefault(fields["current_date"], []).append((message_id, fields))
+
+        for current_date, date_messages in by_date.items():
+            responses = self.orchestrator.process_queued_tasks(
+                [fields["task_id"] for _, fields in date_messages], datetime.date.fromisoformat(current_date))
+            for (message_id, fields), response in zip(date_messages, responses):
+                self.queue.ack(message_id, fields["sweep_id"], response)
+        return len(messages)
+
+    def run_forever(self):
+        self.queue.ensure_group()
+        self.log.info("Consuming %s as part of group %s.", self.queue.stream_key, self.queue.group)
+        while True:
+            try:
+                processed = self.run_once()
+                if processed:
+                    self.log.info("Processed %s queued reminders.", processed)
+            except redis.ConnectionError as e:
+                self.log.warning("Redis unavailable: %s", e)
+                time.sleep(1)
+            except Exception as e:
+                # Unacknowledged messages are reclaimed after the visibility timeout, so keep consuming.
+                self.log.exception("Processing queued reminders failed: %s", e)
+                time.sleep(1)
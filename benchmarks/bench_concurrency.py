@@ -0,0 +1,83 @@
+# cmbs_reminder_system/benchmarks/bench_concurrency.py
+"""
+Runs a reminder sweep with a fake LLM that sleeps, sequentially and with the concurrent
+orchestrator, and checks both return the same responses in the same order.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_concurrency --tasks 200 --latency 0.05 --concurrency 1 8 32
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import re
+from benchmarks.common import RoundTripCounter, make_redis_client, install_redis_client, Timer
+from agents.task_manager import TaskManagerAgent
+from agents.contextualizer import ContextualizerAgent
+from agents.prompt_generator import GenAIPromptGeneratorAgent
+from benchmarks.common import FakeGeminiModel
+from agents.notification import NotificationAgent
+from agents.orchestrator import OrchestratorAgent
+from models import ReminderRequest
+
+class RecordingNotifier(NotificationAgent):
+    def __init__(self):
+        super().__init__(channels=[])
+        self.sent = []
+
+    def send_reminder(self, recipient: str, subject: str, message: str, task_ids=None) -> bool:
+        self.sent.append((recipient, re.search(r"TASK-\d+", subject).group(0)))
+        return True
+
+def run_sweep(backend: str, tasks: int, recipients: int, latency: float, concurrency: int):
+    client = make_redis_client(backend, RoundTripCounter())
+    install_redis_client(client)
+    with contextlib.redirect_stdout(io.StringIO()):
+        task_manager = TaskManagerAgent()
+        notifier = RecordingNotifier()
+        orchestrator = OrchestratorAgent(task_manager, ContextualizerAgent(),
+                                         GenAIPromptGeneratorAgent(llm_model=FakeGeminiModel(latency)),
+                                         notifier, max_concurrency=concurrency)
+        today = datetime.date.today()
+        for i in range(tasks):
+            task_manager.add_task({
+                "description": f"Synthetic overdue task {i}",
+                "due_date": today - datetime.timedelta(days=i % 10),
+                "assigned_to": f"manager{i % recipients}@cmbs.com",
+                "property_id": "PROP-GRND", "loan_id": "LOAN-GWR-001",
+                # Critical tasks always go to the LLM rather than the template tier.
+                "priority": "Critical",
+            })
+        with Timer() as timer:
+            responses = orchestrator.process_reminder_request(ReminderRequest(current_date=today))
+    return responses, notifier.sent, timer.elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fake", "redis"], default="fake")
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--recipients", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency in seconds.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'concurrency':>11} {'reminders':>9} {'wall (s)':>9} {'speed-up':>9}")
+    for concurrency in args.concurrency:
+        responses, sent, elapsed = run_sweep(args.backend, args.tasks, args.recipients, args.latency, concurrency)
+        summary = [(resp.task_id, resp.status) for resp in responses]
+        sends_by_recipient = {}
+        for recipient, task_id in sent:
+            sends_by_recipient.setdefault(recipient, []).append(task_id)
+        due_by_recipient = {}
+        for resp in responses:
+            due_by_recipient.setdefault(resp.recipient, []).append(resp.task_id)
+        if baseline is None:
+            baseline = (summary, elapsed)
+        assert summary == baseline[0], "concurrent sweep returned different responses"
+        assert all(status == "Reminder Sent" for _, status in summary)
+        assert sends_by_recipient == due_by_recipient, "per-recipient send order differs from due-task order"
+        print(f"{concurrency:>11} {len(responses):>9} {elapsed:>9.3f} {baseline[1] / elapsed:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
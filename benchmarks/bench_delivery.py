@@ -0,0 +1,92 @@
+# cmbs_reminder_system/benchmarks/bench_delivery.py
+"""
+Delivery throughput against a local HTTP webhook stub that adds a fixed latency per request.
+Compares one POST on a fresh connection per reminder (the naive transport) with HTTPChannel
+at different batch sizes, with `--callers` threads sending concurrently as the orchestrator's
+delivery pool does.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_delivery --messages 500 --callers 16 --latency 0.02
+"""
+import argparse
+import contextlib
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+from benchmarks.common import RoundTripCounter, make_redis_client, install_redis_client, Timer
+from agents.channels import HTTPChannel
+from agents.notification import NotificationAgent
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.messages = 0
+
+def start_stub(latency: float, stats: StubStats) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            with stats.lock:
+                stats.connections += 1
+            super().setup()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with stats.lock:
+                stats.requests += 1
+                stats.messages += len(body.get("deliveries", [body]))
+            threading.Event().wait(latency)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--callers", type=int, default=16, help="Threads calling send_reminder concurrently.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency per HTTP request, in seconds.")
+    parser.add_argument("--concurrency", type=int, default=4, help="HTTPChannel sender threads.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    install_redis_client(make_redis_client("fake", RoundTripCounter()))
+    messages = [(f"manager{i % 50}@cmbs.com", f"Reminder {i}", "Please review the task. " * 20) for i in range(args.messages)]
+
+    print(f"{'transport':>22} {'wall (s)':>9} {'msgs/s':>8} {'requests':>9} {'connections':>12}")
+    configurations = [("fresh connection/send", None)] + [(f"channel batch={size}", size) for size in args.batch_sizes]
+    for label, batch_size in configurations:
+        stats = StubStats()
+        server = start_stub(args.latency, stats)
+        url = f"http://127.0.0.1:{server.server_port}/deliveries"
+        if batch_size is None:
+            send = lambda message: requests.post(url, json=dict(zip(("recipient", "subject", "message"), message)), timeout=10).ok
+            notifier = None
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                notifier = NotificationAgent(channels=[HTTPChannel(url, concurrency=args.concurrency, max_batch_size=batch_size)])
+            send = lambda message: notifier.send_reminder(*message)
+
+        with ThreadPoolExecutor(max_workers=args.callers) as callers, Timer() as timer:
+            delivered = sum(callers.map(send, messages))
+        if notifier:
+            notifier.close()
+        server.shutdown()
+        assert delivered == len(messages) == stats.messages, (label, delivered, stats.messages)
+        print(f"{label:>22} {timer.elapsed:>9.3f} {len(messages) / timer.elapsed:>8.0f} {stats.requests:>9} {stats.connections:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# cmbs_reminder_system/benchmarks/bench_due_check.py
+"""
+Compares the original per-task due check (KEYS scan, one GET per task and per dependency)
+with the indexed, batched `TaskManagerAgent.get_tasks_due_for_reminder`.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_due_check --backend fake --sizes 10000 100000
+    python -m benchmarks.bench_due_check --backend redis   # uses REDIS_HOST/REDIS_PORT, FLUSHES the DB
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import random
+from benchmarks.common import RoundTripCounter, make_redis_client, install_redis_client, Timer
+from agents.task_manager import TaskManagerAgent, OPEN_STATUSES
+from agents.base import encode_hash_fields, decode_hash_fields, TRANSIENT_FIELDS
+from models import Task
+
+STATUSES = ["Pending", "In Progress", "Completed", "Completed"]
+
+def populate(client, task_manager: TaskManagerAgent, size: int, today: datetime.date, seed: int = 42):
+    rng = random.Random(seed)
+    pipe = client.pipeline(transaction=False)
+    for i in range(1, size + 1):
+        task = Task(
+            task_id=f"TASK-{i:04d}",
+            description=f"Synthetic task {i}",
+            due_date=today + datetime.timedelta(days=rng.randint(-90, 90)),
+            assigned_to=f"manager{rng.randint(1, 200)}@cmbs.com",
+            status=rng.choice(STATUSES),
+            dependencies=[f"TASK-{rng.randint(1, size):04d}" for _ in range(rng.randint(0, 3))],
+            last_reminder_sent=(datetime.datetime.combine(today, datetime.time.min)
+                                - datetime.timedelta(hours=rng.randint(1, 72))) if rng.random() < 0.5 else None,
+        )
+        pipe.hset(f"task:{task.task_id}", mapping=encode_hash_fields(task.model_dump(mode="json", exclude=TRANSIENT_FIELDS['task']))[0])
+        task_manager._index_task(task, pipe)
+        if i % 5000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+def load_task(client, key: str):
+    fields = client.hgetall(key)
+    return Task.model_validate(decode_hash_fields(Task, fields)) if fields else None
+
+def legacy_due_check(client, task_manager: TaskManagerAgent, current_date: datetime.date):
+    """The pre-index algorithm (on the current storage layout), kept here as the comparison baseline."""
+    tasks_to_remind = []
+    for key in client.keys("task:*"):
+        task = load_task(client, key)
+        if not task or task.status not in OPEN_STATUSES:
+            continue
+        if task_manager._is_reminder_due(task, current_date, 24, 7):
+            statuses = {}
+            for dep_id in task.dependencies:
+                dep_task = load_task(client, f"task:{dep_id}")
+                statuses[dep_id] = dep_task.status if dep_task else "Not Found"
+            task.dependent_tasks_status = statuses
+            tasks_to_remind.append(task)
+    return tasks_to_remind
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fake", "redis"], default="fake")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    today = datetime.date.today()
+    print(f"{'tasks':>8} {'path':>8} {'due':>7} {'round trips':>12} {'wall (s)':>9}")
+    for size in args.sizes:
+        counter = RoundTripCounter()
+        client = make_redis_client(args.backend, counter)
+        install_redis_client(client)
+        with contextlib.redirect_stdout(io.StringIO()):
+            task_manager = TaskManagerAgent()
+        populate(client, task_manager, size, today)
+
+        for path, run in (("legacy", lambda: legacy_due_check(client, task_manager, today)),
+                          ("indexed", lambda: task_manager.get_tasks_due_for_reminder(today))):
+            counter.reset()
+            with contextlib.redirect_stdout(io.StringIO()), Timer() as timer:
+                due = run()
+            print(f"{size:>8} {path:>8} {len(due):>7} {counter.count:>12} {timer.elapsed:>9.3f}")
+        client.flushdb()
+
+if __name__ == "__main__":
+    main()
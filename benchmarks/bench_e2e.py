@@ -0,0 +1,259 @@
+# cmbs_reminder_system/benchmarks/bench_e2e.py
+"""
+End-to-end reminder sweep on a synthetic portfolio: OrchestratorAgent.process_reminder_request
+against a local Redis, a fake Gemini with a configurable latency distribution and a null notifier.
+
+Reports sweep wall time, p50/p95/p99 per pipeline stage, Redis commands and round trips per
+due task, LLM prompt and completion tokens per call, and peak Python heap during the sweep (tracemalloc; disable with --no-memory, which
+also removes its overhead from the timings). On the redis backend it also reports the server
+memory the portfolio uses.
+
+--check compares the run with the scenario's entry in benchmarks/baseline.json and exits
+non-zero on a regression. Outcome counts must match exactly. Redis commands and round trips
+per task, and prompt tokens per LLM call, may grow by at most --ops-tolerance (default 10%). Peak heap may grow by at most
+--memory-tolerance (default 25%). Timings may grow by at most --time-tolerance (default 50%)
+plus --time-slack-ms; they are only checked with --check-timings, since they depend on the machine.
+--update-baseline records the run as the new baseline.
+
+Latency distributions (seconds): fixed:0.05, uniform:0.02:0.08, lognormal:<median>:<sigma>.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_e2e --scenario small --check
+    python -m benchmarks.bench_e2e --scenario medium --llm-latency lognormal:0.2:0.6 --concurrency 32
+    python -m benchmarks.bench_e2e --scenario small --update-baseline
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from prometheus_client import REGISTRY
+from typing import Dict, List, Any, Callable
+from benchmarks.common import RoundTripCounter, make_redis_client, install_redis_client, Timer
+from benchmarks.portfolio import generate_portfolio, load_portfolio
+from agents.task_manager import TaskManagerAgent
+from agents.contextualizer import ContextualizerAgent
+from agents.prompt_generator import GenAIPromptGeneratorAgent
+from benchmarks.common import FakeGeminiModel
+from agents.notification import NotificationAgent
+from agents.orchestrator import OrchestratorAgent
+from models import ReminderRequest
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+CURRENT_DATE = datetime.date(2025, 7, 15)
+
+SCENARIOS = {
+    "small": {"tasks": 1000, "properties": 100, "loans": 100, "recipients": 50},
+    "medium": {"tasks": 10000, "properties": 1000, "loans": 1000, "recipients": 200},
+    "large": {"tasks": 100000, "properties": 5000, "loans": 5000, "recipients": 1000},
+}
+
+class NullNotifier(NotificationAgent):
+    """Accepts every reminder without sending it anywhere."""
+    def __init__(self):
+        super().__init__(channels=[])
+
+    def send_reminder(self, recipient: str, subject: str, message: str, task_ids=None) -> bool:
+        return True
+
+def latency_sampler(spec: str) -> Callable:
+    kind, *params = spec.split(":")
+    values = [float(param) for param in params]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise argparse.ArgumentTypeError(f"Unknown latency distribution '{spec}'")
+
+class StageTimer:
+    """Wraps agent methods so every call's duration is recorded under a stage name."""
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, obj: Any, method: str, stage: str):
+        original = getattr(obj, method)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+
+        setattr(obj, method, timed)
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            pick = lambda q: ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+            result[stage] = {"calls": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+        return result
+
+def llm_tokens(direction: str) -> float:
+    return REGISTRY.get_sample_value("reminder_llm_tokens_total", {"direction": direction}) or 0.0
+
+def run(args: argparse.Namespace, scenario: Dict[str, int]) -> Dict[str, Any]:
+    counter = RoundTripCounter()
+    client = make_redis_client(args.backend, counter)
+    install_redis_client(client)
+    stages = StageTimer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        task_manager = TaskManagerAgent()
+        contextualizer = ContextualizerAgent()
+        llm_model = FakeGeminiModel(latency_sampler=latency_sampler(args.llm_latency), seed=args.seed)
+        prompt_generator = GenAIPromptGeneratorAgent(llm_model=llm_model)
+        orchestrator = OrchestratorAgent(task_manager, contextualizer, prompt_generator, NullNotifier(),
+                                         max_concurrency=args.concurrency)
+
+        portfolio = generate_portfolio(current_date=CURRENT_DATE, seed=args.seed, **scenario)
+        redis_memory_before = client.info("memory")["used_memory"] if args.backend == "redis" else None
+        load_portfolio(client, portfolio, task_manager)
+        redis_memory = (client.info("memory")["used_memory"] - redis_memory_before) if args.backend == "redis" else None
+
+        for obj, method, stage in [(orchestrator, "_select_due_tasks", "select"), (task_manager, "claim_reminders", "claim"),
+                                   (contextualizer, "prefetch", "prefetch"), (contextualizer, "gather_context", "context"),
+                                   (prompt_generator, "generate_reminder_prompt", "generate"),
+                                   (prompt_generator, "generate_reminder_prompts_batch", "generate_batch"),
+                                   (llm_model, "generate_content", "llm"), (orchestrator.notifier, "send_reminder", "deliver"),
+                                   (task_manager, "commit_reminder", "commit")]:
+            stages.wrap(obj, method, stage)
+
+        counter.reset()
+        tokens_before = {direction: llm_tokens(direction) for direction in ("prompt", "completion")}
+        if args.memory:
+            tracemalloc.start()
+        with Timer() as sweep:
+            responses = orchestrator.process_reminder_request(ReminderRequest(current_date=CURRENT_DATE))
+        heap_peak = tracemalloc.get_traced_memory()[1] if args.memory else None
+        if args.memory:
+            tracemalloc.stop()
+        orchestrator.notifier.close()
+        tokens = {direction: llm_tokens(direction) - before for direction, before in tokens_before.items()}
+
+    due = len(responses)
+    return {
+        "config": {"scenario": args.scenario, **scenario, "backend": args.backend, "llm_latency": args.llm_latency,
+                   "concurrency": args.concurrency, "seed": args.seed, "current_date": CURRENT_DATE.isoformat()},
+        "due_tasks": due,
+        "outcomes": dict(sorted(Counter(response.status for response in responses).items())),
+        "llm_calls": llm_model.calls,
+        "llm_prompt_tokens_per_call": tokens["prompt"] / llm_model.calls if llm_model.calls else 0.0,
+        "llm_completion_tokens_per_call": tokens["completion"] / llm_model.calls if llm_model.calls else 0.0,
+        "sweep_seconds": sweep.elapsed,
+        "reminders_per_second": due / sweep.elapsed if sweep.elapsed else 0.0,
+        "redis_commands_per_task": counter.commands / due if due else 0.0,
+        "redis_round_trips_per_task": counter.count / due if due else 0.0,
+        "heap_peak_mb": heap_peak / 2 ** 20 if heap_peak is not None else None,
+        "redis_memory_mb": redis_memory / 2 ** 20 if redis_memory is not None else None,
+        "stages": stages.percentiles(),
+    }
+
+def report(result: Dict[str, Any]):
+    config = result["config"]
+    print(f"Scenario {config['scenario']}: {config['tasks']} tasks, {config['properties']} properties, {config['loans']} loans, "
+          f"{config['recipients']} recipients; LLM latency {config['llm_latency']}, concurrency {config['concurrency']}")
+    print(f"  due tasks {result['due_tasks']}, outcomes {result['outcomes']}, LLM calls {result['llm_calls']}")
+    print(f"  sweep {result['sweep_seconds']:.3f}s ({result['reminders_per_second']:.0f} reminders/s)")
+    print(f"  Redis per due task: {result['redis_commands_per_task']:.1f} commands, {result['redis_round_trips_per_task']:.2f} round trips")
+    print(f"  LLM tokens per call: {result['llm_prompt_tokens_per_call']:.0f} prompt, {result['llm_completion_tokens_per_call']:.0f} completion")
+    if result["heap_peak_mb"] is not None:
+        print(f"  peak Python heap during sweep: {result['heap_peak_mb']:.1f} MB")
+    if result["redis_memory_mb"] is not None:
+        print(f"  Redis memory used by the portfolio: {result['redis_memory_mb']:.1f} MB")
+    print(f"  {'stage':>14} {'calls':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:>14} {stats['calls']:>7} {1000 * stats['p50']:>9.2f} {1000 * stats['p95']:>9.2f} {1000 * stats['p99']:>9.2f}")
+
+def check(result: Dict[str, Any], baseline: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    """Returns one message per regression against `baseline`."""
+    if baseline["config"] != result["config"]:
+        return [f"configuration differs from the baseline ({baseline['config']}); re-run with its settings or --update-baseline"]
+    regressions = []
+    for metric in ("due_tasks", "outcomes", "llm_calls"):
+        if result[metric] != baseline[metric]:
+            regressions.append(f"{metric}: {result[metric]} (baseline {baseline[metric]})")
+
+    def at_most(label: str, value: float, reference: float, tolerance: float, slack: float = 0.0):
+        if reference is not None and value is not None and value > reference * (1 + tolerance) + slack:
+            regressions.append(f"{label}: {value:.4g} (baseline {reference:.4g}, +{100 * (value / reference - 1):.0f}%, "
+                               f"tolerance {100 * tolerance:.0f}%)")
+
+    at_most("redis_commands_per_task", result["redis_commands_per_task"], baseline["redis_commands_per_task"], args.ops_tolerance)
+    at_most("redis_round_trips_per_task", result["redis_round_trips_per_task"], baseline["redis_round_trips_per_task"], args.ops_tolerance)
+    at_most("llm_prompt_tokens_per_call", result["llm_prompt_tokens_per_call"], baseline.get("llm_prompt_tokens_per_call"), args.ops_tolerance)
+    if args.memory:
+        at_most("heap_peak_mb", result["heap_peak_mb"], baseline["heap_peak_mb"], args.memory_tolerance)
+    if args.check_timings:
+        slack = args.time_slack_ms / 1000
+        at_most("sweep_seconds", result["sweep_seconds"], baseline["sweep_seconds"], args.time_tolerance, slack)
+        for stage, stats in result["stages"].items():
+            if stage in baseline["stages"]:
+                at_most(f"{stage} p95", stats["p95"], baseline["stages"][stage]["p95"], args.time_tolerance, slack)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="small")
+    parser.add_argument("--tasks", type=int, help="Override the scenario's task count.")
+    parser.add_argument("--backend", choices=["fake", "redis"], default="fake")
+    parser.add_argument("--llm-latency", default="lognormal:0.02:0.5", help="Fake Gemini latency distribution (see above).")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip heap tracing.")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON instead of a table.")
+    parser.add_argument("--check", action="store_true", help="Compare with the stored baseline; exit 1 on regression.")
+    parser.add_argument("--check-timings", action="store_true", help="Also fail on wall-time and stage p95 regressions.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the scenario's baseline.")
+    parser.add_argument("--ops-tolerance", type=float, default=0.10)
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    parser.add_argument("--time-tolerance", type=float, default=0.50)
+    parser.add_argument("--time-slack-ms", type=float, default=25.0, help="Absolute allowance added to every timing check.")
+    args = parser.parse_args()
+    latency_sampler(args.llm_latency)
+
+    scenario = dict(SCENARIOS[args.scenario])
+    if args.tasks:
+        scenario["tasks"] = args.tasks
+    result = run(args, scenario)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        report(result)
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+    if args.update_baseline:
+        baselines[args.scenario] = result
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline for '{args.scenario}' written to {BASELINE_PATH}.")
+    elif args.check:
+        if args.scenario not in baselines:
+            print(f"No baseline for '{args.scenario}'; run with --update-baseline first.")
+            sys.exit(1)
+        regressions = check(result, baselines[args.scenario], args)
+        if regressions:
+            print("REGRESSIONS against baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"No regressions against the '{args.scenario}' baseline.")
+
+if __name__ == "__main__":
+    main()
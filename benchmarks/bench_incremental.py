@@ -0,0 +1,86 @@
+# cmbs_reminder_system/benchmarks/bench_incremental.py
+"""
+Due-task selection cost per sweep: the full due check (TaskManagerAgent) against the
+incremental ReminderEligibilityEngine, on the same portfolio.
+
+Between sweeps, `--changes` random tasks change status. Each sweep selects one reminder
+class (`--priorities`) for the same date, as the hourly urgent schedule does; nothing is
+sent, so the due backlog stays constant. The full check re-reads every task whose
+reminder time has passed, in every class. The engine re-reads only the changed tasks
+and loads the class's due set.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_incremental --tasks 20000 --changes 10 100 --sweeps 5
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import random
+from benchmarks.common import RoundTripCounter, make_redis_client, install_redis_client, Timer
+from benchmarks.bench_task_storage import synthetic_task
+from agents.base import encode_hash_fields, TRANSIENT_FIELDS
+from agents.task_manager import TaskManagerAgent
+from agents.eligibility import ReminderEligibilityEngine
+
+def populate(client, task_manager: TaskManagerAgent, size: int, today: datetime.date):
+    rng = random.Random(42)
+    pipe = client.pipeline(transaction=False)
+    for i in range(1, size + 1):
+        task = synthetic_task(i, size, today, rng)
+        pipe.hset(f"task:{task.task_id}", mapping=encode_hash_fields(task.model_dump(mode="json", exclude=TRANSIENT_FIELDS['task']))[0])
+        if i % 5000 == 0:
+            pipe.execute()
+    pipe.execute()
+    task_manager.reindex_tasks()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fake", "redis"], default="fake")
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--changes", type=int, nargs="+", default=[10, 100], help="Status changes between sweeps.")
+    parser.add_argument("--sweeps", type=int, default=5)
+    parser.add_argument("--priorities", nargs="+", default=["Critical", "High"])
+    args = parser.parse_args()
+
+    today = datetime.date.today()
+    counter = RoundTripCounter()
+    client = make_redis_client(args.backend, counter)
+    install_redis_client(client)
+    rng = random.Random(7)
+    with contextlib.redirect_stdout(io.StringIO()):
+        task_manager = TaskManagerAgent()
+        engine = ReminderEligibilityEngine(task_manager)
+        populate(client, task_manager, args.tasks, today)
+        engine.tick(today)
+
+    print(f"{args.tasks} tasks, sweeping priorities {', '.join(args.priorities)}")
+    print(f"{'changes':>8} {'mode':>12} {'ms/sweep':>9} {'trips/sweep':>12} {'re-evaluated':>13} {'due':>6}")
+    for changes in args.changes:
+        totals = {"full": [0.0, 0, 0, 0], "incremental": [0.0, 0, 0, 0]}
+        for _ in range(args.sweeps):
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(changes):
+                    task_manager.update_task_status(f"TASK-{rng.randint(1, args.tasks):06d}", rng.choice(["Pending", "In Progress", "Completed"]))
+                counter.reset()
+                with Timer() as timer:
+                    full = task_manager.get_tasks_due_for_reminder(today, priorities=args.priorities)
+                totals["full"][0] += timer.elapsed
+                totals["full"][1] += counter.count
+                totals["full"][2] += len(task_manager.get_fired_task_ids(None, datetime.datetime.combine(today, datetime.time.min)))
+                totals["full"][3] = len(full)
+
+                counter.reset()
+                with Timer() as timer:
+                    incremental = engine.get_tasks_due_for_reminder(today, priorities=args.priorities)
+                totals["incremental"][0] += timer.elapsed
+                totals["incremental"][1] += counter.count
+                totals["incremental"][2] += engine.stats()["last_tick"]["evaluated"]
+                totals["incremental"][3] = len(incremental)
+            assert sorted(task.task_id for task in full) == sorted(task.task_id for task in incremental)
+        for mode, (elapsed, trips, evaluated, due) in totals.items():
+            print(f"{changes:>8} {mode:>12} {1000 * elapsed / args.sweeps:>9.1f} {trips / args.sweeps:>12.1f} "
+                  f"{evaluated / args.sweeps:>13.0f} {due:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# cmbs_reminder_system/benchmarks/bench_startup.py
+"""
+Cold-start cost of the API service. Each phase runs in a fresh interpreter, `--runs` times,
+and the median is reported.
+
+- import main:      constructing every agent. Redis points at a closed port and GOOGLE_API_KEY
+                    is unset, so any network I/O or eager provider setup here fails the run.
+- startup hook:     import main plus FastAPI's startup handlers (scheduler schedules disabled).
+- Gemini SDK import: the cost now paid by the background warm-up instead of at import.
+- seed:             `manage.py seed` against fakeredis, which startup used to run on every boot.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PHASES = {
+    "import main": """
+import time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+""",
+    "startup hook": """
+import asyncio, time
+started = time.perf_counter()
+import main
+for handler in main.app.router.on_startup:
+    asyncio.run(handler())
+elapsed = time.perf_counter() - started
+main.scheduler_agent.stop()
+""",
+    "Gemini SDK import": """
+import time, warnings
+warnings.simplefilter("ignore")
+started = time.perf_counter()
+import google.generativeai
+elapsed = time.perf_counter() - started
+""",
+    "seed": """
+import sys, time
+from benchmarks.common import RoundTripCounter, make_redis_client, install_redis_client
+import manage
+install_redis_client(make_redis_client("fake", RoundTripCounter()))
+manage.r = sys.modules["agents.base"].r
+started = time.perf_counter()
+manage.main()
+elapsed = time.perf_counter() - started
+""",
+}
+
+def run_phase(code: str) -> float:
+    env = dict(os.environ, REDIS_HOST="127.0.0.1", REDIS_PORT="1", SCHEDULER_ENABLED="false", PYTHONPATH=os.getcwd())
+    env.pop("GOOGLE_API_KEY", None)
+    script = code + "\nprint('ELAPSED', elapsed)\n"
+    result = subprocess.run([sys.executable, "-c", script, "seed"], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}")
+    return float(next(line for line in result.stdout.splitlines() if line.startswith("ELAPSED")).split()[1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'phase':>18} {'median (s)':>11} {'min (s)':>8} {'max (s)':>8}")
+    medians = {}
+    for phase, code in PHASES.items():
+        timings = [run_phase(code) for _ in range(args.runs)]
+        medians[phase] = statistics.median(timings)
+        print(f"{phase:>18} {medians[phase]:>11.3f} {min(timings):>8.3f} {max(timings):>8.3f}")
+    print(f"\nStartup before lazy init paid roughly import + SDK import + seed: "
+          f"{medians['import main'] + medians['Gemini SDK import'] + medians['seed']:.3f}s; "
+          f"now {medians['startup hook']:.3f}s until the app accepts requests.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# cmbs_reminder_system/benchmarks/bench_task_storage.py
+"""
+Compares the two task storage layouts: one JSON string per task (the old format, still used
+for properties and loans) and one hash per task. Both go through the Agent storage helpers.
+
+Reports memory per task and latency for a due-check read (JSON has to load and validate whole
+tasks; hashes fetch only REMINDER_CHECK_FIELDS), a full read, and a single-field update
+(JSON read-modify-write under WATCH vs. an in-place hash update script). "parse" is the
+client-side share of the due-check read: decoding and validating replies already fetched.
+
+Memory is measured with MEMORY USAGE on a real server; the fake backend has no memory
+accounting, so it reports stored payload bytes (key + field names + values) instead.
+fakeredis also emulates every command in Python, which penalises the per-key hash commands
+against batched MGETs; use --backend redis for server-side latency.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_task_storage --backend fake --tasks 100000
+    python -m benchmarks.bench_task_storage --backend redis   # uses REDIS_HOST/REDIS_PORT, FLUSHES the DB
+"""
+import argparse
+import contextlib
+import datetime
+import gc
+import io
+import random
+from benchmarks.common import RoundTripCounter, make_redis_client, install_redis_client, Timer
+from agents.base import Agent, encode_hash_fields, decode_hash_fields, _projection_adapter, TRANSIENT_FIELDS
+from agents.task_manager import REMINDER_CHECK_FIELDS
+from models import Task
+
+# Not in HASH_OBJECT_TYPES, so the Agent helpers treat it as JSON-string storage.
+JSON_TYPE = "task_json"
+HASH_TYPE = "task"
+
+def synthetic_task(i: int, size: int, today: datetime.date, rng: random.Random) -> Task:
+    return Task(
+        task_id=f"TASK-{i:06d}",
+        description=f"Collect Q{rng.randint(1, 4)} financial statements for synthetic property {i}",
+        due_date=today + datetime.timedelta(days=rng.randint(-90, 90)),
+        assigned_to=f"manager{rng.randint(1, 200)}@cmbs.com",
+        status=rng.choice(["Pending", "In Progress", "Completed"]),
+        priority=rng.choice(["Low", "Medium", "High", "Critical"]),
+        property_id=f"PROP-{rng.randint(1, 5000):05d}",
+        loan_id=f"LOAN-{rng.randint(1, 5000):05d}",
+        task_type="Financial Statement Collection",
+        dependencies=[f"TASK-{rng.randint(1, size):06d}" for _ in range(rng.randint(0, 3))],
+        last_update_date=today - datetime.timedelta(days=rng.randint(1, 30)),
+        last_update_notes="Reached out to the property manager; awaiting the signed rent roll.",
+        last_reminder_sent=(datetime.datetime.combine(today, datetime.time.min)
+                            - datetime.timedelta(hours=rng.randint(1, 72))) if rng.random() < 0.5 else None,
+    )
+
+def populate(client, layout: str, size: int, today: datetime.date):
+    rng = random.Random(42)
+    pipe = client.pipeline(transaction=False)
+    for i in range(1, size + 1):
+        task = synthetic_task(i, size, today, rng)
+        if layout == JSON_TYPE:
+            pipe.set(f"{JSON_TYPE}:{task.task_id}", task.model_dump_json())
+        else:
+            pipe.hset(f"{HASH_TYPE}:{task.task_id}", mapping=encode_hash_fields(task.model_dump(mode="json", exclude=TRANSIENT_FIELDS['task']))[0])
+        if i % 5000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+def bytes_per_task(client, backend: str, layout: str, sample_ids: list) -> float:
+    keys = [f"{layout}:{task_id}" for task_id in sample_ids]
+    pipe = client.pipeline(transaction=False)
+    if backend == "redis":
+        for key in keys:
+            pipe.execute_command("MEMORY", "USAGE", key, "SAMPLES", "0")
+        sizes = pipe.execute()
+    else:
+        for key in keys:
+            pipe.get(key) if layout == JSON_TYPE else pipe.hgetall(key)
+        sizes = [len(key) + (len(value) if isinstance(value, str) else sum(len(field) + len(item) for field, item in value.items()))
+                 for key, value in zip(keys, pipe.execute())]
+    return sum(sizes) / len(sizes)
+
+def due_check_parse_seconds(client, layout: str, sample_ids: list) -> float:
+    pipe = client.pipeline(transaction=False)
+    if layout == JSON_TYPE:
+        pipe.mget([f"{JSON_TYPE}:{task_id}" for task_id in sample_ids])
+        replies = pipe.execute()[0]
+        gc.collect()
+        with Timer() as timer:
+            [Task.model_validate_json(reply) for reply in replies]
+    else:
+        requested = ["task_id"] + REMINDER_CHECK_FIELDS
+        for task_id in sample_ids:
+            pipe.hmget(f"{HASH_TYPE}:{task_id}", requested)
+        replies = pipe.execute()
+        adapter = _projection_adapter(Task, tuple(requested))
+        gc.collect()
+        with Timer() as timer:
+            [adapter.validate_python(decode_hash_fields(Task, dict(zip(requested, values)))) for values in replies]
+    return timer.elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fake", "redis"], default="fake")
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=10000, help="Tasks read/updated per measurement.")
+    args = parser.parse_args()
+
+    today = datetime.date.today()
+    counter = RoundTripCounter()
+    client = make_redis_client(args.backend, counter)
+    install_redis_client(client)
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = Agent("StorageBenchmark")
+    sample_ids = [f"TASK-{i:06d}" for i in random.Random(7).sample(range(1, args.tasks + 1), min(args.sample, args.tasks))]
+    sent_at = datetime.datetime.combine(today, datetime.time(9))
+
+    memory_label = "bytes/task" if args.backend == "redis" else "payload B/task"
+    print(f"{args.tasks} tasks, {len(sample_ids)} sampled")
+    print(f"{'layout':>6} {memory_label:>15} {'due-check (s)':>14} {'parse (s)':>10} {'full read (s)':>14} {'updates (s)':>12} {'update trips':>13}")
+    for layout in (JSON_TYPE, HASH_TYPE):
+        populate(client, layout, args.tasks, today)
+        memory = bytes_per_task(client, args.backend, layout, sample_ids)
+        # Populating leaves a lot of garbage; collect it so it is not charged to the timings below.
+        gc.collect()
+
+        with Timer() as due_check:
+            if layout == JSON_TYPE:
+                agent._load_many_from_redis(JSON_TYPE, sample_ids, Task)
+            else:
+                agent._load_fields_from_redis(HASH_TYPE, sample_ids, Task, REMINDER_CHECK_FIELDS)
+        parse_seconds = due_check_parse_seconds(client, layout, sample_ids)
+        with Timer() as full_read:
+            agent._load_many_from_redis(layout, sample_ids, Task)
+
+        counter.reset()
+        with Timer() as updates:
+            for task_id in sample_ids:
+                agent._update_in_redis(layout, task_id, {"last_reminder_sent": sent_at.isoformat()})
+        update_trips = counter.count
+
+        print(f"{'json' if layout == JSON_TYPE else 'hash':>6} {memory:>15.0f} {due_check.elapsed:>14.3f} {parse_seconds:>10.3f} "
+              f"{full_read.elapsed:>14.3f} {updates.elapsed:>12.3f} {update_trips:>13}")
+        client.flushdb()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# cmbs_reminder_system/benchmarks/common.py
+"""
+Shared helpers for the benchmark scripts: Redis stand-in wiring, round-trip counting and
+a local stand-in for the Gemini model.
+"""
+from typing import Optional, Callable
+import os
+import random
+import re
+import sys
+import threading
+import time
+import redis
+
+# Benchmarks measure the pipeline, not the provider quota: lift the Gemini rate limits
+# unless the caller set them explicitly.
+os.environ.setdefault("GEMINI_RPM", "1000000000")
+os.environ.setdefault("GEMINI_TPM", "1000000000000")
+
+import agents.base
+
+class RoundTripCounter:
+    """
+    Counts network round trips (one per command, one per pipeline execute) in `count`, and
+    Redis commands (pipelined ones individually) in `commands`.
+    """
+    def __init__(self):
+        self.count = 0
+        self.commands = 0
+
+    def reset(self):
+        self.count = 0
+        self.commands = 0
+
+def make_redis_client(backend: str, counter: RoundTripCounter):
+    """
+    Returns a client for the requested backend ('fake' for fakeredis, 'redis' for the
+    REDIS_HOST/REDIS_PORT server) wrapped so every round trip is counted.
+    """
+    if backend == "fake":
+        import fakeredis
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+    else:
+        client = redis.StrictRedis(host=agents.base.REDIS_HOST, port=agents.base.REDIS_PORT,
+                                   db=agents.base.REDIS_DB, decode_responses=True)
+    client.flushdb()
+
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    def counted_execute_command(*args, **kwargs):
+        counter.count += 1
+        counter.commands += 1
+        return execute_command(*args, **kwargs)
+
+    def counted_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*exec_args, **exec_kwargs):
+            counter.count += 1
+            counter.commands += len(pipe.command_stack)
+            return execute(*exec_args, **exec_kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    client.execute_command = counted_execute_command
+    client.pipeline = counted_pipeline
+    return client
+
+def install_redis_client(client):
+    """Points every loaded agents module at `client` (they bind `r` at import time)."""
+    for name, module in list(sys.modules.items()):
+        if (name == "agents" or name.startswith("agents.")) and hasattr(module, "r"):
+            module.r = client
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+class FakeProviderError(Exception):
+    """Error raised by FakeGeminiModel; carries an HTTP-style `code` like google.api_core exceptions."""
+    def __init__(self, code: int, message: str = "Injected provider error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class FakeGeminiModel:
+    """
+    Local stand-in for genai.GenerativeModel with injectable latency and errors. The reply's subject
+    echoes the prompt's task id so callers can check which reminder came back. `latency_sampler`,
+    if given, draws each call's latency from the model's seeded Random instead of latency + jitter.
+    """
+    def __init__(self, latency_seconds: float = 0.0, latency_jitter_seconds: float = 0.0, error_rate: float = 0.0,
+                 error_code: int = 429, fail_first: int = 0, seed: Optional[int] = None,
+                 latency_sampler: Optional[Callable[[random.Random], float]] = None):
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.latency_sampler = latency_sampler
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.fail_first = fail_first
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    supports_system_instruction = True
+
+    def generate_content(self, prompt: str, system_instruction: Optional[str] = None):
+        from types import SimpleNamespace
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+            if self.latency_sampler is not None:
+                latency = max(self.latency_sampler(self._random), 0.0)
+            else:
+                latency = self.latency_seconds + self._random.uniform(0, self.latency_jitter_seconds)
+            fail = call_number <= self.fail_first or self._random.random() < self.error_rate
+        time.sleep(latency)
+        if fail:
+            raise FakeProviderError(self.error_code)
+
+        task_id = re.search(r"Task ID: (\S+)", prompt)
+        text = (f"Subject: Reminder: action required on {task_id.group(1) if task_id else 'task'}\n\n"
+                "Please review the task and provide an update.")
+        part = SimpleNamespace(text=text)
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
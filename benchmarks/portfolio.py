@@ -0,0 +1,88 @@
+# cmbs_reminder_system/benchmarks/portfolio.py
+"""
+Synthetic CMBS portfolios for the benchmarks: properties, loans and tasks whose dependencies
+form a DAG (a task only depends on tasks with smaller ids). Generation is seeded, so the same
+arguments always produce the same portfolio.
+"""
+import datetime
+import random
+from typing import List
+from agents.base import Agent, encode_hash_fields, TRANSIENT_FIELDS
+from agents.task_manager import TaskManagerAgent
+from models import Task, PropertyContext, LoanContext
+
+PROPERTY_TYPES = ["Office", "Retail", "Multifamily", "Industrial", "Hospitality"]
+LOAN_TYPES = ["CMBS", "Bridge", "Mezzanine"]
+TASK_TYPES = ["Financial Statement Collection", "Inspection Schedule", "Covenant Review", "Rent Roll Review", "Insurance Renewal"]
+PRIORITIES = ["Low", "Medium", "Medium", "High", "Critical"]
+STATUSES = ["Pending", "Pending", "In Progress", "Completed"]
+UPDATE_NOTES = [
+    "Reached out to the property manager; awaiting the signed rent roll.",
+    "Borrower confirmed the package is in preparation.",
+    "Waiting on the borrower; documents are delayed by the auditor.",
+    "Started data aggregation for review.",
+]
+
+class Portfolio:
+    """Generated objects plus the parameters that produced them."""
+    def __init__(self, properties: List[PropertyContext], loans: List[LoanContext], tasks: List[Task]):
+        self.properties = properties
+        self.loans = loans
+        self.tasks = tasks
+
+def generate_portfolio(tasks: int, properties: int, loans: int, recipients: int, current_date: datetime.date,
+                       dependency_probability: float = 0.3, max_dependencies: int = 3, seed: int = 42) -> Portfolio:
+    rng = random.Random(seed)
+    property_contexts = [
+        PropertyContext(property_id=f"PROP-{i:05d}", property_type=rng.choice(PROPERTY_TYPES),
+                        occupancy_rate=round(rng.uniform(0.6, 0.99), 2), square_footage=rng.randint(20000, 500000))
+        for i in range(1, properties + 1)
+    ]
+    loan_contexts = [
+        LoanContext(loan_id=f"LOAN-{i:05d}", loan_type=rng.choice(LOAN_TYPES),
+                    maturity_date=current_date + datetime.timedelta(days=rng.randint(180, 3650)),
+                    dscr_covenant=round(rng.uniform(1.05, 1.5), 2))
+        for i in range(1, loans + 1)
+    ]
+    task_list = []
+    for i in range(1, tasks + 1):
+        dependencies = []
+        if i > 1 and rng.random() < dependency_probability:
+            dependencies = sorted({f"TASK-{rng.randint(max(1, i - 500), i - 1):06d}" for _ in range(rng.randint(1, max_dependencies))})
+        last_reminder_sent = None
+        if rng.random() < 0.4:
+            last_reminder_sent = datetime.datetime.combine(current_date, datetime.time.min) - datetime.timedelta(hours=rng.randint(1, 96))
+        task_list.append(Task(
+            task_id=f"TASK-{i:06d}",
+            description=f"{rng.choice(TASK_TYPES)} for synthetic property {i % max(properties, 1) + 1}",
+            due_date=current_date + datetime.timedelta(days=rng.randint(-30, 60)),
+            assigned_to=f"manager{rng.randint(1, recipients)}@cmbs.com",
+            status=rng.choice(STATUSES),
+            priority=rng.choice(PRIORITIES),
+            property_id=property_contexts[rng.randrange(properties)].property_id if properties else None,
+            loan_id=loan_contexts[rng.randrange(loans)].loan_id if loans else None,
+            task_type=rng.choice(TASK_TYPES),
+            dependencies=dependencies,
+            last_update_date=current_date - datetime.timedelta(days=rng.randint(1, 30)),
+            last_update_notes=rng.choice(UPDATE_NOTES),
+            last_reminder_sent=last_reminder_sent,
+        ))
+    return Portfolio(property_contexts, loan_contexts, task_list)
+
+def load_portfolio(client, portfolio: Portfolio, task_manager: TaskManagerAgent, batch_size: int = 5000):
+    """
+    Bulk-writes the portfolio in the service's storage layout, pipelined, then rebuilds the task
+    indexes. Dependency statuses and reverse edges are left for the first sweep to backfill, as for
+    tasks written before they existed.
+    """
+    writer = Agent("PortfolioLoader")
+    for obj_type, objects in (("property", portfolio.properties), ("loan", portfolio.loans)):
+        for obj in objects:
+            writer._save_to_redis(obj_type, obj)
+    pipe = client.pipeline(transaction=False)
+    for i, task in enumerate(portfolio.tasks, 1):
+        pipe.hset(f"task:{task.task_id}", mapping=encode_hash_fields(task.model_dump(mode="json", exclude=TRANSIENT_FIELDS['task']))[0])
+        if i % batch_size == 0:
+            pipe.execute()
+    pipe.execute()
+    task_manager.reindex_tasks(batch_size=batch_size)
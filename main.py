@@ -1,89 +1,207 @@
 # cmbs_reminder_system/main.py
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, Response, Query, Depends
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
+import asyncio
 import datetime
-import time
+import json
+import os
 import threading
-import requests
+from typing import List, Optional, AsyncIterator
 from dotenv import load_dotenv
-from models import Task, ReminderRequest, ReminderResponse
+
+# Load environment variables from .env before the agents are imported: agents.base builds the
+# Redis client from REDIS_HOST/REDIS_PORT/REDIS_DB at import time.
+load_dotenv()
+
+from models import ReminderRequest, ReminderResponse, SweepStatus, DeliveryReceipt
 from agents.task_manager import TaskManagerAgent
 from agents.contextualizer import ContextualizerAgent
 from agents.prompt_generator import GenAIPromptGeneratorAgent
 from agents.notification import NotificationAgent
 from agents.orchestrator import OrchestratorAgent
-from agents.base import r # Import Redis client to clear keys
-# Load environment variables from .env file at the very beginning
-load_dotenv() # <--- Call load_dotenv() here
+from agents.work_queue import ReminderWorkQueue
+from agents.scheduler import SchedulerAgent
+from agents.eligibility import ReminderEligibilityEngine
+from agents.base import r, health_check_r
+from agents.telemetry import configure_logging, get_logger, metrics_payload
+
+configure_logging()
+log = get_logger("main")
 app = FastAPI(title="CMBS Automated Reminder Service", version="1.0.0")
 
 task_manager_agent = TaskManagerAgent()
 contextualizer_agent = ContextualizerAgent()
 genai_prompt_generator_agent = GenAIPromptGeneratorAgent()
 notification_agent = NotificationAgent()
+eligibility_engine = (ReminderEligibilityEngine(task_manager_agent)
+                      if os.getenv("REMINDER_EVALUATION_MODE", "full") == "incremental" else None)
 orchestrator_agent = OrchestratorAgent(
     task_manager=task_manager_agent,
     contextualizer=contextualizer_agent,
     prompt_generator=genai_prompt_generator_agent,
-    notifier=notification_agent
+    notifier=notification_agent,
+    eligibility=eligibility_engine
+)
+reminder_queue = ReminderWorkQueue()
+scheduler_agent = SchedulerAgent(
+    orchestrator=orchestrator_agent,
+    queue=reminder_queue if os.getenv("SCHEDULER_SWEEP_MODE", "inline") == "queue" else None
 )
 
-def populate_initial_tasks():
-    print("\n--- Populating initial tasks ---")
-    for key in r.keys("task:*"): r.delete(key)
-    r.set("next_task_id", 1)
-
-    task_manager_agent.add_task({
-        "description": "Collect Q1 2025 Financial Statements",
-        "due_date": datetime.date(2025, 7, 15),
-        "assigned_to": "alice.smith@cmbs.com",
-        "priority": "Critical",
-        "task_type": "Financial Statement Collection",
-        "property_id": "PROP-GRND",
-        "loan_id": "LOAN-GWR-001",
-        "last_update_date": datetime.date(2025, 7, 10),
-        "last_update_notes": "Reached out to property manager for update. No response yet.",
-        "dependencies": ["TASK-0001", "TASK-0002"]
-    })
-    # Dummy dependencies for the overdue task
-    task_manager_agent.add_task({"task_id": "TASK-0001", "description": "Verify Contact", "due_date": datetime.date(2025, 7, 1), "assigned_to": "system@cmbs.com", "status": "Completed"})
-    task_manager_agent.add_task({"task_id": "TASK-0002", "description": "Previous Financials Uploaded", "due_date": datetime.date(2025, 7, 5), "assigned_to": "system@cmbs.com", "status": "Completed"})
-    
-    task_manager_agent.add_task({
-        "description": "Q2 2025 Covenant Compliance Review",
-        "due_date": datetime.date(2025, 7, 25),
-        "assigned_to": "bob.jones@cmbs.com",
-        "priority": "High",
-        "task_type": "Covenant Review",
-        "property_id": "PROP-RETAIL",
-        "loan_id": "LOAN-RT-002",
-        "last_update_date": datetime.date(2025, 7, 18),
-        "last_update_notes": "Started data aggregation for review."
-    })
-    print("--- Initial tasks populated ---")
-
+def warm_up():
+    """Opens the Redis connection and loads the LLM provider so the first sweep does not pay for it."""
+    try:
+        r.ping()
+    except Exception as e:
+        log.warning("Redis is not reachable yet: %s", e)
+    genai_prompt_generator_agent.warm_up()
 
 @app.on_event("startup")
 async def startup_event():
-    print("FastAPI application starting up...")
-    populate_initial_tasks()
-    scheduler_thread = threading.Thread(target=run_scheduler_periodically, daemon=True)
-    scheduler_thread.start()
-    print("Scheduler thread started.")
+    log.info("FastAPI application starting up...")
+    scheduler_agent.start(run_schedules=os.getenv("SCHEDULER_ENABLED", "true").lower() == "true")
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler_agent.stop()
+    notification_agent.close()
+
+@app.get("/ready")
+def readiness_endpoint(response: Response):
+    """
+    Readiness probe: 200 once Redis answers, the LLM provider is loaded and the scheduler is running; 503 otherwise.
+    A plain def, so FastAPI runs it in its threadpool: the Redis ping blocks for up to its timeout.
+    """
+    try:
+        redis_status = "ready" if health_check_r.ping() else "error"
+    except Exception as e:
+        redis_status = f"error: {e}"
+    checks = {
+        "redis": redis_status,
+        "llm": genai_prompt_generator_agent.provider_status(),
+        "scheduler": "ready" if scheduler_agent.is_running else "stopped",
+    }
+    ready = all(status == "ready" for status in checks.values())
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "checks": checks}
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint: stage latencies, LLM tokens, reminder outcomes and Redis command stats."""
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+def reminder_request_params(
+    current_date: Optional[datetime.date] = None,
+    assigned_to: Optional[List[str]] = Query(None, description="Only tasks assigned to these recipients."),
+    priority: Optional[List[str]] = Query(None, description="Only tasks with these priorities."),
+    offset: int = Query(0, ge=0, description="Due tasks to skip, in due-date order (dry runs only)."),
+    limit: Optional[int] = Query(None, ge=1, description="Due tasks to process at most."),
+    dry_run: bool = Query(False, description="List the due tasks without claiming, generating or sending."),
+) -> ReminderRequest:
+    if offset and not dry_run:
+        raise HTTPException(status_code=400, detail="offset is only allowed with dry_run=true; page through a live sweep by repeating it with limit.")
+    return ReminderRequest(current_date=current_date or datetime.date.today(), priorities=priority,
+                           assigned_to=assigned_to, offset=offset, limit=limit, dry_run=dry_run)
 
 @app.post("/check_reminders", response_model=List[ReminderResponse])
-async def check_reminders_endpoint(current_date: datetime.date = datetime.date.today()):
-    return orchestrator_agent.process_reminder_request(ReminderRequest(current_date=current_date))
+async def check_reminders_endpoint(reminder_req: ReminderRequest = Depends(reminder_request_params)):
+    # The sweep is synchronous (Redis, Gemini, SMTP); run it off the event loop so other requests are served meanwhile.
+    return await run_in_threadpool(orchestrator_agent.process_reminder_request, reminder_req)
+
+@app.post("/check_reminders/stream")
+async def stream_reminders_endpoint(reminder_req: ReminderRequest = Depends(reminder_request_params)):
+    """
+    Same sweep as /check_reminders, streamed as NDJSON: one ReminderResponse per line, in completion order,
+    as soon as each task finishes. A sweep that fails part-way ends the stream with an {"error": ...} line.
+    The sweep runs to completion even if the client disconnects, so no claimed reminder is left half-done.
+    """
+    return StreamingResponse(_stream_sweep(reminder_req), media_type="application/x-ndjson")
+
+async def _stream_sweep(reminder_req: ReminderRequest) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    responses: "asyncio.Queue[Optional[ReminderResponse]]" = asyncio.Queue()
+    def on_response(response: ReminderResponse):
+        loop.call_soon_threadsafe(responses.put_nowait, response)
 
-def run_scheduler_periodically():
-    while True:
-        print("\n--- Background Scheduler: Triggering reminder check ---")
+    def run_sweep():
         try:
-            requests.post(f"http://127.0.0.1:8000/check_reminders", json={"current_date": datetime.date.today().isoformat()})
-            print("Background Scheduler: Reminder check initiated.")
-        except Exception as e:
-            print(f"Background Scheduler: Error triggering reminders: {e}")
-        time.sleep(60)
+            orchestrator_agent.process_reminder_request(reminder_req, on_response)
+        finally:
+            # Queued after every response from this thread, so it always arrives last.
+            loop.call_soon_threadsafe(responses.put_nowait, None)
+
+    sweep = asyncio.ensure_future(run_in_threadpool(run_sweep))
+    while (response := await responses.get()) is not None:
+        yield response.model_dump_json() + "\n"
+    try:
+        await sweep
+    except Exception as e:
+        log.error("Streamed sweep failed: %s", e)
+        yield json.dumps({"error": str(e)}) + "\n"
+
+@app.post("/sweeps")
+async def enqueue_sweep_endpoint(reminder_req: ReminderRequest = Depends(reminder_request_params)):
+    """Queues the due reminders for worker processes (see worker.py) instead of sending them in-request."""
+    if reminder_req.dry_run:
+        raise HTTPException(status_code=400, detail="Use /check_reminders for dry runs; queued sweeps always send.")
+    sweep_id, total = await run_in_threadpool(orchestrator_agent.enqueue_reminder_sweep, reminder_req, reminder_queue)
+    return {"sweep_id": sweep_id, "total": total}
+
+@app.get("/sweeps/{sweep_id}", response_model=SweepStatus)
+def get_sweep_endpoint(sweep_id: str, include_results: bool = False, offset: int = Query(0, ge=0),
+                       limit: int = Query(100, ge=1, le=1000)):
+    """Sweep progress; with include_results, one page of per-task outcomes in completion order."""
+    sweep = reminder_queue.get_sweep(sweep_id, include_results=include_results, offset=offset, limit=limit)
+    if sweep is None:
+        raise HTTPException(status_code=404, detail=f"Sweep {sweep_id} not found.")
+    return sweep
+
+@app.post("/scheduler/trigger")
+async def trigger_sweep_endpoint(reminder_class: Optional[str] = None, current_date: Optional[datetime.date] = None):
+    """Schedules a sweep of one reminder class (all tasks when omitted) on this process's scheduler."""
+    try:
+        return {"status": scheduler_agent.trigger(reminder_class, current_date)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/scheduler/status")
+async def scheduler_status_endpoint():
+    return scheduler_agent.status()
+
+@app.get("/tasks/blocked", response_model=List[str])
+def blocked_tasks_endpoint(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Open tasks waiting on an unresolved dependency, by due date, one page at a time."""
+    return task_manager_agent.get_blocked_task_ids(offset, limit)
+
+@app.get("/delivery_receipts", response_model=List[DeliveryReceipt])
+def delivery_receipts_endpoint(count: int = Query(50, ge=1, le=1000)):
+    return notification_agent.recent_receipts(count)
+
+@app.get("/eligibility/stats")
+def eligibility_stats_endpoint():
+    if eligibility_engine is None:
+        raise HTTPException(status_code=404, detail="Incremental reminder evaluation is disabled.")
+    return eligibility_engine.stats()
+
+@app.get("/llm_cache/stats")
+def llm_cache_stats_endpoint():
+    cache = genai_prompt_generator_agent.response_cache
+    if cache is None:
+        raise HTTPException(status_code=404, detail="LLM response cache is disabled.")
+    return cache.stats()
+
+@app.get("/context_cache/stats")
+async def context_cache_stats_endpoint():
+    return contextualizer_agent.context_cache.stats()
+
+@app.get("/prompt_tiers/stats")
+async def prompt_tier_stats_endpoint():
+    return genai_prompt_generator_agent.tier_stats.snapshot()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,134 @@
+# cmbs_reminder_system/manage.py
+"""
+Operational commands for the reminder service.
+
+Usage:
+    python manage.py seed                   # write the demo properties, loans and tasks
+    python manage.py reset --yes            # delete every key the service owns (stop the service first)
+    python manage.py reindex                # rebuild the open-task indexes and dependency graph from task:* keys
+    python manage.py migrate-task-hashes    # convert JSON-string task keys to hashes, then reindex
+"""
+import argparse
+import datetime
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.base import r
+from agents.telemetry import configure_logging
+from agents.task_manager import TaskManagerAgent
+from agents.contextualizer import ContextualizerAgent
+
+# Key patterns owned by the service; `reset` deletes exactly these.
+SERVICE_KEY_PATTERNS = [
+    "task:*", "tasks:open:*", "tasks:blocked", "next_task_id", "task_events",
+    "task_dependents:*", "task_dependency_status:*", "eligibility:*",
+    "property:*", "loan:*", "object_versions",
+    "reminder_claim:*", "llm_cache:*",
+    "reminders:*", "sweep:*", "scheduler:*", "delivery_receipts",
+]
+
+def seed_demo_tasks(task_manager: TaskManagerAgent):
+    # Dependencies first, so the overdue task can reference their generated IDs.
+    verify_contact = task_manager.add_task({"description": "Verify Contact", "due_date": datetime.date(2025, 7, 1),
+                                            "assigned_to": "system@cmbs.com", "status": "Completed"})
+    previous_financials = task_manager.add_task({"description": "Previous Financials Uploaded", "due_date": datetime.date(2025, 7, 5),
+                                                 "assigned_to": "system@cmbs.com", "status": "Completed"})
+    task_manager.add_task({
+        "description": "Collect Q1 2025 Financial Statements",
+        "due_date": datetime.date(2025, 7, 15),
+        "assigned_to": "alice.smith@cmbs.com",
+        "priority": "Critical",
+        "task_type": "Financial Statement Collection",
+        "property_id": "PROP-GRND",
+        "loan_id": "LOAN-GWR-001",
+        "last_update_date": datetime.date(2025, 7, 10),
+        "last_update_notes": "Reached out to property manager for update. No response yet.",
+        "dependencies": [verify_contact.task_id, previous_financials.task_id]
+    })
+    task_manager.add_task({
+        "description": "Q2 2025 Covenant Compliance Review",
+        "due_date": datetime.date(2025, 7, 25),
+        "assigned_to": "bob.jones@cmbs.com",
+        "priority": "High",
+        "task_type": "Covenant Review",
+        "property_id": "PROP-RETAIL",
+        "loan_id": "LOAN-RT-002",
+        "last_update_date": datetime.date(2025, 7, 18),
+        "last_update_notes": "Started data aggregation for review."
+    })
+
+def seed(args: argparse.Namespace):
+    ContextualizerAgent().seed_dummy_data()
+    if not args.force and next(r.scan_iter(match="task:*", count=100), None) is not None:
+        print("Tasks already exist; demo tasks not added (use --force to add them anyway).")
+        return
+    seed_demo_tasks(TaskManagerAgent())
+    print("Seed complete: demo tasks added.")
+
+def reset(args: argparse.Namespace):
+    if not args.yes:
+        print(f"This deletes every key matching {', '.join(SERVICE_KEY_PATTERNS)}. Re-run with --yes to confirm.")
+        return
+    deleted = 0
+    for pattern in SERVICE_KEY_PATTERNS:
+        batch = []
+        for key in r.scan_iter(match=pattern, count=args.batch_size):
+            batch.append(key)
+            if len(batch) >= args.batch_size:
+                deleted += r.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += r.unlink(*batch)
+    print(f"Reset complete: {deleted} keys deleted.")
+
+def rebuild_indexes(task_manager: TaskManagerAgent, batch_size: int):
+    indexed = task_manager.reindex_tasks(batch_size=batch_size)
+    with_dependencies = task_manager.rebuild_dependency_graph(batch_size=batch_size)
+    print(f"Reindex complete: {indexed} open tasks indexed, dependencies of {with_dependencies} tasks rebuilt.")
+
+def reindex(args: argparse.Namespace):
+    try:
+        rebuild_indexes(TaskManagerAgent(), args.batch_size)
+    except redis.ResponseError as e:
+        if "WRONGTYPE" not in str(e):
+            raise
+        print("Some tasks are still stored as JSON strings; run `python manage.py migrate-task-hashes` instead "
+              "(it converts them and then reindexes).")
+        raise SystemExit(1)
+
+def migrate_task_hashes(args: argparse.Namespace):
+    task_manager = TaskManagerAgent()
+    migrated = task_manager.migrate_task_hashes(batch_size=args.batch_size)
+    print(f"Migration complete: {migrated} tasks converted to hashes.")
+    # The indexes and dependency graph are read from the hashes, so rebuild them now that every task is one.
+    rebuild_indexes(task_manager, args.batch_size)
+
+def main():
+    parser = argparse.ArgumentParser(description="CMBS Automated Reminder Service management commands.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = subparsers.add_parser("seed", help="Write the demo properties, loans and tasks.")
+    seed_parser.add_argument("--force", action="store_true", help="Add the demo tasks even if tasks already exist.")
+    seed_parser.set_defaults(func=seed)
+
+    reset_parser = subparsers.add_parser("reset", help="Delete all reminder-service keys from Redis.")
+    reset_parser.add_argument("--yes", action="store_true", help="Confirm the deletion.")
+    reset_parser.add_argument("--batch-size", type=int, default=1000, help="Keys fetched per SCAN / deleted per UNLINK.")
+    reset_parser.set_defaults(func=reset)
+
+    reindex_parser = subparsers.add_parser("reindex", help="Rebuild the task indexes and the dependency graph.")
+    reindex_parser.add_argument("--batch-size", type=int, default=1000, help="Keys fetched per SCAN/MGET batch.")
+    reindex_parser.set_defaults(func=reindex)
+
+    migrate_parser = subparsers.add_parser("migrate-task-hashes", help="Convert tasks stored as JSON strings into Redis hashes, then reindex.")
+    migrate_parser.add_argument("--batch-size", type=int, default=1000, help="Keys converted per SCAN batch / transaction.")
+    migrate_parser.set_defaults(func=migrate_task_hashes)
+
+    args = parser.parse_args()
+    configure_logging()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
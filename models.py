@@ -1,8 +1,13 @@
 # CMBS-GenAI-Reminder-Engine/models.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional, Dict
 import datetime
 
+class Blocker(BaseModel):
+    task_id: str
+    status: str
+    waiting_on: List[str] = Field([], description="This blocker's own unresolved dependencies.")
+
 class Task(BaseModel):
     task_id: str = Field(..., description="Unique identifier for the task.")
     description: str = Field(..., description="A brief description of the task.")
@@ -19,6 +24,7 @@ class Task(BaseModel):
     # Dependencies
     dependencies: List[str] = Field([], description="List of task_ids that this task depends on.")
     dependent_tasks_status: Dict[str, str] = Field({}, description="Current status of dependent tasks (task_id: status).")
+    blocker_chain: List[Blocker] = Field([], description="Unresolved dependencies, direct ones first, then what each of them waits on in turn.")
 
     # Historical context for Gen AI
     last_update_date: Optional[datetime.date] = None
@@ -50,6 +56,18 @@ class CombinedContext(BaseModel):
 class ReminderRequest(BaseModel):
     task_id: str = Field("scheduler_trigger", description="Identifier for the request; 'scheduler_trigger' for automated runs.")
     current_date: datetime.date
+    priorities: Optional[List[str]] = Field(None, description="Limit the sweep to these task priorities (a reminder class); all when omitted.")
+    assigned_to: Optional[List[str]] = Field(None, description="Limit the sweep to tasks assigned to these recipients; all when omitted.")
+    offset: int = Field(0, ge=0, description="Skip this many due tasks (in due-date order) before processing.")
+    limit: Optional[int] = Field(None, ge=1, description="Process at most this many due tasks; all when omitted.")
+    dry_run: bool = Field(False, description="Report the due tasks without claiming, generating or sending anything.")
+
+    @model_validator(mode="after")
+    def _offset_only_for_dry_runs(self) -> "ReminderRequest":
+        # Sent tasks leave the due list, so an offset into a live sweep skips tasks that were never reminded.
+        if self.offset and not self.dry_run:
+            raise ValueError("offset is only allowed with dry_run; page through a live sweep by repeating it with limit.")
+        return self
 
 class ReminderResponse(BaseModel):
     task_id: str
@@ -57,4 +75,27 @@ class ReminderResponse(BaseModel):
     subject: str
     message: str
     status: str
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+
+class SweepStatus(BaseModel):
+    sweep_id: str
+    status: str = Field(..., description="queued, running or completed.")
+    current_date: datetime.date
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    created_at: datetime.datetime
+    finished_at: Optional[datetime.datetime] = None
+    results: List[ReminderResponse] = Field([], description="One page of the per-task outcomes recorded so far, in completion order (when requested).")
+
+class DeliveryReceipt(BaseModel):
+    receipt_id: str
+    channel: str
+    recipient: str
+    subject: str
+    task_ids: List[str] = []
+    status: str = Field(..., description="delivered, failed, or cancelled (withdrawn from the queue before sending).")
+    error: Optional[str] = None
+    batch_size: int = Field(1, description="Number of messages sent together in the same channel batch.")
+    queued_at: datetime.datetime
+    sent_at: datetime.datetime
@@ -0,0 +1,13 @@
+# cmbs_reminder_system/tests/conftest.py
+import pytest
+from benchmarks.common import RoundTripCounter, make_redis_client, install_redis_client
+import agents.base
+
+@pytest.fixture
+def redis_client():
+    """A fresh fakeredis database installed as every agents module's `r`; the real client is restored afterwards."""
+    original = agents.base.r
+    client = make_redis_client("fake", RoundTripCounter())
+    install_redis_client(client)
+    yield client
+    install_redis_client(original)
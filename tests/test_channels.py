@@ -0,0 +1,137 @@
+# cmbs_reminder_system/tests/test_channels.py
+import http.server
+import json
+import socketserver
+import threading
+import pytest
+from agents.channels import SMTPChannel, HTTPChannel, Delivery
+from agents.notification import NotificationAgent, DeliveryOutcomeUnknown
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """Just enough of an SMTP server for smtplib: records each message and refuses recipients starting with 'refused'."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPStubHandler)
+        self.messages = []
+        self.connections = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost ESMTP stub")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == "QUIT":
+                self.reply("221 Bye")
+                return
+            if command == "RCPT" and "<refused" in line:
+                self.reply("550 No such user")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (data := self.rfile.readline().decode()) != ".\r\n":
+                    lines.append(data)
+                self.server.messages.append("".join(lines))
+                self.reply("250 Queued")
+            else:
+                self.reply("250 OK")
+
+class HTTPStub(http.server.ThreadingHTTPServer):
+    """Records each POSTed batch; the reply reports an error for recipients starting with 'refused'.
+    Requests block until `release` is set."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), HTTPStubHandler)
+        self.batches = []
+        self.received = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/notify"
+
+class HTTPStubHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        deliveries = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["deliveries"]
+        self.server.batches.append(deliveries)
+        self.server.received.set()
+        self.server.release.wait(10)
+        body = json.dumps({"results": [{"error": "mailbox unavailable" if delivery["recipient"].startswith("refused") else None}
+                                       for delivery in deliveries]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def smtp_stub():
+    server = SMTPStub()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def http_stub():
+    server = HTTPStub()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+def send_all(channel, recipients):
+    futures = [channel.submit(Delivery(recipient, f"Subject {i}", f"Body {i}", [f"TASK-{i}"])) for i, recipient in enumerate(recipients)]
+    try:
+        return [future.result(timeout=10) for future in futures]
+    finally:
+        channel.close()
+
+def test_smtp_batch_shares_one_connection_and_reports_refused_recipients(smtp_stub):
+    channel = SMTPChannel(host="127.0.0.1", port=smtp_stub.server_address[1], concurrency=1,
+                          max_batch_size=10, max_batch_wait_seconds=0.05, timeout_seconds=5)
+    receipts = send_all(channel, ["a@example.com", "refused@example.com", "b@example.com"])
+
+    assert [receipt.status for receipt in receipts] == ["delivered", "failed", "delivered"]
+    assert "SMTPRecipientsRefused" in receipts[1].error
+    assert len(smtp_stub.messages) == 2
+    assert "Subject: Subject 2" in smtp_stub.messages[1]
+    assert smtp_stub.connections == 1
+
+def test_http_batch_maps_per_message_errors(http_stub):
+    channel = HTTPChannel(url=http_stub.url, concurrency=1, max_batch_size=10, max_batch_wait_seconds=0.05, timeout_seconds=5)
+    receipts = send_all(channel, ["a@example.com", "refused@example.com"])
+
+    assert [receipt.status for receipt in receipts] == ["delivered", "failed"]
+    assert receipts[1].error == "mailbox unavailable"
+    assert [[delivery["task_ids"] for delivery in batch] for batch in http_stub.batches] == [[["TASK-0"], ["TASK-1"]]]
+
+def test_timed_out_send_is_withdrawn_from_the_queue(redis_client, http_stub):
+    channel = HTTPChannel(url=http_stub.url, concurrency=1, max_batch_size=1, max_batch_wait_seconds=0, timeout_seconds=5)
+    notifier = NotificationAgent(channels=[channel], send_timeout_seconds=0.2)
+    http_stub.release.clear()
+
+    # The only sender thread is stuck on the first reminder, so its outcome is unknown when the send times out.
+    with pytest.raises(DeliveryOutcomeUnknown):
+        notifier.send_reminder("first@example.com", "First", "Body", task_ids=["TASK-1"])
+    assert http_stub.received.is_set()
+    # The second never left the queue; a timed-out send must not go out after the caller gave up on it.
+    assert notifier.send_reminder("second@example.com", "Second", "Body", task_ids=["TASK-2"]) is False
+
+    http_stub.release.set()
+    notifier.close()
+    assert [batch[0]["recipient"] for batch in http_stub.batches] == ["first@example.com"]
+    statuses = {receipt.recipient: receipt.status for receipt in notifier.recent_receipts()}
+    assert statuses == {"first@example.com": "delivered", "second@example.com": "cancelled"}
@@ -0,0 +1,47 @@
+# cmbs_reminder_system/tests/test_llm_client.py
+import pytest
+from agents.llm_client import ResilientLLMClient, CircuitBreaker, LLMCallError
+from benchmarks.common import FakeGeminiModel, FakeProviderError
+
+class ScriptedModel(FakeGeminiModel):
+    """FakeGeminiModel whose calls raise the scripted errors in order (None lets a call succeed)."""
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+
+    def generate_content(self, prompt, system_instruction=None):
+        error = self.outcomes.pop(0) if self.outcomes else None
+        if error is not None:
+            raise error
+        return super().generate_content(prompt, system_instruction)
+
+def make_client(outcomes):
+    # Opens on the first failure and lets a trial request through right away.
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=0)
+    return ResilientLLMClient(ScriptedModel(outcomes), max_retries=0, breaker=breaker)
+
+def test_half_open_probe_rejected_by_provider_closes_breaker():
+    client = make_client([FakeProviderError(429), FakeProviderError(400)])
+    with pytest.raises(LLMCallError):
+        client.generate("Task ID: TASK-0001")
+    assert client.breaker.state == "open"
+
+    with pytest.raises(LLMCallError) as rejected:
+        client.generate("Task ID: TASK-0001")
+    assert not rejected.value.retriable
+    assert client.breaker.state == "closed"
+    assert "TASK-0001" in client.generate("Task ID: TASK-0001")
+    assert "TASK-0001" in client.generate("Task ID: TASK-0001")
+
+def test_half_open_probe_failing_without_provider_response_reopens_breaker():
+    client = make_client([FakeProviderError(429), ValueError("GEMINI_API_KEY not found")])
+    with pytest.raises(LLMCallError):
+        client.generate("Task ID: TASK-0001")
+
+    with pytest.raises(LLMCallError) as failed:
+        client.generate("Task ID: TASK-0001")
+    assert not failed.value.retriable
+    assert client.breaker.state == "open"
+    # The breaker is not stuck half-open: the next trial request goes through.
+    assert "TASK-0001" in client.generate("Task ID: TASK-0001")
+    assert client.breaker.state == "closed"
@@ -0,0 +1,120 @@
+# cmbs_reminder_system/tests/test_orchestrator.py
+import datetime
+import threading
+import time
+import pytest
+from pydantic import ValidationError
+from agents.task_manager import TaskManagerAgent
+from agents.contextualizer import ContextualizerAgent
+from agents.prompt_generator import GenAIPromptGeneratorAgent
+from agents.notification import NotificationAgent, DeliveryOutcomeUnknown
+from agents.orchestrator import OrchestratorAgent
+from agents.eligibility import ReminderEligibilityEngine
+from benchmarks.common import FakeGeminiModel
+from models import ReminderRequest
+
+class StubNotifier(NotificationAgent):
+    """Records sends; raises `error` instead while it is set."""
+    def __init__(self):
+        super().__init__(channels=[])
+        self.sent = []
+        self.error = None
+
+    def send_reminder(self, recipient, subject, message, task_ids=None):
+        if self.error is not None:
+            raise self.error
+        self.sent.extend(task_ids or [])
+        return True
+
+@pytest.fixture
+def task_manager(redis_client):
+    return TaskManagerAgent()
+
+def make_orchestrator(task_manager, notifier, model=None, **kwargs):
+    return OrchestratorAgent(task_manager, ContextualizerAgent(), GenAIPromptGeneratorAgent(llm_model=model or FakeGeminiModel()),
+                             notifier, **kwargs)
+
+def add_overdue_task(task_manager, i=0, dependencies=()):
+    # Critical tasks always go to the LLM rather than the template tier.
+    return task_manager.add_task({"description": f"Overdue task {i}", "due_date": datetime.date.today() - datetime.timedelta(days=3),
+                                  "assigned_to": f"manager{i}@cmbs.com", "priority": "Critical", "dependencies": list(dependencies)})
+
+def test_unconfirmed_delivery_is_committed_and_not_sent_again(task_manager):
+    task = add_overdue_task(task_manager)
+    notifier = StubNotifier()
+    notifier.error = DeliveryOutcomeUnknown("Timed out while it was being sent")
+    orchestrator = make_orchestrator(task_manager, notifier)
+    request = ReminderRequest(current_date=datetime.date.today())
+
+    [response] = orchestrator.process_reminder_request(request)
+    assert response.status == "Reminder Sent"
+    assert response.error.startswith("Delivery unconfirmed")
+    assert task_manager.get_task(task.task_id).last_reminder_sent is not None
+
+    notifier.error = None
+    assert orchestrator.process_reminder_request(request) == []
+    assert notifier.sent == []
+
+class HangingModel(FakeGeminiModel):
+    """A provider whose calls for the tasks in `hanging` block until the test releases them."""
+    def __init__(self, hanging):
+        super().__init__()
+        self.hanging = set(hanging)
+        self.release = threading.Event()
+
+    def generate_content(self, prompt, system_instruction=None):
+        if any(f"Task ID: {task_id}\n" in prompt for task_id in self.hanging):
+            self.release.wait(30)
+        return super().generate_content(prompt, system_instruction)
+
+@pytest.mark.parametrize("max_concurrency", [1, 2])
+def test_generation_that_never_returns_times_out(task_manager, max_concurrency):
+    tasks = [add_overdue_task(task_manager, i) for i in range(3)]
+    model = HangingModel(hanging=[task.task_id for task in tasks[:max_concurrency]])
+    notifier = StubNotifier()
+    orchestrator = make_orchestrator(task_manager, notifier, model, max_concurrency=max_concurrency, task_timeout_seconds=0.3)
+    try:
+        started = time.monotonic()
+        responses = orchestrator.process_reminder_request(ReminderRequest(current_date=datetime.date.today()))
+        elapsed = time.monotonic() - started
+    finally:
+        model.release.set()
+
+    assert elapsed < 2
+    statuses = {response.task_id: response.status for response in responses}
+    hung = [task.task_id for task in tasks[:max_concurrency]]
+    assert all(statuses[task_id] == "Failed" for task_id in hung)
+    if max_concurrency == 1:
+        # The next task gets a fresh generation thread and is sent as usual.
+        assert statuses[tasks[-1].task_id] == "Reminder Sent"
+    else:
+        # Every generation thread is stuck, so the queued task times out instead of waiting forever.
+        assert statuses[tasks[-1].task_id] == "Failed"
+    assert not set(notifier.sent) & set(hung)
+    # Timed-out claims are released, so the next sweep retries those tasks.
+    assert all(task_manager.get_task(task_id).last_reminder_sent is None for task_id in hung)
+
+def test_offset_is_rejected_outside_dry_runs():
+    with pytest.raises(ValidationError):
+        ReminderRequest(current_date=datetime.date.today(), offset=5, limit=5)
+    assert ReminderRequest(current_date=datetime.date.today(), offset=5, limit=5, dry_run=True).offset == 5
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_limited_selection_reads_only_the_requested_page(task_manager, incremental):
+    task_manager.due_scan_page_size = 4
+    blocker = task_manager.add_task({"description": "Blocker", "due_date": datetime.date.today() + datetime.timedelta(days=90),
+                                     "assigned_to": "other@cmbs.com"})
+    # Odd tasks depend on the open blocker, so the suppress policy skips them.
+    tasks = [add_overdue_task(task_manager, i, [blocker.task_id] if i % 2 else []) for i in range(12)]
+    eligibility = ReminderEligibilityEngine(task_manager) if incremental else None
+    orchestrator = make_orchestrator(task_manager, StubNotifier(), eligibility=eligibility, blocked_policy="suppress")
+
+    def page(offset, limit):
+        request = ReminderRequest(current_date=datetime.date.today(), offset=offset, limit=limit, dry_run=True)
+        return [response.task_id for response in orchestrator.process_reminder_request(request)]
+
+    everything = [response.task_id for response in orchestrator.process_reminder_request(
+        ReminderRequest(current_date=datetime.date.today(), dry_run=True))]
+    assert sorted(everything) == sorted(task.task_id for task in tasks[0::2])
+    assert page(0, 2) + page(2, 2) + page(4, 2) == everything
+    assert page(5, 10) == everything[5:]
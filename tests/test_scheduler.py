@@ -0,0 +1,121 @@
+# cmbs_reminder_system/tests/test_scheduler.py
+import datetime
+import threading
+import time
+import pytest
+from agents.scheduler import CronSchedule, RedisLease, ReminderSchedule, SchedulerAgent, parse_schedules
+from models import ReminderRequest
+
+# --- Cron ---
+
+def test_cron_fields_support_lists_ranges_and_steps():
+    cron = CronSchedule("*/15 9-17/4 1,15 * 7")
+    assert cron.minutes == {0, 15, 30, 45}
+    assert cron.hours == {9, 13, 17}
+    assert cron.days == {1, 15}
+    assert cron.months == set(range(1, 13))
+    # 7 is Sunday, like 0.
+    assert cron.weekdays == {0}
+    assert CronSchedule("5/20 * * * *").minutes == {5, 25, 45}
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "* * * * 8", "5-1 * * * *"])
+def test_invalid_cron_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+@pytest.mark.parametrize("expression, after, expected", [
+    ("0 * * * *", datetime.datetime(2025, 7, 14, 10, 30), datetime.datetime(2025, 7, 14, 11, 0)),
+    ("0 * * * *", datetime.datetime(2025, 7, 14, 11, 0), datetime.datetime(2025, 7, 14, 12, 0)),
+    ("0 8 * * *", datetime.datetime(2025, 12, 31, 9, 0), datetime.datetime(2026, 1, 1, 8, 0)),
+    # Saturday afternoon: next weekday business-hours slot is Monday 09:00.
+    ("*/15 9-17 * * 1-5", datetime.datetime(2025, 7, 19, 14, 7), datetime.datetime(2025, 7, 21, 9, 0)),
+    # Both day fields restricted: the 13th or any Friday, whichever comes first.
+    ("0 0 13 * 5", datetime.datetime(2025, 7, 1), datetime.datetime(2025, 7, 4)),
+    ("0 0 13 * 5", datetime.datetime(2025, 7, 11), datetime.datetime(2025, 7, 13)),
+    ("0 0 29 2 *", datetime.datetime(2025, 3, 1), datetime.datetime(2028, 2, 29)),
+])
+def test_next_after(expression, after, expected):
+    assert CronSchedule(expression).next_after(after) == expected
+
+def test_cron_that_never_fires_is_reported():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(datetime.datetime(2025, 1, 1))
+
+def test_parse_schedules():
+    urgent, routine = parse_schedules("urgent|0 * * * *|Critical,High; routine|0 8 * * *|*")
+    assert (urgent.name, urgent.cron.expression, urgent.priorities) == ("urgent", "0 * * * *", ["Critical", "High"])
+    assert (routine.name, routine.priorities) == ("routine", None)
+
+# --- Leases ---
+
+def test_lease_is_exclusive_until_released(redis_client):
+    holder, contender = RedisLease("lease:test", 10), RedisLease("lease:test", 10)
+    assert holder.acquire()
+    assert not contender.acquire()
+    assert holder.renew()
+    assert not contender.renew()
+    assert not contender.release()
+    assert holder.release()
+    assert contender.acquire()
+
+def test_expired_lease_cannot_touch_its_successor(redis_client):
+    holder, successor = RedisLease("lease:test", 0.05), RedisLease("lease:test", 10)
+    assert holder.acquire()
+    time.sleep(0.1)
+    assert successor.acquire()
+    assert not holder.renew()
+    assert not holder.release()
+    assert redis_client.get("lease:test") == successor.token
+    # A heartbeat notices the loss on its first renewal.
+    assert holder.renew_until(threading.Event()) is False
+
+def test_renew_until_keeps_the_lease_alive(redis_client):
+    lease = RedisLease("lease:test", 0.15)
+    assert lease.acquire()
+    stop, held = threading.Event(), []
+    heartbeat = threading.Thread(target=lambda: held.append(lease.renew_until(stop)))
+    heartbeat.start()
+    time.sleep(0.5)
+    assert not RedisLease("lease:test", 10).acquire()
+    stop.set()
+    heartbeat.join()
+    assert held == [True]
+
+# --- Per-class sweep lock ---
+
+class BlockingOrchestrator:
+    """Stands in for the orchestrator: each sweep blocks until `release` is set."""
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.requests = []
+
+    def process_reminder_request(self, request: ReminderRequest):
+        self.requests.append(request)
+        self.started.set()
+        self.release.wait(10)
+        return []
+
+def make_scheduler(orchestrator):
+    return SchedulerAgent(orchestrator, schedules=[ReminderSchedule("urgent", "0 * * * *", ["Critical"])], sweep_lock_seconds=0.15)
+
+def test_sweep_lock_is_held_for_the_whole_sweep_and_skips_other_processes(redis_client):
+    orchestrator = BlockingOrchestrator()
+    scheduler, other = make_scheduler(orchestrator), make_scheduler(BlockingOrchestrator())
+    request = ReminderRequest(current_date=datetime.date.today(), priorities=["Critical"])
+    sweep = threading.Thread(target=scheduler._run_sweep, args=("urgent", request))
+    sweep.start()
+    try:
+        assert orchestrator.started.wait(5)
+        # Well past the lock's TTL: the heartbeat keeps it, so another process still skips the class.
+        time.sleep(0.5)
+        assert redis_client.exists("scheduler:sweep:urgent")
+        other._run_sweep("urgent", request)
+        assert other.status()["skipped"] == 1
+    finally:
+        orchestrator.release.set()
+        sweep.join()
+
+    assert not redis_client.exists("scheduler:sweep:urgent")
+    assert scheduler.status()["completed"] == 1
+    assert scheduler.status()["schedules"]["urgent"]["last_result"]["processed"] == 0
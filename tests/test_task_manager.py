@@ -0,0 +1,163 @@
+# cmbs_reminder_system/tests/test_task_manager.py
+import datetime
+import pytest
+import agents.task_manager
+from agents.task_manager import TaskManagerAgent, DependencyCycleError, OPEN_STATUSES, DEFAULT_REMINDER_INTERVAL_HOURS, DEFAULT_DUE_SOON_THRESHOLD_DAYS
+from models import Task
+
+@pytest.fixture
+def task_manager(redis_client):
+    return TaskManagerAgent()
+
+def add_task(task_manager, dependencies=(), days_until_due=10, **fields):
+    return task_manager.add_task({"description": "Task", "due_date": datetime.date.today() + datetime.timedelta(days=days_until_due),
+                                  "assigned_to": "manager@cmbs.com", "dependencies": list(dependencies), **fields})
+
+def blocked_ids(task_manager):
+    return task_manager.get_blocked_task_ids()
+
+def test_status_changes_propagate_to_dependents(task_manager):
+    upstream = add_task(task_manager)
+    middle = add_task(task_manager, [upstream.task_id])
+    downstream = add_task(task_manager, [middle.task_id])
+    assert set(blocked_ids(task_manager)) == {middle.task_id, downstream.task_id}
+
+    task_manager.update_task_status(upstream.task_id, "Completed")
+    assert blocked_ids(task_manager) == [downstream.task_id]
+    [task] = task_manager.get_tasks([downstream.task_id])
+    task_manager.attach_dependency_statuses([task])
+    assert task.dependent_tasks_status == {middle.task_id: "Pending"}
+
+    task_manager.update_task_status(middle.task_id, "Completed")
+    assert blocked_ids(task_manager) == []
+
+def test_forward_reference_is_resolved_once_the_dependency_exists(task_manager):
+    # TASK-0002 does not exist yet when TASK-0001 names it.
+    waiting = add_task(task_manager, ["TASK-0002"])
+    assert blocked_ids(task_manager) == [waiting.task_id]
+    dependency = add_task(task_manager, status="Completed")
+    assert dependency.task_id == "TASK-0002"
+    assert blocked_ids(task_manager) == []
+
+def test_resolved_statuses_come_from_the_module_setting(task_manager, monkeypatch):
+    monkeypatch.setattr(agents.task_manager, "RESOLVED_DEPENDENCY_STATUSES", ("Completed", "Waived"))
+    upstream = add_task(task_manager)
+    downstream = add_task(task_manager, [upstream.task_id])
+    task_manager.update_task_status(upstream.task_id, "Waived")
+    assert downstream.task_id not in blocked_ids(task_manager)
+
+@pytest.mark.parametrize("dependencies", [["TASK-0001"], ["TASK-0002"]])
+def test_cycle_is_rejected_without_using_up_an_id(task_manager, dependencies):
+    # TASK-0001 waits on TASK-0002, which is the id the next task takes.
+    add_task(task_manager, ["TASK-0002"])
+    with pytest.raises(DependencyCycleError) as rejected:
+        add_task(task_manager, dependencies)
+    assert rejected.value.cycle[0] == rejected.value.cycle[-1] == "TASK-0002"
+    assert task_manager.get_task("TASK-0002") is None
+
+    accepted = add_task(task_manager, status="Completed")
+    assert accepted.task_id == "TASK-0002"
+
+def test_updates_move_the_task_in_the_indexes_with_the_write(task_manager, redis_client):
+    task = add_task(task_manager, days_until_due=-2)
+    next_reminder_key = task_manager._open_by_next_reminder_key
+    first_reminder = redis_client.zscore(next_reminder_key, task.task_id)
+
+    sent_at = datetime.datetime.combine(datetime.date.today(), datetime.time(9))
+    updated = task_manager.update_last_reminder_sent(task.task_id, sent_at)
+    assert updated.last_reminder_sent == sent_at
+    assert redis_client.zscore(next_reminder_key, task.task_id) == task_manager._datetime_score(task_manager._next_reminder_at(updated))
+    assert redis_client.zscore(next_reminder_key, task.task_id) > first_reminder
+
+    task_manager.update_task_status(task.task_id, "Completed")
+    assert redis_client.zscore(next_reminder_key, task.task_id) is None
+    assert redis_client.zscore(task_manager._open_by_due_key, task.task_id) is None
+    assert task_manager.update_task_status("TASK-9999", "Completed") is None
+    assert not redis_client.exists("task:TASK-9999")
+
+def test_every_write_publishes_its_event(task_manager, redis_client):
+    task = add_task(task_manager)
+    task_manager.update_task_status(task.task_id, "In Progress")
+    task_manager.update_last_reminder_sent(task.task_id, datetime.datetime.now())
+    events = [(fields["task_id"], fields["event"], fields["status"]) for _, fields in redis_client.xrange(task_manager.EVENTS_STREAM_KEY)]
+    assert events == [(task.task_id, "created", "Pending"), (task.task_id, "status_changed", "In Progress"),
+                      (task.task_id, "reminder_sent", "In Progress")]
+
+# --- Reminder claims ---
+
+def test_only_one_sweep_wins_a_reminder_window(task_manager):
+    task = add_task(task_manager, days_until_due=-1)
+    first = task_manager.claim_reminders([task])
+    assert list(first) == [task.task_id]
+    # A second sweep that saw the same state contends for the same window and loses.
+    assert task_manager.claim_reminders([task]) == {}
+
+    task_manager.release_reminder(first[task.task_id])
+    second = task_manager.claim_reminders([task])
+    assert list(second) == [task.task_id]
+    # A stale holder's release does not free a window someone else now holds.
+    task_manager.release_reminder(first[task.task_id])
+    assert task_manager.claim_reminders([task]) == {}
+
+def test_committed_window_is_never_sent_again(task_manager, redis_client):
+    task = add_task(task_manager, days_until_due=-1)
+    claim = task_manager.claim_reminders([task])[task.task_id]
+    sent = task_manager.commit_reminder(claim, datetime.datetime.now())
+    assert redis_client.get(claim.key) == "sent"
+    assert 0 < redis_client.pttl(claim.key) <= task_manager.claim_retention_ms
+    # A sweep still holding the pre-send snapshot targets the committed window and is turned away.
+    assert task_manager.claim_reminders([task]) == {}
+    # The sent reminder moved the window; the fresh state claims the next one.
+    assert list(task_manager.claim_reminders([sent])) == [task.task_id]
+
+def test_closed_and_missing_tasks_are_not_claimed(task_manager):
+    closed = add_task(task_manager, days_until_due=-1)
+    task_manager.update_task_status(closed.task_id, "Completed")
+    missing = closed.model_copy(update={"task_id": "TASK-9999"})
+    assert task_manager.claim_reminders([closed, missing]) == {}
+
+# --- Due check and its index ---
+
+def sent_times():
+    today = datetime.date.today()
+    yield None
+    for days_ago in (0, 1, 2, 5):
+        for hour in (0, 9, 23):
+            yield datetime.datetime.combine(today - datetime.timedelta(days=days_ago), datetime.time(hour))
+
+@pytest.mark.parametrize("days_until_due", [-6, -1, 0, 1, 3, 7, 8, 12])
+def test_next_reminder_at_is_the_first_check_time_the_task_is_due(task_manager, days_until_due):
+    today = datetime.date.today()
+    for sent_at in sent_times():
+        task = Task(task_id="TASK-0001", description="Task", assigned_to="manager@cmbs.com",
+                    due_date=today + datetime.timedelta(days=days_until_due), last_reminder_sent=sent_at)
+        next_reminder_at = task_manager._next_reminder_at(task)
+        for offset in range(-15, 15):
+            check_date = today + datetime.timedelta(days=offset)
+            due = task_manager._is_reminder_due(task, check_date, DEFAULT_REMINDER_INTERVAL_HOURS, DEFAULT_DUE_SOON_THRESHOLD_DAYS)
+            assert due == (datetime.datetime.combine(check_date, datetime.time.min) >= next_reminder_at), (sent_at, check_date)
+
+@pytest.mark.parametrize("policy", [(DEFAULT_REMINDER_INTERVAL_HOURS, DEFAULT_DUE_SOON_THRESHOLD_DAYS), (48, 3)])
+def test_index_selection_matches_a_full_due_check(task_manager, policy):
+    # Small pages, so limited selections span several ZRANGEBYSCORE calls.
+    task_manager.due_scan_page_size = 4
+    today = datetime.date.today()
+    tasks = []
+    for i, sent_at in enumerate(list(sent_times()) * 2):
+        task = add_task(task_manager, days_until_due=i % 17 - 8, priority=("High", "Low")[i % 2])
+        if sent_at is not None:
+            task = task_manager.update_last_reminder_sent(task.task_id, sent_at)
+        if i % 5 == 0:
+            task = task_manager.update_task_status(task.task_id, "Completed")
+        tasks.append(task)
+
+    for offset in range(-3, 10):
+        check_date = today + datetime.timedelta(days=offset)
+        expected = {task.task_id for task in tasks if task.status in OPEN_STATUSES
+                    and task_manager._is_reminder_due(task, check_date, *policy)}
+        selected = task_manager.get_tasks_due_for_reminder(check_date, *policy)
+        assert {task.task_id for task in selected} == expected
+        high = task_manager.get_tasks_due_for_reminder(check_date, *policy, priorities=["High"])
+        assert {task.task_id for task in high} == {task_id for task_id in expected if task_manager.get_task(task_id).priority == "High"}
+        limited = task_manager.get_tasks_due_for_reminder(check_date, *policy, limit=3)
+        assert [task.task_id for task in limited] == [task.task_id for task in selected][:3]
@@ -0,0 +1,91 @@
+# cmbs_reminder_system/tests/test_templates.py
+import datetime
+import pytest
+from agents.templates import ReminderTemplateRouter
+from models import CombinedContext, Task
+
+TODAY = datetime.date(2025, 7, 14)
+
+def context(days_overdue=3, **fields):
+    task = Task(**{"task_id": "TASK-0001", "description": "Collect rent roll", "due_date": TODAY - datetime.timedelta(days=days_overdue),
+                   "assigned_to": "manager@cmbs.com", "property_id": "PROP-001", **fields})
+    return CombinedContext(task_context=task)
+
+@pytest.fixture
+def router():
+    return ReminderTemplateRouter(llm_priorities=["Critical"], max_template_days_overdue=7)
+
+def subject(router, **fields):
+    return router.render(context(**fields), TODAY).split("\n", 1)[0]
+
+# --- Routing ---
+
+@pytest.mark.parametrize("fields, reason", [
+    ({}, None),
+    ({"priority": "Critical"}, "priority Critical"),
+    ({"task_type": "Covenant Review"}, "covenant-related"),
+    ({"description": "Check DSCR covenant"}, "covenant-related"),
+    ({"dependent_tasks_status": {"TASK-0002": "Pending"}}, "open dependencies"),
+    ({"dependent_tasks_status": {"TASK-0002": "Completed"}}, None),
+    ({"days_overdue": 7}, None),
+    ({"days_overdue": 8}, "long overdue"),
+])
+def test_llm_reason(router, fields, reason):
+    assert router.llm_reason(context(**fields), TODAY) == reason
+
+@pytest.mark.parametrize("notes", [
+    "Borrower has not replied - no response since Monday.",
+    "Statements BLOCKED by the auditor.",
+    "Waiting  on the property manager.",
+    "Site visit delayed a week.",
+    "Two open issues with the servicer.",
+    "Escalated to the special servicer.",
+    "Borrower defaulted on the June payment.",
+])
+def test_blocker_notes_go_to_the_llm(router, notes):
+    assert router.llm_reason(context(last_update_notes=notes), TODAY) == "blocker in last update"
+
+@pytest.mark.parametrize("notes", [
+    "Invoice reissued to the borrower.",
+    "Tissue samples from the mold inspection are back.",
+    "Unblocked now; on track for Friday.",
+    None,
+])
+def test_ordinary_notes_stay_on_the_template(router, notes):
+    assert router.llm_reason(context(last_update_notes=notes), TODAY) is None
+
+def test_blocker_keywords_can_be_configured():
+    router = ReminderTemplateRouter(blocker_keywords=["missing doc*", "hold"])
+    assert router.llm_reason(context(last_update_notes="Missing documents from the borrower."), TODAY) == "blocker in last update"
+    assert router.llm_reason(context(last_update_notes="Household survey pending."), TODAY) is None
+    assert router.llm_reason(context(last_update_notes="Site visit delayed."), TODAY) is None
+
+# --- Rendering ---
+
+@pytest.mark.parametrize("fields, expected", [
+    ({"days_overdue": -3}, "Upcoming: Collect rent roll (TASK-0001) due 2025-07-17"),
+    ({"days_overdue": 0}, "Subject: Due today: Collect rent roll (TASK-0001)"),
+    ({"days_overdue": 3}, "Overdue by 3 days: Collect rent roll (TASK-0001)"),
+    # Priority templates take precedence over the generic one for their timing only.
+    ({"days_overdue": 3, "priority": "High"}, "Action required - overdue by 3 days: Collect rent roll (TASK-0001)"),
+    ({"days_overdue": 0, "priority": "High"}, "Subject: Due today: Collect rent roll (TASK-0001)"),
+    ({"days_overdue": 1, "priority": "Critical"}, "CRITICAL - overdue by 1 day: Collect rent roll (TASK-0001)"),
+    ({"days_overdue": -1, "priority": "Low"}, "Heads-up: Collect rent roll (TASK-0001) due 2025-07-15"),
+    # Task type is more specific than priority.
+    ({"days_overdue": 2, "priority": "High", "task_type": "Financial Statement Collection"},
+     "Overdue by 2 days: financial statements for PROP-001 (TASK-0001)"),
+    # ...but falls back to the priority template where the task type has none for that timing.
+    ({"days_overdue": 2, "priority": "High", "task_type": "Inspection Schedule"},
+     "Action required - overdue by 2 days: Collect rent roll (TASK-0001)"),
+])
+def test_template_lookup(router, fields, expected):
+    assert subject(router, **fields).endswith(expected)
+
+def test_rendered_body_names_the_update_and_dependencies(router):
+    body = router.render(context(last_update_notes="Chased the borrower.", last_update_date=datetime.date(2025, 7, 10),
+                                 dependent_tasks_status={"TASK-0002": "Pending", "TASK-0003": "Completed"}), TODAY)
+    assert "for PROP-001" in body
+    assert "Your last update (2025-07-10) noted: \"Chased the borrower.\"" in body
+    assert "Outstanding dependencies: TASK-0002." in body
+    assert body.endswith("CMBS Asset Management System")
+    assert "All dependent tasks are completed." in router.render(context(dependent_tasks_status={"TASK-0003": "Completed"}), TODAY)
@@ -0,0 +1,38 @@
+# cmbs_reminder_system/worker.py
+"""Reminder worker process: consumes sweeps queued via POST /sweeps. Run as many as needed, on any node."""
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents.telemetry import configure_logging
+from agents.task_manager import TaskManagerAgent
+from agents.contextualizer import ContextualizerAgent
+from agents.prompt_generator import GenAIPromptGeneratorAgent
+from agents.notification import NotificationAgent
+from agents.orchestrator import OrchestratorAgent
+from agents.work_queue import ReminderWorkQueue, ReminderWorker
+
+def main():
+    parser = argparse.ArgumentParser(description="CMBS reminder queue worker.")
+    parser.add_argument("--consumer", help="Consumer name within the worker group (default: <hostname>-<pid>).")
+    parser.add_argument("--batch-size", type=int, default=10, help="Queued tasks taken per read.")
+    args = parser.parse_args()
+    configure_logging()
+
+    notifier = NotificationAgent()
+    prompt_generator = GenAIPromptGeneratorAgent()
+    prompt_generator.warm_up()
+    orchestrator = OrchestratorAgent(
+        task_manager=TaskManagerAgent(),
+        contextualizer=ContextualizerAgent(),
+        prompt_generator=prompt_generator,
+        notifier=notifier,
+    )
+    try:
+        ReminderWorker(orchestrator, ReminderWorkQueue(), consumer=args.consumer, batch_size=args.batch_size).run_forever()
+    finally:
+        notifier.close()
+
+if __name__ == "__main__":
+    main()